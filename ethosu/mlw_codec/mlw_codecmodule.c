@@ -23,6 +23,120 @@
 #include "mlw_decode.h"
 #include "mlw_encode.h"
 
+/* Arguments and results of one mlw_reorder_encode call. The input array
+ * is referenced by the job so that the encoding can run without the GIL.
+ */
+typedef struct
+{
+    int ifm_ublock_depth;
+    int ofm_ublock_depth;
+    PyArrayObject *input_ndarray_object;
+    int ofm_depth;
+    int kernel_height;
+    int kernel_width;
+    int ifm_depth;
+    int brick_strides[4];
+    int ofm_block_depth;
+    int is_depthwise;
+    int is_partkernel;
+    int ifm_bitdepth;
+    int decomp_h;
+    int decomp_w;
+    uint8_t *output_buffer;
+    int output_length;
+    int64_t padded_length;
+} reorder_encode_job;
+
+/* Converts the input object of a job to an int16 array and derives the
+ * volume shape and brick strides from it. Returns 0 with an exception set
+ * on failure, the caller releases the input array in both cases.
+ */
+static int
+prepare_reorder_encode_job(reorder_encode_job *job, PyObject *input_object)
+{
+    job->input_ndarray_object = (PyArrayObject*)PyArray_FROM_OTF(
+        input_object,
+        NPY_INT16,
+        NPY_ARRAY_ALIGNED);
+    if (job->input_ndarray_object == NULL)
+    {
+        return 0;
+    }
+
+    if ((int)PyArray_NDIM(job->input_ndarray_object) < 4)
+    {
+        PyErr_SetString(PyExc_ValueError, "Invalid input shape");
+        return 0;
+    }
+
+    job->ofm_depth = (int)PyArray_DIM(job->input_ndarray_object, 0);
+    job->kernel_height = (int)PyArray_DIM(job->input_ndarray_object, 1);
+    job->kernel_width = (int)PyArray_DIM(job->input_ndarray_object, 2);
+    job->ifm_depth = (int)PyArray_DIM(job->input_ndarray_object, 3);
+
+    for (int i = 0; i < 4; i++)
+    {
+        int stride = (int)PyArray_STRIDE(job->input_ndarray_object, i);
+        if (stride % sizeof(int16_t))
+        {
+            PyErr_SetString(PyExc_ValueError, "Invalid stride");
+            return 0;
+        }
+        job->brick_strides[i] = stride / sizeof(int16_t);
+    }
+    if ((unsigned)PyArray_ITEMSIZE(job->input_ndarray_object) != sizeof(int16_t))
+    {
+        PyErr_SetString(PyExc_ValueError, "Invalid input type");
+        return 0;
+    }
+    return 1;
+}
+
+/* Encodes a prepared job, this does not use the Python API so it may be
+ * called with the GIL released.
+ */
+static void
+run_reorder_encode_job(reorder_encode_job *job, int verbose)
+{
+    job->output_length = mlw_reorder_encode(
+        job->ifm_ublock_depth,
+        job->ofm_ublock_depth,
+        job->ofm_depth,
+        job->kernel_height,
+        job->kernel_width,
+        job->ifm_depth,
+        job->brick_strides,
+        (int16_t*)PyArray_DATA(job->input_ndarray_object),
+        job->ofm_block_depth,
+        job->is_depthwise,
+        job->is_partkernel,
+        job->ifm_bitdepth,
+        job->decomp_h,
+        job->decomp_w,
+        &job->output_buffer,
+        &job->padded_length,
+        verbose);
+}
+
+/* Returns the (bytearray, int) result of an encoded job */
+static PyObject *
+reorder_encode_job_result(reorder_encode_job *job)
+{
+    return Py_BuildValue(
+        "(NL)",
+        PyByteArray_FromStringAndSize((char*)job->output_buffer, job->output_length),
+        (long long)job->padded_length);
+}
+
+/* Releases the input array and the output buffer of a job */
+static void
+release_reorder_encode_job(reorder_encode_job *job)
+{
+    Py_CLEAR(job->input_ndarray_object);
+    mlw_free_outbuf(job->output_buffer);
+    job->output_buffer = NULL;
+}
+
 /* C extension wrapper for mlw_reorder_encode
  *
  * This method is exposed directly in python with the arguments with a
@@ -46,16 +160,8 @@
 static PyObject *
 method_reorder_encode (PyObject *self, PyObject *args)
 {
-    /* Object to hold the input integer list. */
-    int ifm_ublock_depth;
-    int ofm_ublock_depth;
+    reorder_encode_job job = {0};
     PyObject *input_object;
-    int ofm_block_depth;
-    int is_depthwise;
-    int is_partkernel;
-    int ifm_bitdepth;
-    int decomp_h;
-    int decomp_w;
 
     /* Object to hold the input verbosity integer, the verbose argument
      * is optional so defaulted to 0.
@@ -63,92 +169,121 @@ method_reorder_encode (PyObject *self, PyObject *args)
     int verbose = 0;
 
     /* Arguments to the method are delivered as a tuple, unpack the
-     * tuple to get the individual arguments, note the second is
+     * tuple to get the individual arguments, note the last is
      * optional.
      */
     if (!PyArg_ParseTuple(args, "iiOiiiiii|i",
-        &ifm_ublock_depth,
-        &ofm_ublock_depth,
+        &job.ifm_ublock_depth,
+        &job.ofm_ublock_depth,
         &input_object,
-        &ofm_block_depth,
-        &is_depthwise,
-        &is_partkernel,
-        &ifm_bitdepth,
-        &decomp_h,
-        &decomp_w,
+        &job.ofm_block_depth,
+        &job.is_depthwise,
+        &job.is_partkernel,
+        &job.ifm_bitdepth,
+        &job.decomp_h,
+        &job.decomp_w,
         &verbose))
         return NULL;
 
-    PyArrayObject* input_ndarray_object = (PyArrayObject*)PyArray_FROM_OTF(
-        input_object,
-        NPY_INT16,
-        NPY_ARRAY_ALIGNED);
-    if (input_ndarray_object == NULL)
+    PyObject *ret = NULL;
+    if (prepare_reorder_encode_job(&job, input_object))
     {
-        return NULL;
+        Py_BEGIN_ALLOW_THREADS
+        run_reorder_encode_job(&job, verbose);
+        Py_END_ALLOW_THREADS
+        ret = reorder_encode_job_result(&job);
     }
+    release_reorder_encode_job(&job);
+    return ret;
+}
 
-    if ((int)PyArray_NDIM(input_ndarray_object) < 4)
-    {
-        PyErr_SetString(PyExc_ValueError, "Invalid input shape");
+/* C extension wrapper for encoding several volumes with mlw_reorder_encode
+ *
+ * This method is exposed directly in python with the arguments with a
+ * prototype of the form:
+ *
+ * output = mlw_codec.reorder_encode_batch(jobs, verbose=0)
+ *
+ * jobs: [(ifm_ublock_depth, ofm_ublock_depth, input, ofm_block_depth,
+ *         is_depthwise, is_partkernel, ifm_bitdepth, decomp_h, decomp_w)]
+ * verbose: int
+ * output: [(bytearray, int)]
+ *
+ * All jobs are encoded with the GIL released, so batches that are
+ * submitted from different threads are encoded in parallel.
+ */
+
+static PyObject *
+method_reorder_encode_batch (PyObject *self, PyObject *args)
+{
+    PyObject *jobs_object;
+    int verbose = 0;
+
+    if (!PyArg_ParseTuple(args, "O|i", &jobs_object, &verbose))
         return NULL;
-    }
 
-    int ofm_depth = (int)PyArray_DIM(input_ndarray_object, 0);
-    int kernel_height = (int)PyArray_DIM(input_ndarray_object, 1);
-    int kernel_width = (int)PyArray_DIM(input_ndarray_object, 2);
-    int ifm_depth = (int)PyArray_DIM(input_ndarray_object, 3);
+    PyObject *jobs_sequence = PySequence_Fast(jobs_object, "Jobs must be a sequence");
+    if (jobs_sequence == NULL)
+        return NULL;
 
-    int16_t* brick_weights = (int16_t*)PyArray_DATA(input_ndarray_object);
-    int brick_strides[4];
-    for (int i = 0; i < 4; i++)
+    Py_ssize_t num_jobs = PySequence_Fast_GET_SIZE(jobs_sequence);
+    reorder_encode_job *jobs = (reorder_encode_job *) calloc(num_jobs > 0 ? num_jobs : 1, sizeof(reorder_encode_job));
+    if (jobs == NULL)
     {
-        int stride = (int)PyArray_STRIDE(input_ndarray_object, i);
-        if (stride % sizeof(int16_t))
-        {
-            PyErr_SetString(PyExc_ValueError, "Invalid stride");
-            return NULL;
-        }
-        brick_strides[i] = stride / sizeof(int16_t);
+        Py_DECREF(jobs_sequence);
+        return PyErr_NoMemory();
     }
-    if ((unsigned)PyArray_ITEMSIZE(input_ndarray_object) != sizeof(int16_t))
+
+    PyObject *ret = NULL;
+    for (Py_ssize_t i = 0; i < num_jobs; i++)
     {
-        PyErr_SetString(PyExc_ValueError, "Invalid input type");
-        return NULL;
+        PyObject *job_args = PySequence_Fast_GET_ITEM(jobs_sequence, i);
+        PyObject *input_object;
+        reorder_encode_job *job = &jobs[i];
+        if (!PyTuple_Check(job_args))
+        {
+            PyErr_SetString(PyExc_TypeError, "Invalid job, expected a tuple");
+            goto exit;
+        }
+        if (!PyArg_ParseTuple(job_args, "iiOiiiiii",
+            &job->ifm_ublock_depth,
+            &job->ofm_ublock_depth,
+            &input_object,
+            &job->ofm_block_depth,
+            &job->is_depthwise,
+            &job->is_partkernel,
+            &job->ifm_bitdepth,
+            &job->decomp_h,
+            &job->decomp_w))
+            goto exit;
+        if (!prepare_reorder_encode_job(job, input_object))
+            goto exit;
     }
-    uint8_t* output_buffer = NULL;
-    int64_t padded_length;
-
-    int output_length = mlw_reorder_encode(
-        ifm_ublock_depth,
-        ofm_ublock_depth,
-        ofm_depth,
-        kernel_height,
-        kernel_width,
-        ifm_depth,
-        brick_strides,
-        brick_weights,
-        ofm_block_depth,
-        is_depthwise,
-        is_partkernel,
-        ifm_bitdepth,
-        decomp_h,
-        decomp_w,
-        &output_buffer,
-        &padded_length,
-        verbose);
-
-    PyObject *output_byte_array = PyByteArray_FromStringAndSize((char*)output_buffer, output_length);
-    PyObject *padded_length_obj = Py_BuildValue("i", padded_length);
 
-    /* Discard the output buffer */
-    mlw_free_outbuf(output_buffer);
+    Py_BEGIN_ALLOW_THREADS
+    for (Py_ssize_t i = 0; i < num_jobs; i++)
+        run_reorder_encode_job(&jobs[i], verbose);
+    Py_END_ALLOW_THREADS
 
-    PyObject* ret = PyTuple_Pack(2, output_byte_array, padded_length_obj);
+    ret = PyList_New(num_jobs);
+    if (ret == NULL)
+        goto exit;
+    for (Py_ssize_t i = 0; i < num_jobs; i++)
+    {
+        PyObject *result = reorder_encode_job_result(&jobs[i]);
+        if (result == NULL)
+        {
+            Py_CLEAR(ret);
+            goto exit;
+        }
+        PyList_SET_ITEM(ret, i, result);
+    }
 
-    Py_DECREF(input_ndarray_object);
-    Py_DECREF(output_byte_array);
-    Py_DECREF(padded_length_obj);
+exit:
+    for (Py_ssize_t i = 0; i < num_jobs; i++)
+        release_reorder_encode_job(&jobs[i]);
+    free(jobs);
+    Py_DECREF(jobs_sequence);
     return ret;
 }
 
@@ -291,6 +426,7 @@ static PyMethodDef mlw_methods[] = {
     {"decode", method_decode, METH_VARARGS, "Python interface for decode"},
     {"encode", method_encode, METH_VARARGS, "Python interface for encode"},
     {"reorder_encode", method_reorder_encode, METH_VARARGS, "Python interface for reorder and encode"},
+    {"reorder_encode_batch", method_reorder_encode_batch, METH_VARARGS, "Python interface for reorder and encode of several volumes"},
     {NULL, NULL, 0, NULL}
 };
 
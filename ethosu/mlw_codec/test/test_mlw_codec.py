@@ -18,6 +18,7 @@
 from typing import Any
 from typing import List
 
+import numpy as np
 import pytest
 
 from ethosu import mlw_codec
@@ -77,3 +78,22 @@ class TestMLWCodec:
     def test_decode_invalid_input(self, input):
         with pytest.raises(Exception):
             mlw_codec.decode(input)
+
+    def test_reorder_encode_batch(self):
+        rng = np.random.default_rng(0)
+        jobs = []
+        for ofm_depth, kernel, ifm_depth, is_depthwise, is_partkernel in [
+            (16, 3, 8, False, False),
+            (8, 1, 32, False, True),
+            (32, 3, 1, True, False),
+        ]:
+            volume = rng.integers(-255, 256, size=(ofm_depth, kernel, kernel, ifm_depth), dtype=np.int16)
+            jobs.append((8, 8, volume, 16, is_depthwise, is_partkernel, 8, 8, 8))
+        expected = [mlw_codec.reorder_encode(*job) for job in jobs]
+        assert mlw_codec.reorder_encode_batch(jobs) == expected
+        assert mlw_codec.reorder_encode_batch([]) == []
+
+    @pytest.mark.parametrize("jobs", [None, [None], [(8, 8)], [(8, 8, np.zeros((2, 2)), 16, 0, 0, 8, 8, 8)]])
+    def test_reorder_encode_batch_invalid_input(self, jobs):
+        with pytest.raises(Exception):
+            mlw_codec.reorder_encode_batch(jobs)
@@ -13,6 +13,6 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import pkg_resources
+from importlib.metadata import version
 
-__version__ = pkg_resources.get_distribution("ethos-u-vela").version
+__version__ = version("ethos-u-vela")
@@ -17,15 +17,17 @@
 # Description: Architecture SHRAM allocator
 import enum
 import math
-from typing import Dict
 from typing import Optional
 from typing import Tuple
 from typing import Union
 
+import numpy as np
+
 from .architecture_features import ArchitectureFeatures
 from .architecture_features import Block
 from .architecture_features import SHRAMConfig
 from .architecture_features import SHRAMElements
+from .compilation_context import CompilationContext
 from .ethos_u55_regs.ethos_u55_regs import resampling_mode
 from .numeric_util import round_up
 from .numeric_util import round_up_divide
@@ -133,6 +135,46 @@ def _try_block_config(
     return layout
 
 
+def _fits_shram(
+    shram: SHRAMConfig,
+    ew_usage: ElementwiseUsage,
+    ofm_width: np.ndarray,
+    ofm_height: np.ndarray,
+    ofm_depth: np.ndarray,
+    ifm_width: np.ndarray,
+    ifm_height: np.ndarray,
+    ifm_depth: np.ndarray,
+    ifm_bits: int,
+    ifm_granule: int,
+    acc_bits: int,
+    acc_granule: int,
+    lut_banks: int,
+    ifm_depth_buf_scaling: int,
+    cores: int,
+) -> np.ndarray:
+    """Returns for each of the given IFM/OFM blocks whether _try_block_config would find a SHRAM layout for it"""
+    # Scale depth with cores
+    ifm_depth = round_up_divide(ifm_depth, ifm_depth_buf_scaling)
+    ofm_depth = round_up_divide(ofm_depth, cores)
+
+    # Aways need IFM space, ifm_bits is a multiple of 8
+    ifm_bytes = ifm_width * ifm_height * round_up(ifm_depth * (ifm_bits // 8), 8)
+    ifm_banks = round_up_divide(ifm_bytes, shram.bank_size_bytes) * 2
+    ifm_banks = round_up(ifm_banks, ifm_granule)
+
+    # Calculate SHRAM boundaries of the IFM and Accumulators
+    lut_start = shram.total_banks - lut_banks
+    ifm_end = shram.reserved_output_banks + ifm_banks
+    if ew_usage == ElementwiseUsage.No:
+        acc_bytes = (ofm_width * ofm_height * round_up(ofm_depth, 8) * acc_bits) // 8
+        acc_banks = round_up_divide(acc_bytes, shram.bank_size_bytes) * 2
+        acc_banks = round_up(acc_banks, acc_granule)
+        # IFM must still fit before accumulators
+        return ifm_end <= lut_start - acc_banks
+    ifm2_banks = ifm_banks if ew_usage == ElementwiseUsage.Full else 0
+    return ifm_end + ifm2_banks <= lut_start
+
+
 def _choose_kernel_method(ifm_shape: Shape4D, ifm_bits: int, kernel: Kernel) -> bool:
     if ifm_shape.depth <= 8:
         return True
@@ -240,6 +282,51 @@ def find_block_config(
     lut_banks: int,
     scaled: bool,
     ifm_resampling: resampling_mode,
+) -> Optional[ArchitectureBlockConfig]:
+    # The results are cached in the compilation context, the architecture is part of the key by identity
+    kernel_key = (kernel.width, kernel.height, kernel.stride, kernel.dilation, kernel.valid_padding)
+    key = (
+        arch,
+        npu_op_type,
+        ofm_shape,
+        ifm_shape,
+        ifm2_shape,
+        uses_scalar,
+        ifm_bits,
+        kernel_key,
+        lut_banks,
+        scaled,
+        ifm_resampling,
+    )
+    return CompilationContext.current().block_config_cache.find(
+        key,
+        _find_block_config,
+        arch,
+        npu_op_type,
+        ofm_shape,
+        ifm_shape,
+        ifm2_shape,
+        uses_scalar,
+        ifm_bits,
+        kernel,
+        lut_banks,
+        scaled,
+        ifm_resampling,
+    )
+
+
+def _find_block_config(
+    arch: ArchitectureFeatures,
+    npu_op_type: NpuBlockType,
+    ofm_shape: Shape4D,
+    ifm_shape: Shape4D,
+    ifm2_shape: Optional[Shape4D],
+    uses_scalar: bool,
+    ifm_bits: int,
+    kernel: Kernel,
+    lut_banks: int,
+    scaled: bool,
+    ifm_resampling: resampling_mode,
 ) -> Optional[ArchitectureBlockConfig]:
     SplitDepth = ArchitectureFeatures.OFMSplitDepth
     # Elementwise larger-volume correction
@@ -294,97 +381,158 @@ def find_block_config(
     search_space = Shape4D.min(ofm_shape, Shape4D(arch.ofm_block_max.to_hwc()))
     search_space = Shape4D.round_up(search_space, Shape4D(arch.ofm_ublock.to_hwc()).with_depth(ofm_ublock_depth))
 
-    # Block WHC search, loops across the search space looking for best efficiency
-    best_cost = math.inf
-    best_coverage = math.inf
+    # Candidate OFM block depths, in search order
+    depths = []
     depth = max(arch.ofm_ublock.depth, min(search_space.depth, SplitDepth))
     if depth < ofm_shape.depth:
         depth = round_up(depth, SplitDepth)
-
     while depth <= search_space.depth:
-        wont_fit: Dict[Tuple[int, int], bool] = {}
-        for height in range(arch.ofm_ublock.height, search_space.height + 1, arch.ofm_ublock.height):
-            for width in range(arch.ofm_ublock.width, search_space.width + 1, arch.ofm_ublock.width):
-                # Avoid checking W/H transposed blocks that already didn't fit. i.e. if 8x4x16 didn't
-                # fit, then 4x8x16 won't either.
-                if wont_fit.get((height, width), False):
-                    continue
-
-                # Calculate the IFM block dimensions required to feed this OFM block
-                ofm_block = Shape4D(1, height, width, depth)
-                ifm_block = _get_ifm_blocksize(ofm_block, kernel, arch.ofm_ublock, arch.SubKernelMax, upscale, nearest)
-                if not is_equal_depth_op:
-                    ifm_block = ifm_block.with_depth(ifm_blockdepth)
-
-                # Test if the IFM/OFM blocks fit into SHRAM
-                ofm_block = fit_block_for_ofm(arch, ofm_shape, kernel, ofm_block)
-                layout = _try_block_config(
-                    arch.shram,
-                    ew_usage,
-                    Block(ofm_block.width, ofm_block.height, ofm_block.depth),
-                    Block(ifm_block.width, ifm_block.height, ifm_block.depth),
-                    ifm_bits,
-                    ifm_granule,
-                    acc_bits,
-                    acc_granule,
-                    lut_banks,
-                    ifm_depth_buf_scaling,
-                    arch.ncores,
-                )
-
-                if layout:
-                    full_blocks = Shape4D.div_round_up(ofm_shape, ofm_block)
-                    blocks = ofm_shape / ofm_block
-
-                    # Weights fetching
-                    weight_fetch = weight_fetch_wh * ifm_shape.depth * full_blocks.elements_wh()
-                    if not is_depthwise:
-                        weight_fetch *= ofm_block.depth * blocks.depth
-
-                    # IFM fetching
-                    ifm_fetch = ifm_block.elements_wh() * ifm_shape.depth * ifm_repeats * blocks.elements_wh()
-                    if not is_equal_depth_op:
-                        ifm_fetch *= full_blocks.depth
-
-                    # Scale relative to every output OFM element
-                    relative_cost = (ifm_fetch + weight_fetch) / ofm_shape.elements()
-
-                    # If the entire IFM can be encompassed by both buffers, bias to prefer this configuration
-                    if ifm_shape.elements() < ifm_block.elements() * 2:
-                        relative_cost = relative_cost / 2
-
-                    # Choose based on relative minimum cost or larger IFM area (if equal cost)
-                    if relative_cost <= best_cost:
-                        choose_this = False
-                        # Check IFM coverage only when it's equal best_cost and small OFM
-                        if relative_cost == best_cost:
-                            coverage_shape = Shape4D.min(ifm_shape, ifm_block)
-                            coverage = ifm_shape.elements_wh() / coverage_shape.elements_wh()
-                            # Small 4x4 IFM constraint found through analysis of networks
-                            if coverage <= best_coverage and (height <= 4 and width <= 4):
-                                best_coverage = coverage
-                                choose_this = True
-                        else:
-                            best_coverage = math.inf
-                            choose_this = True
-
-                        if choose_this:
-                            best_cost = relative_cost
-                            config.layout = layout
-                            config.bank_size = arch.shram_bank_size
-                            config.ifm_block = ifm_block
-                            config.ofm_block = Shape4D(1, height, width, depth)
-                else:
-                    wont_fit[(width, height)] = True
-
+        depths.append(depth)
         depth = depth + arch.ofm_ublock.depth
         if depth < ofm_shape.depth:
             depth = round_up(depth, SplitDepth)
 
-    if best_cost != math.inf:
-        return config
+    # Block WHC search, evaluates all candidate blocks of the search space at once. The candidates are indexed
+    # [depth, height, width], which is the order in which they are searched for the best efficiency.
+    depth = np.array(depths, dtype=np.int64)[:, None, None]
+    height = np.arange(arch.ofm_ublock.height, search_space.height + 1, arch.ofm_ublock.height)[None, :, None]
+    width = np.arange(arch.ofm_ublock.width, search_space.width + 1, arch.ofm_ublock.width)[None, None, :]
+    if depth.size == 0 or height.size == 0 or width.size == 0:
+        return None
 
-    return None
+    def fits_shram(depth, height, width):
+        # Calculate the IFM block dimensions required to feed the OFM blocks, see _get_ifm_blocksize
+        ifm_height = round_up(
+            round_up_divide(
+                (height - 1) * kernel.stride.y + min(kernel.area_height(), arch.SubKernelMax.height) + nearest, upscale
+            ),
+            arch.ofm_ublock.height,
+        )
+        ifm_width = round_up(
+            round_up_divide(
+                (width - 1) * kernel.stride.x + min(kernel.area_width(), arch.SubKernelMax.width) + nearest, upscale
+            ),
+            arch.ofm_ublock.width,
+        )
+        ifm_depth = depth if is_equal_depth_op else ifm_blockdepth
+        # Conv1D optimisation, see fit_block_for_ofm
+        if (ofm_shape.height == 1) and (kernel.height == 1) and (arch.ofm_ublock.height == 2):
+            height = np.minimum(height, ofm_shape.height)
+        fits = _fits_shram(
+            arch.shram,
+            ew_usage,
+            width,
+            height,
+            depth,
+            ifm_width,
+            ifm_height,
+            ifm_depth,
+            ifm_bits,
+            ifm_granule,
+            acc_bits,
+            acc_granule,
+            lut_banks,
+            ifm_depth_buf_scaling,
+            arch.ncores,
+        )
+        return np.broadcast_to(fits, (depth.size, height.size, width.size)), height, ifm_width, ifm_height, ifm_depth
+
+    # Blocks need more SHRAM the larger they are, so no block fits at the depths where the smallest block does not
+    smallest_fits = fits_shram(depth, height[:, :1], width[:, :, :1])[0].reshape(-1)
+    if not smallest_fits.all():
+        depth = depth[: np.argmin(smallest_fits)]
+        if depth.size == 0:
+            return None
+
+    # Test if the IFM/OFM blocks fit into SHRAM
+    fits, fit_height, ifm_width, ifm_height, ifm_depth = fits_shram(depth, height, width)
+
+    # Avoid checking W/H transposed blocks that already didn't fit. i.e. if 8x4x16 didn't fit, then 4x8x16 is not
+    # checked either. A block is skipped if its transpose was checked, at the same depth, earlier in the search.
+    transpose_height_idx = width // arch.ofm_ublock.height - 1
+    transpose_width_idx = height // arch.ofm_ublock.width - 1
+    transpose_checked = (
+        (width < height)
+        & (width % arch.ofm_ublock.height == 0)
+        & (transpose_height_idx < height.size)
+        & (height % arch.ofm_ublock.width == 0)
+        & (transpose_width_idx < width.size)
+    )
+    transpose_fits = fits[
+        :,
+        np.where(transpose_checked, transpose_height_idx, 0)[0],
+        np.where(transpose_checked, transpose_width_idx, 0)[0],
+    ]
+    fits = fits & ~(transpose_checked & ~transpose_fits)
+
+    # The evaluation order of the cost is the same for every block, so that equal costs compare as equal
+    full_blocks_height = round_up_divide(ofm_shape.height, fit_height)
+    full_blocks_width = round_up_divide(ofm_shape.width, width)
+    full_blocks_depth = round_up_divide(ofm_shape.depth, depth)
+    blocks_elements_wh = (ofm_shape.width / width) * (ofm_shape.height / fit_height)
+
+    # Weights fetching
+    weight_fetch = weight_fetch_wh * ifm_shape.depth * (full_blocks_width * full_blocks_height)
+    if not is_depthwise:
+        weight_fetch = weight_fetch * (depth * (ofm_shape.depth / depth))
+
+    # IFM fetching
+    ifm_fetch = (ifm_width * ifm_height * ifm_shape.depth * ifm_repeats) * blocks_elements_wh
+    if not is_equal_depth_op:
+        ifm_fetch = ifm_fetch * full_blocks_depth
+
+    # Scale relative to every output OFM element
+    relative_cost = (ifm_fetch + weight_fetch) / ofm_shape.elements()
+
+    # If the entire IFM can be encompassed by both buffers, bias to prefer this configuration
+    relative_cost = np.where(
+        ifm_shape.elements() < ifm_width * ifm_height * ifm_depth * 2, relative_cost / 2, relative_cost
+    )
+    relative_cost = np.where(fits, relative_cost, math.inf).reshape(-1)
+
+    # Choose based on relative minimum cost, the first block with the minimum cost is chosen unless a later one of
+    # the blocks with equal cost has a larger IFM area
+    best_cost = relative_cost.min()
+    if best_cost == math.inf:
+        return None
+    best_idx = np.argmax(relative_cost == best_cost)
+
+    # Check IFM coverage only when it's equal best_cost and small OFM. Small 4x4 IFM constraint found through
+    # analysis of networks.
+    equal_cost = (relative_cost == best_cost).reshape(fits.shape) & (height <= 4) & (width <= 4)
+    equal_cost = equal_cost.reshape(-1)
+    equal_cost[: best_idx + 1] = False
+    if equal_cost.any():
+        coverage = ifm_shape.elements_wh() / (
+            np.minimum(ifm_shape.width, ifm_width) * np.minimum(ifm_shape.height, ifm_height)
+        )
+        coverage = np.broadcast_to(coverage, fits.shape).reshape(-1)
+        best_coverage = coverage[equal_cost].min()
+        best_idx = np.flatnonzero(equal_cost & (coverage == best_coverage))[-1]
+
+    depth_idx, height_idx, width_idx = np.unravel_index(best_idx, fits.shape)
+    ofm_block = Shape4D(1, int(height[0, height_idx, 0]), int(width[0, 0, width_idx]), int(depth[depth_idx, 0, 0]))
+    ifm_block = _get_ifm_blocksize(ofm_block, kernel, arch.ofm_ublock, arch.SubKernelMax, upscale, nearest)
+    if not is_equal_depth_op:
+        ifm_block = ifm_block.with_depth(ifm_blockdepth)
+    fit_block = fit_block_for_ofm(arch, ofm_shape, kernel, ofm_block)
+    config.layout = _try_block_config(
+        arch.shram,
+        ew_usage,
+        Block(fit_block.width, fit_block.height, fit_block.depth),
+        Block(ifm_block.width, ifm_block.height, ifm_block.depth),
+        ifm_bits,
+        ifm_granule,
+        acc_bits,
+        acc_granule,
+        lut_banks,
+        ifm_depth_buf_scaling,
+        arch.ncores,
+    )
+    config.bank_size = arch.shram_bank_size
+    config.ifm_block = ifm_block
+    config.ofm_block = ofm_block
+    return config
 
 
 def try_block_config(
@@ -37,8 +37,6 @@ from .tensor import MemArea
 from .tensor import MemType
 from .tensor import TensorFormat
 from .tensor import TensorPurpose
-from .tflite_supported_operators import TFLiteSupportedOperators
-from .tosa_supported_operators import TosaSupportedOperators
 
 
 class Block:
@@ -193,6 +191,10 @@ SHRAMConfig = namedtuple(
     "SHRAMConfig", ["reserved_output_banks", "bank_size_bytes", "total_banks", "reserved_end_banks"]
 )
 
+ArchitectureConfig = namedtuple(
+    "ArchitectureConfig", "macs cores ofm_ublock ifm_ublock shram_banks shram_granules elem_units"
+)
+
 
 class ArchitectureFeatures:
     """This class is a container for various parameters of the Ethos-U core
@@ -205,9 +207,6 @@ class ArchitectureFeatures:
     - CompilerOptions is for changing the behaviour of the compiler
     """
 
-    ArchitectureConfig = namedtuple(
-        "ArchitectureConfig", "macs cores ofm_ublock ifm_ublock shram_banks shram_granules elem_units"
-    )
     accelerator_configs = {
         Accelerator.Ethos_U65_512: ArchitectureConfig(
             256, 2, Block(2, 2, 8), Block(2, 2, 8), 48, [8, 8, 8, 8, 16, 8, 16, 20], 8
@@ -404,9 +403,25 @@ class ArchitectureFeatures:
         self.block_config_map = dict()
         self.generate_block_config_map(Block(ifm_block_max.width * 2, ifm_block_max.height, 128))
 
-        # Setup supported operators and restriction checkers class
-        self.tflite_supported_operators = TFLiteSupportedOperators()
-        self.tosa_supported_operators = TosaSupportedOperators()
+        # Supported operators and restriction checkers classes, created on first use
+        self._tflite_supported_operators = None
+        self._tosa_supported_operators = None
+
+    @property
+    def tflite_supported_operators(self):
+        if self._tflite_supported_operators is None:
+            from .tflite_supported_operators import TFLiteSupportedOperators
+
+            self._tflite_supported_operators = TFLiteSupportedOperators()
+        return self._tflite_supported_operators
+
+    @property
+    def tosa_supported_operators(self):
+        if self._tosa_supported_operators is None:
+            from .tosa_supported_operators import TosaSupportedOperators
+
+            self._tosa_supported_operators = TosaSupportedOperators()
+        return self._tosa_supported_operators
 
     # Returns available number of SHRAM banks depending on activation lookup table
     # being used or not
@@ -18,6 +18,7 @@
 # Groups Operators in a schedule together to form Cascades.
 from .numeric_util import round_up
 from .operation import NpuBlockType
+from .profiler import Profiler
 from .shape4d import Shape4D
 
 non_cascadable_blocks = (
@@ -113,6 +114,7 @@ class CascadeBuilder:
 
         return ifm_size + ifm2_size + ofm_size + self.non_local_mem_usage.get(sched_op, 0)
 
+    @Profiler.profile
     def build_cascades(self, ref_schedule, fallback_schedule, guiding_mem_limit):
         ref_cost = ref_schedule.cost_map
         fallback_cost = fallback_schedule.cost_map
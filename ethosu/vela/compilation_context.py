@@ -0,0 +1,87 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description:
+# Holds the state that is built up while compiling a network, so that several networks can be compiled in the same
+# process without sharing any state.
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from uuid import UUID
+
+from .errors import VelaError
+from .memo_cache import MemoCache
+
+
+class CompilationContext:
+    """State of the compilation of one network: the debug database tables, the compressed weight cache, the tensor
+    addresses and the equivalence ids that are shared by tensors with the same values.
+
+    A context is activated for the duration of a compilation with activate(), and the compiler gets the active
+    context with CompilationContext.current(). The active context is stored in a context variable, so every thread
+    has its own active context. There is no default context: callers of the compiler other than vela.process, such
+    as the tests, must activate a context first.
+
+    The weight encoder pool and the persistent weight cache are not held by the context. They are configured once by
+    the command line interface and are shared by all compilations in the process."""
+
+    def __init__(self):
+        # Tables of the DebugDatabase, and whether it prints warnings
+        self.debug_source_uid: Dict[Any, int] = {}
+        self.debug_source_table: List[List] = []
+        self.debug_optimised_uid: Dict[Any, Tuple[int, int]] = {}
+        self.debug_optimised_table: List[List] = []
+        self.debug_queue_table: List[List[int]] = []
+        self.debug_stream_uid: Dict[Any, int] = {}
+        self.debug_stream_table: List[List[int]] = []
+        self.debug_show_warnings = False
+        # CompressedWeightCache, weight compression config -> tensor with the compressed weights
+        self.compressed_weights: Dict[Any, Any] = {}
+        # TensorAddressMap, tensor equivalence id -> dict (mem_type -> address)
+        self.tensor_addresses: Dict[UUID, Dict] = defaultdict(dict)
+        # Equivalence ids created by create_equivalence_id, key -> equivalence id
+        self.equivalence_ids: Dict[Any, UUID] = {}
+        # find_block_config, the scheduler searches for the block configs of the same shapes for every stripe and
+        # every schedule it proposes
+        self.block_config_cache = MemoCache("Block config", 4096)
+        # Cycle model of npu_performance, the scheduler measures the same queries for every schedule it proposes
+        self.cycle_cost_cache = MemoCache("Cycle cost", 16384)
+        self.element_access_cache = MemoCache("Element access", 16384)
+        # Profile of the compiler stages, set while the Profiler is started
+        self.profile: Optional[Any] = None
+
+    @staticmethod
+    def current() -> "CompilationContext":
+        context = _active_context.get()
+        if context is None:
+            raise VelaError("No compilation context is active, compile within CompilationContext().activate()")
+        return context
+
+    @contextmanager
+    def activate(self):
+        token = _active_context.set(self)
+        try:
+            yield self
+        finally:
+            _active_context.reset(token)
+
+
+_active_context = ContextVar("compilation_context", default=None)
@@ -15,6 +15,7 @@
 # limitations under the License.
 # Description:
 # Contains the main sequencing of the compiler.
+import enum
 import time
 
 from . import extract_npu_subgraphs
@@ -33,6 +34,7 @@ from .debug_database import DebugDatabase
 from .nn_graph import PassPlacement
 from .nn_graph import TensorAllocator
 from .operation import Op
+from .profiler import Profiler
 from .rewrite_graph import verify_graph_health
 from .rewrite_graph import visit_graph_post_order
 from .scheduler import OptimizationStrategy
@@ -41,6 +43,17 @@ from .tensor import MemType
 from .tensor import Tensor
 
 
+class GraphChecks(enum.Enum):
+    """Selects which of the graph health checks that are done between the compiler stages are run"""
+
+    Off = "off"  # No checks
+    Final = "final"  # A single check of the graph that is passed to the scheduler
+    All = "all"  # Checks after every stage
+
+    def __str__(self):
+        return self.value
+
+
 class CompilerOptions:
     """Set of options to change compiler behaviour - verbosity, targets, turning off passes.
 
@@ -63,8 +76,10 @@ class CompilerOptions:
         show_cpu_operations=False,
         tensor_allocator=TensorAllocator.Greedy,
         timing=False,
+        profile=False,
         output_dir="outputs",
         cpu_tensor_alignment=Tensor.AllocationQuantum,
+        graph_checks=GraphChecks.Final,
     ):
 
         self.verbose_graph = verbose_graph
@@ -80,8 +95,10 @@ class CompilerOptions:
         self.show_cpu_operations = show_cpu_operations
         self.tensor_allocator = tensor_allocator
         self.timing = timing
+        self.profile = profile
         self.output_dir = output_dir
         self.cpu_tensor_alignment = cpu_tensor_alignment
+        self.graph_checks = graph_checks
 
     def __str__(self):
         return type(self).__name__ + ": " + str(self.__dict__)
@@ -145,32 +162,58 @@ def _check_schedule(nng, arch, scheduler_options):
             )
 
 
+def _check_graph_health(nng, options, stage, skipped_stages, final=False):
+    """Runs the graph health check after the stage if the graph checks option selects it. With timing, the time saved
+    by each skipped check is estimated as the time taken by the final check, which is reported after it"""
+    if options.graph_checks == GraphChecks.All or (final and options.graph_checks == GraphChecks.Final):
+        if options.timing:
+            start = time.time()
+        with Profiler.stage("graph_check"):
+            assert verify_graph_health(nng)
+        if options.timing:
+            duration = time.time() - start
+            print("Graph check after %s took %f s" % (stage, duration))
+            if final:
+                for skipped_stage in skipped_stages:
+                    print("Graph check after %s skipped, saved about %f s" % (skipped_stage, duration))
+    elif options.timing:
+        skipped_stages.append(stage)
+        if options.graph_checks == GraphChecks.Off:
+            print("Graph check after %s skipped" % stage)
+
+
 def compiler_driver(nng, arch, options, scheduler_options, network_type):
-    assert verify_graph_health(nng)
+    skipped_graph_checks = []
+    _check_graph_health(nng, options, "model reading", skipped_graph_checks)
 
     # Pre-optimisation operator tracking
     for sg in nng.subgraphs:
         visit_graph_post_order(sg.output_tensors, arch, [], [_record_operator])
 
-    nng = graph_optimiser.optimise_graph(nng, arch, network_type, options.verbose_graph)
-    assert verify_graph_health(nng)
+    with Profiler.stage("graph_optimisation"):
+        nng = graph_optimiser.optimise_graph(nng, arch, network_type, options.verbose_graph)
+    _check_graph_health(nng, options, "graph optimisation", skipped_graph_checks)
 
     if options.verbose_quantization:
         nng.print_graph_with_tensor_quantization()
 
-    nng = mark_tensors.mark_tensor_purpose(nng, arch, options.verbose_tensor_purpose)
-    assert verify_graph_health(nng)
-    pass_packing.pack_into_passes(nng, arch, options.verbose_packing)
-    assert verify_graph_health(nng)
+    with Profiler.stage("mark_tensors"):
+        nng = mark_tensors.mark_tensor_purpose(nng, arch, options.verbose_tensor_purpose)
+    _check_graph_health(nng, options, "tensor purpose marking", skipped_graph_checks)
+    with Profiler.stage("pass_packing"):
+        pass_packing.pack_into_passes(nng, arch, options.verbose_packing)
+    _check_graph_health(nng, options, "pass packing", skipped_graph_checks)
 
-    extract_npu_subgraphs.extract_npu_subgraphs(nng, arch)
+    with Profiler.stage("extract_npu_subgraphs"):
+        extract_npu_subgraphs.extract_npu_subgraphs(nng, arch)
 
-    assert verify_graph_health(nng)
+    _check_graph_health(nng, options, "NPU subgraph extraction", skipped_graph_checks, final=True)
     if options.timing:
         start = time.time()
 
     # Run the scheduler
-    scheduler.schedule_passes(nng, arch, options, scheduler_options)
+    with Profiler.stage("scheduling"):
+        scheduler.schedule_passes(nng, arch, options, scheduler_options)
     _check_schedule(nng, arch, scheduler_options)
 
     if options.timing:
@@ -218,18 +261,22 @@ def compiler_driver(nng, arch, options, scheduler_options, network_type):
 
     # Generate command streams and serialise Npu-ops into tensors
     for sg in npu_subgraphs:
-        high_level_command_stream_generator.generate_high_level_command_stream_for_schedule(
-            nng, sg, arch, options.verbose_high_level_command_stream
-        )
-        lut.optimize_high_level_cmd_stream(sg, arch)
-        high_level_command_to_npu_op.generate_register_command_stream_for_sg(
-            nng, sg, arch, options.verbose_register_command_stream
-        )
-        scratch_tens, scratch_fast_tens, flash_tens = npu_serialisation.serialise_npu_subgraph_into_tensors(
-            sg, arch, scratch_tens, scratch_fast_tens, flash_tens
-        )
+        with Profiler.stage("high_level_command_stream"):
+            high_level_command_stream_generator.generate_high_level_command_stream_for_schedule(
+                nng, sg, arch, options.verbose_high_level_command_stream
+            )
+            lut.optimize_high_level_cmd_stream(sg, arch)
+        with Profiler.stage("register_command_stream"):
+            high_level_command_to_npu_op.generate_register_command_stream_for_sg(
+                nng, sg, arch, options.verbose_register_command_stream
+            )
+        with Profiler.stage("npu_serialisation"):
+            scratch_tens, scratch_fast_tens, flash_tens = npu_serialisation.serialise_npu_subgraph_into_tensors(
+                sg, arch, scratch_tens, scratch_fast_tens, flash_tens
+            )
 
-    npu_serialisation.rewrite_npu_call_ops(root_sg, arch)
+    with Profiler.stage("npu_serialisation"):
+        npu_serialisation.rewrite_npu_call_ops(root_sg, arch)
 
     # Set Scratch and Fast_scratch Tensor size
     if scratch_tens is not None:
@@ -250,4 +297,5 @@ def compiler_driver(nng, arch, options, scheduler_options, network_type):
         cpu_tensor_alignment=options.cpu_tensor_alignment,
     )
 
-    npu_performance.calc_new_performance_for_network(nng, arch)
+    with Profiler.stage("performance_estimation"):
+        npu_performance.calc_new_performance_for_network(nng, arch)
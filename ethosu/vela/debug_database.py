@@ -15,74 +15,67 @@
 # limitations under the License.
 import csv
 import io
-from typing import Any
-from typing import Dict
 from typing import List
-from typing import Tuple
-from typing import Union
-
-import lxml.etree as xml
+from typing import TYPE_CHECKING
 
 from . import numeric_util
+from .compilation_context import CompilationContext
 from .operation import Operation
 from .shape4d import Shape4D
 
+if TYPE_CHECKING:
+    import lxml.etree as xml
+
 
 class DebugDatabase:
     NULLREF = -1
-    show_warnings = False
 
     SOURCE_TABLE = "source"
-    _sourceUID: Dict[Any, int] = {}
     _sourceHeaders = ["id", "operator", "kernel_w", "kernel_h", "ofm_w", "ofm_h", "ofm_d"]
-    _sourceTable: List[List[Union[float, int, str]]] = []
 
     OPTIMISED_TABLE = "optimised"
-    _optimisedUID: Dict[Any, Tuple[int, int]] = {}
     _optimisedHeaders = ["id", "source_id", "operator", "kernel_w", "kernel_h", "ofm_w", "ofm_h", "ofm_d"]
-    _optimisedTable: List[List[Union[float, int, str]]] = []
 
     QUEUE_TABLE = "queue"
     _queueHeaders = ["offset", "cmdstream_id", "optimised_id"]
-    _queueTable: List[List[int]] = []
 
     STREAM_TABLE = "cmdstream"
-    _streamUID: Dict[Any, int] = {}
     _streamHeaders = ["id", "file_offset"]
-    _streamTable: List[List[int]] = []
 
     @classmethod
     def add_source(cls, op: Operation):
         assert isinstance(op, Operation)
-        uid = len(cls._sourceUID)
-        cls._sourceUID[op] = uid
+        context = CompilationContext.current()
+        uid = len(context.debug_source_uid)
+        context.debug_source_uid[op] = uid
         ofm_shape = numeric_util.full_shape(3, op.outputs[0].shape, 1)
-        cls._sourceTable.append(
+        context.debug_source_table.append(
             [uid, str(op.type), op.kernel.width, op.kernel.height, ofm_shape[-2], ofm_shape[-3], ofm_shape[-1]]
         )
 
     @classmethod
     def add_optimised(cls, parent: Operation, op: Operation):
         assert isinstance(parent, Operation) and isinstance(op, Operation)
-        if op not in cls._optimisedUID:
-            if parent not in cls._sourceUID:
+        context = CompilationContext.current()
+        if op not in context.debug_optimised_uid:
+            if parent not in context.debug_source_uid:
                 # The the parent wasn't in the source network try to look it
                 # up in the optimised network and use that op's source parent.
-                if parent in cls._optimisedUID:
-                    src_uid = cls._optimisedUID[parent][1]
+                if parent in context.debug_optimised_uid:
+                    src_uid = context.debug_optimised_uid[parent][1]
                 else:
-                    if DebugDatabase.show_warnings:
+                    if context.debug_show_warnings:
                         print("Debug Database: Associated parent '{0}' not in network".format(parent.type))
                     src_uid = DebugDatabase.NULLREF
             else:
-                src_uid = cls._sourceUID[parent]
-            uid = len(cls._optimisedUID)
-            cls._optimisedUID[op] = (uid, src_uid)
+                src_uid = context.debug_source_uid[parent]
+            uid = len(context.debug_optimised_uid)
+            context.debug_optimised_uid[op] = (uid, src_uid)
             if len(op.ofm_shapes) == 0:
                 ofm_shape = Shape4D(op.outputs[0].shape)
             else:
                 ofm_shape = op.ofm_shapes[0]
-            cls._optimisedTable.append(
+            context.debug_optimised_table.append(
                 [
                     uid,
                     src_uid,
@@ -97,26 +90,31 @@ class DebugDatabase:
 
     @classmethod
     def add_stream(cls, key):
-        if key not in cls._streamUID:
-            uid = len(cls._streamUID)
-            cls._streamUID[key] = uid
+        context = CompilationContext.current()
+        if key not in context.debug_stream_uid:
+            uid = len(context.debug_stream_uid)
+            context.debug_stream_uid[key] = uid
         return uid
 
     @classmethod
     def set_stream_offset(cls, key, file_offset: int):
-        assert key in cls._streamUID
-        uid = cls._streamUID[key]
-        cls._streamTable.append([uid, file_offset])
+        context = CompilationContext.current()
+        assert key in context.debug_stream_uid
+        uid = context.debug_stream_uid[key]
+        context.debug_stream_table.append([uid, file_offset])
 
     @classmethod
     def add_command(cls, stream_id: int, offset: int, op: Operation):
-        assert stream_id < len(cls._streamUID)
-        assert op in cls._optimisedUID, "Optimised operator must exist before code generation"
-        optimised_id = cls._optimisedUID[op][0]
-        cls._queueTable.append([offset, stream_id, optimised_id])
+        context = CompilationContext.current()
+        assert stream_id < len(context.debug_stream_uid)
+        assert op in context.debug_optimised_uid, "Optimised operator must exist before code generation"
+        optimised_id = context.debug_optimised_uid[op][0]
+        context.debug_queue_table.append([offset, stream_id, optimised_id])
 
     @classmethod
-    def _write_table(cls, root: xml.Element, name: str, headers: List[str], table):
+    def _write_table(cls, root: "xml.Element", name: str, headers: List[str], table):
+        import lxml.etree as xml
+
         # Convert table to CSV
         out = io.StringIO()
         writer = csv.writer(out, quoting=csv.QUOTE_NONNUMERIC)
@@ -129,11 +127,15 @@ class DebugDatabase:
 
     @classmethod
     def write(cls, file_path: str, input_file: str, output_file: str):
+        # lxml is only imported when a debug database is written
+        import lxml.etree as xml
+
         root = xml.Element("debug", {"source": input_file, "optimised": output_file})
 
-        cls._write_table(root, cls.SOURCE_TABLE, cls._sourceHeaders, cls._sourceTable)
-        cls._write_table(root, cls.OPTIMISED_TABLE, cls._optimisedHeaders, cls._optimisedTable)
-        cls._write_table(root, cls.QUEUE_TABLE, cls._queueHeaders, cls._queueTable)
-        cls._write_table(root, cls.STREAM_TABLE, cls._streamHeaders, cls._streamTable)
+        context = CompilationContext.current()
+        cls._write_table(root, cls.SOURCE_TABLE, cls._sourceHeaders, context.debug_source_table)
+        cls._write_table(root, cls.OPTIMISED_TABLE, cls._optimisedHeaders, context.debug_optimised_table)
+        cls._write_table(root, cls.QUEUE_TABLE, cls._queueHeaders, context.debug_queue_table)
+        cls._write_table(root, cls.STREAM_TABLE, cls._streamHeaders, context.debug_stream_table)
 
         xml.ElementTree(root).write(file_path, encoding="utf-8", xml_declaration=True, pretty_print=True)
@@ -15,7 +15,8 @@
 # limitations under the License.
 # Description:
 # Creates driver actions that are embedded in the custom operator payload.
-import struct
+import sys
+from array import array
 from typing import List
 
 import numpy as np
@@ -118,8 +119,8 @@ def emit_dump_shram(data: List[int]):
     data.append(make_da_tag(DACommands.DumpSHRAM, 0, 0))
 
 
-def create_driver_payload(register_command_stream: List[int], arch: ArchitectureFeatures) -> bytes:
-    """Creates driver header and includes the given command"""
+def create_driver_payload_words(register_command_stream: List[int], arch: ArchitectureFeatures) -> array:
+    """Creates driver header and includes the given command stream, as an array of little endian 32-bit words"""
     # Prepare driver actions for this command tensor
     da_list: List[int] = []
     emit_fourcc(da_list, "COP1")
@@ -132,10 +133,18 @@ def create_driver_payload(register_command_stream: List[int], arch: Architecture
 
     emit_cmd_stream_header(da_list, len(register_command_stream))
 
-    # Append command stream words
-    da_list.extend(register_command_stream)
-    # Convert to bytes, in little endian format
-    return struct.pack("<{0}I".format(len(da_list)), *da_list)
+    # Append command stream words, this is a single copy if the command stream is an array
+    payload = array("I", da_list)
+    assert payload.itemsize == 4
+    payload.extend(register_command_stream)
+    if sys.byteorder != "little":
+        payload.byteswap()
+    return payload
+
+
+def create_driver_payload(register_command_stream: List[int], arch: ArchitectureFeatures) -> bytes:
+    """Creates driver header and includes the given command"""
+    return create_driver_payload_words(register_command_stream, arch).tobytes()
 
 
 def npu_create_driver_payload(register_command_stream: List[int], accelerator: NpuAccelerator) -> bytes:
@@ -69,6 +69,13 @@ class ConfigOptionError(VelaError):
         super().__init__(data)
 
 
+class CompileJobError(VelaError):
+    """Raised when a compile job that is sent to the compile server is invalid"""
+
+    def __init__(self, msg):
+        super().__init__(f"Invalid compile job: {msg}")
+
+
 class AllocationError(VelaError):
     """Raised when allocation fails"""
 
@@ -20,19 +20,22 @@ from .graph_optimiser_util import check_format_restrictions
 from .graph_optimiser_util import check_memory_only_removed
 from .graph_optimiser_util import record_optimised
 from .nn_graph import NetworkType
-from .tflite_graph_optimiser import tflite_optimise_graph
-from .tosa_graph_optimiser import tosa_optimise_graph
 
 
 def optimise_graph(nng, arch, network_type, verbose_graph=False):
     if verbose_graph:
         nng.print_graph("Before Graph Optimization")
 
+    # The graph optimiser of the network type is imported on first use
     if network_type == NetworkType.TFLite:
         # TensorFlow Lite graph optimization
+        from .tflite_graph_optimiser import tflite_optimise_graph
+
         nng = tflite_optimise_graph(nng, arch)
     else:
         # TOSA graph optimization
+        from .tosa_graph_optimiser import tosa_optimise_graph
+
         nng = tosa_optimise_graph(nng, arch)
 
     # Post-optimisation operator debug tracing, and checking that no undesired reshapes are left in the graph
@@ -16,12 +16,17 @@
 #
 # Description:
 # Tensor allocator based on a hill-climb search
+import bisect
 import random
+from operator import attrgetter
 from typing import List
 from typing import Set
 
+import numpy as np
+
 from . import numeric_util
 from .live_range import LiveRange
+from .live_range import LiveRangeTable
 
 
 class LiveRangeInfo:
@@ -103,7 +108,6 @@ class HillClimbAllocator:
             LiveRangeInfo(id, lr.start_time, lr.end_time, lr.size, lr.get_alignment())
             for id, lr in enumerate(live_ranges)
         ]
-        self.lrs_at_time: List[List[LiveRangeInfo]] = []
         # The available size (input to algorithm).
         self.available_size: int = 0
         # The algorithm stops once the target size has been achieved
@@ -112,63 +116,91 @@ class HillClimbAllocator:
         self.best_size: int = 1 << 63
         # For each live range: max value of size_at_time (only used in the heuristic allocation)
         self.lr_urgency = len(self.lrs) * [0]
-        nr_time_slots = 1 + max(lr.end_time for lr in self.lrs)
-        # Contains active live ranges at each timestamp
-        self.lrs_at_time = [[] for i in range(nr_time_slots)]
-        for lr in self.lrs:
-            for t in range(lr.start_time, lr.end_time + 1):
-                self.lrs_at_time[t].append(lr)
+        # The indices of the live ranges that were allocated by the latest allocation, in allocation order
+        self.allocated_indices: List[int] = []
+        # For each turn of the latest allocation: the highest end address of the live ranges allocated so far
+        self.size_at_turn: List[int] = []
+        table = LiveRangeTable(self.lrs)
         # At each timestamp: accumulated size of active live ranges
-        size_at_time = [sum(lr.size for lr in self.lrs_at_time[t]) for t in range(nr_time_slots)]
+        size_at_time = table.usage()
         # The minimum possible size, assuming all live ranges can be perfectly allocated
-        self.min_required_size: int = max(size_at_time)
-        # Calculate all neighbours + the urgency of each live range
+        self.min_required_size: int = int(size_at_time.max())
+        # Calculate all neighbours + the urgency of each live range. The neighbours are ordered by the first
+        # timestamp at which both live ranges are active, and then by id.
+        ids = np.arange(len(self.lrs))
         for lr in self.lrs:
-            lr.urgency = 0
-            lr.neighbours = []
-            neighbours = set()
-            for t in range(lr.start_time, lr.end_time + 1):
-                lr.urgency = max(size_at_time[t], lr.urgency)
-                for lr2 in self.lrs_at_time[t]:
-                    if lr2 not in neighbours and lr != lr2:
-                        neighbours.add(lr2)
-                        lr.neighbours.append(lr2)
+            lr.address = HillClimbAllocator.NOT_ALLOCATED
+            lr.urgency = int(size_at_time[lr.start_time : lr.end_time + 1].max(initial=0))
+            first_times = np.maximum(table.start_times, lr.start_time)
+            overlapping = (first_times <= np.minimum(table.end_times, lr.end_time)) & (ids != lr.id)
+            neighbour_ids = ids[overlapping][np.lexsort((ids[overlapping], first_times[overlapping]))]
+            lr.neighbours = [self.lrs[i] for i in neighbour_ids]
 
     def allocate_lr(self, lr: LiveRangeInfo):
         """
         Allocates the given live range at the smallest possible address
         """
+        allocated = [lr2 for lr2 in lr.neighbours if lr2.address != HillClimbAllocator.NOT_ALLOCATED]
+        # Visit the allocated neighbours in address order; the address is moved past every neighbour that
+        # overlaps with it, until a neighbour is found that starts above the live range.
         address = 0
+        for lr2 in sorted(allocated, key=attrgetter("address")):
+            if lr2.address >= address + lr.size:
+                break
+            if lr2.end_address > address:
+                address = numeric_util.round_up(lr2.end_address, lr.min_alignment)
         predecessor = HillClimbAllocator.NO_PREDECESSOR
-        fits = False
-        while not fits:
-            fits = True
-            # Find neighbours that overlap with address
-            for lr2 in lr.neighbours:
-                if lr2.address == HillClimbAllocator.NOT_ALLOCATED or lr2.end_address <= address:
-                    continue
-                if lr2.overlaps(address, lr.size):
-                    # Overlap found increase address
-                    fits = False
-                    address = numeric_util.round_up(lr2.end_address, lr.min_alignment)
-                    predecessor = lr2.id
+        if address > 0:
+            # The predecessor is a neighbour whose end address rounds up to the allocated address
+            candidates = [lr2 for lr2 in allocated if address - lr.min_alignment < lr2.end_address <= address]
+            if len(candidates) == 1:
+                predecessor = candidates[0].id
+            else:
+                predecessor = self.find_predecessor(lr, allocated, address)
         lr.address = address
         lr.end_address = address + lr.size
         lr.predecessor = predecessor
 
+    def find_predecessor(self, lr: LiveRangeInfo, allocated: List[LiveRangeInfo], address: int) -> int:
+        """
+        Returns the id of the neighbour that moves the live range to the given address, when the neighbours
+        are scanned in order and the live range is moved past every neighbour that overlaps with it.
+        """
+        current_address = 0
+        while True:
+            for lr2 in allocated:
+                if lr2.end_address > current_address and lr2.address < current_address + lr.size:
+                    current_address = numeric_util.round_up(lr2.end_address, lr.min_alignment)
+                    if current_address == address:
+                        return lr2.id
+
     def allocate_indices(self, indices: List[int]):
         """
         Allocates the live ranges in the order indicated by the indices;
         allocates each live range at the lowest possible address.
+        Live ranges that were allocated in the same turns by the previous call keep their addresses;
+        only the live ranges from the first changed turn onwards are allocated again.
         """
-        for lr in self.lrs:
-            lr.address = HillClimbAllocator.NOT_ALLOCATED
-        size = 0
-        for turn, index in enumerate(indices):
-            lr = self.lrs[index]
+        turn = 0
+        while turn < len(self.allocated_indices) and indices[turn] == self.allocated_indices[turn]:
+            turn += 1
+        # Stop at the first kept turn that is worse than the best known allocation
+        stop_turn = bisect.bisect_right(self.size_at_turn, self.best_size, 0, turn)
+        nr_kept_turns = min(turn, stop_turn + 1)
+        for index in self.allocated_indices[nr_kept_turns:]:
+            self.lrs[index].address = HillClimbAllocator.NOT_ALLOCATED
+        del self.allocated_indices[nr_kept_turns:]
+        del self.size_at_turn[nr_kept_turns:]
+        size = self.size_at_turn[-1] if self.size_at_turn else 0
+        if stop_turn < turn:
+            return size
+        for turn in range(nr_kept_turns, len(indices)):
+            lr = self.lrs[indices[turn]]
             self.allocate_lr(lr)
             lr.turn = turn
             size = max(size, lr.end_address)
+            self.allocated_indices.append(lr.id)
+            self.size_at_turn.append(size)
             if size > self.best_size:
                 # This allocation is worse than the best known allocation;
                 # no need to continue
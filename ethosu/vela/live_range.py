@@ -111,24 +111,48 @@ class LiveRange:
         self.alignment = max(self.alignment, alignment)
 
 
+class LiveRangeTable:
+    """Start times, inclusive end times and sizes of a list of live ranges, stored in arrays"""
+
+    def __init__(self, live_ranges):
+        count = len(live_ranges)
+        self.start_times = np.fromiter((lr.start_time for lr in live_ranges), dtype=np.int64, count=count)
+        self.end_times = np.fromiter((lr.end_time for lr in live_ranges), dtype=np.int64, count=count)
+        self.sizes = np.fromiter((lr.size for lr in live_ranges), dtype=np.int64, count=count)
+
+    def usage(self, nr_time_slots=None) -> np.ndarray:
+        # Returns the accumulated size of the live ranges at each time slot. The sizes are added at the start times
+        # and subtracted after the end times of a difference array, which is then summed up.
+        if nr_time_slots is None:
+            nr_time_slots = 1 + int(self.end_times.max())
+        ends = np.minimum(self.end_times + 1, nr_time_slots)
+        used = self.start_times < ends
+        diff = np.zeros(nr_time_slots + 1, dtype=np.int64)
+        np.add.at(diff, self.start_times[used], self.sizes[used])
+        np.add.at(diff, ends[used], -self.sizes[used])
+        return np.cumsum(diff[:-1])
+
+
 class LiveRangeGraph:
     def __init__(self):
         self.lrs: List[LiveRange] = []  # List of all created ranges
         self.ranges = {}  # tens -> range
+        self.equivalence_ranges = {}  # tens.equivalence_id -> range of the first tensor in ranges with that id
         self.processed_subgraphs = set()
         self.current_time = 0
         self.end_time = None
 
     def get_or_create_range(self, tens, alignment=Tensor.AllocationQuantum):
         # Return the live range of the tensor (or any of its clones)
-        for existing_tensor, rng in self.ranges.items():
-            if tens.equivalent(existing_tensor):
-                rng.set_alignment(alignment)
-                return rng
+        rng = self.equivalence_ranges.get(tens.equivalence_id)
+        if rng is not None:
+            rng.set_alignment(alignment)
+            return rng
 
         # No live range found for the tensor, create a new one
         rng = LiveRange(tens, alignment)
         self.ranges[tens] = rng
+        self.equivalence_ranges[tens.equivalence_id] = rng
         self.lrs.append(rng)
         return rng
 
@@ -137,6 +161,7 @@ class LiveRangeGraph:
         assert out_tens not in self.ranges, out_tens
         live_range.add_tensor(out_tens)
         self.ranges[out_tens] = live_range
+        self.equivalence_ranges.setdefault(out_tens.equivalence_id, live_range)
         return live_range
 
     def update_endtime(self):
@@ -144,13 +169,8 @@ class LiveRangeGraph:
         return self.end_time + 1
 
     def get_temporal_memory_usage(self, target_mem_area):
-        usage = np.zeros(self.update_endtime(), dtype=np.int32)
-        for lr in self.lrs:
-            if lr.mem_area == target_mem_area:
-                # End time is inclusive
-                usage[lr.start_time : lr.end_time + 1] += lr.size
-
-        return usage
+        lrs = [lr for lr in self.lrs if lr.mem_area == target_mem_area]
+        return LiveRangeTable(lrs).usage(self.update_endtime()).astype(np.int32)
 
 
 def tensor_should_be_ignored(tens, target_mem_area, target_mem_type_set):
@@ -286,6 +306,24 @@ def create_linear_live_range_graph(sg, target_mem_area, target_mem_type_set, lr_
     return lr_graph
 
 
+def mark_buffered_weights_usage(op_info, time_index, lr_graph, target_mem_area, target_mem_type_set):
+    # Marks the usage of the buffered weight tensors of an op that is scheduled at the given time
+    for idx, weight_tens in enumerate(op_info.buffered_weight_tensors):
+        if weight_tens.mem_type in target_mem_type_set and weight_tens.mem_area == target_mem_area:
+            rng = lr_graph.get_or_create_range(weight_tens)
+            start_time = time_index
+            length = 1
+            if weight_tens.pre_buffer:
+                start_time -= 1
+                length += 1
+            if len(op_info.buffered_weight_tensors) > 1:
+                last_idx = len(op_info.ofm_depth_slices) % len(op_info.buffered_weight_tensors)
+                # Double buffering: reduce end time of the buffer that is not used last
+                if last_idx != idx:
+                    length -= 1
+            rng.mark_usage(start_time, length)
+
+
 def _extract_live_ranges_from_schedule(sg, target_mem_area, target_mem_type_set, lr_graph):
     time_for_cascade = {}
     for sched_op in sg.sched_ops:
@@ -325,20 +363,7 @@ def _extract_live_ranges_from_schedule(sg, target_mem_area, target_mem_type_set,
 
             rng.mark_usage(time_to_set)
 
-        for idx, weight_tens in enumerate(op_info.buffered_weight_tensors):
-            if weight_tens.mem_type in target_mem_type_set and weight_tens.mem_area == target_mem_area:
-                rng = lr_graph.get_or_create_range(weight_tens)
-                start_time = time_to_set
-                length = 1
-                if weight_tens.pre_buffer:
-                    start_time -= 1
-                    length += 1
-                if len(op_info.buffered_weight_tensors) > 1:
-                    last_idx = len(op_info.ofm_depth_slices) % len(op_info.buffered_weight_tensors)
-                    # Double buffering: reduce end time of the buffer that is not used last
-                    if last_idx != idx:
-                        length -= 1
-                rng.mark_usage(start_time, length)
+        mark_buffered_weights_usage(op_info, time_to_set, lr_graph, target_mem_area, target_mem_type_set)
 
         if time_to_set == lr_graph.current_time:
             lr_graph.current_time += 2
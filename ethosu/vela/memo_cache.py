@@ -0,0 +1,69 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description:
+# Bounded memo cache for the results of the functions that the scheduler calls repeatedly with the same arguments.
+import threading
+from collections import OrderedDict
+
+# Marks a key that is not in the cache, as None is a valid result
+_MISSING = object()
+
+
+class MemoCache:
+    """Bounded, least recently used, cache of the results of a function. The cached results are shared between the
+    callers and must not be modified. The cache can be used from several threads, the function is called without
+    holding the lock, so it might be called more than once for the same key."""
+
+    def __init__(self, name: str, max_size: int):
+        self.name = name
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def find(self, key, function, *args):
+        """Returns the cached result for the key, or calls the function with the given arguments to create it"""
+        with self._lock:
+            result = self._entries.get(key, _MISSING)
+            if result is not _MISSING:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return result
+            self.misses += 1
+        result = function(*args)
+        with self._lock:
+            self._entries[key] = result
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = 100 * self.hits / lookups if lookups else 0
+        return (
+            f"{self.name} cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), {len(self)} entries"
+        )
@@ -15,10 +15,6 @@
 # limitations under the License.
 # Description:
 # Dispatcher for reading a neural network model.
-from . import tflite_model_semantic
-from . import tflite_reader
-from . import tosa_model_semantic
-from . import tosa_reader
 from .errors import InputFileError
 from .nn_graph import NetworkType
 
@@ -34,7 +30,11 @@ class ModelReaderOptions:
 
 
 def read_model(fname, options, feed_dict=None, output_node_names=None, initialisation_nodes=None):
+    # The reader of the network type is imported on first use
     if fname.endswith(".tflite"):
+        from . import tflite_model_semantic
+        from . import tflite_reader
+
         if feed_dict is None:
             feed_dict = {}
         if output_node_names is None:
@@ -53,6 +53,9 @@ def read_model(fname, options, feed_dict=None, output_node_names=None, initialis
 
         return (nng, NetworkType.TFLite)
     elif fname.endswith(".tosa"):
+        from . import tosa_model_semantic
+        from . import tosa_reader
+
         if feed_dict is None:
             feed_dict = {}
         if output_node_names is None:
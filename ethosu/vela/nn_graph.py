@@ -181,19 +181,36 @@ class Subgraph:
 
         print_visit = False
 
+        # The graph is traversed using an explicit stack of pending actions instead of recursion
+        stack = []
+
+        def visit(action, *args):
+            stack.append((action, *args))
+            while stack:
+                action, *args = stack.pop()
+                action(*args)
+
         def visit_op(op):
             if op in visit_op_set:
                 return
 
             visit_op_set.add(op)
-            for inp in op.inputs:
+            stack.append((finish_op, op))
+            for inp in reversed(op.inputs):
                 if not inp:
                     continue
-                if print_visit:
-                    print(inp, "adding consumer", op)
-                visit_tensor(inp)
-                inp.consumer_list.append(op)
+                stack.append((visit_input, inp, op))
+
+        def visit_input(inp, op):
+            if print_visit:
+                print(inp, "adding consumer", op)
+            stack.append((add_consumer, inp, op))
+            stack.append((visit_tensor, inp))
 
+        def add_consumer(inp, op):
+            inp.consumer_list.append(op)
+
+        def finish_op(op):
             if op.type in (Op.Placeholder, Op.SubgraphInput):
                 assert len(op.outputs) == 1
                 self.input_tensors.append(op.outputs[0])
@@ -207,8 +224,8 @@ class Subgraph:
                 return
             visit_tensor_set.add(tens)
             tens.consumer_list = []
-            for op in tens.ops:
-                visit_op(op)
+            for op in reversed(tens.ops):
+                stack.append((visit_op, op))
 
         for ps in self.passes:
             for tens in ps.outputs + ps.inputs:
@@ -217,15 +234,15 @@ class Subgraph:
                 tens.consumer_list = []  # reset unvisited tensors to start with
 
         for tens in self.output_tensors:
-            visit_tensor(tens)
+            visit(visit_tensor, tens)
             tens.consumer_list.append(None)  # special op to indicate that the graph consumes the result
 
         print_visit = True
         for ps in self.passes:
             for op in ps.ops:
-                visit_op(op)
+                visit(visit_op, op)
             for tens in ps.inputs:
-                visit_tensor(tens)
+                visit(visit_tensor, tens)
 
     def build_pass_links(self):
         for idx, ps in enumerate(self.passes):
@@ -19,11 +19,13 @@
 #
 # Called during scheduling to evaluate different proposals, as well as post-scheduling to provide a final performance
 # estimate.
-import copy
 from enum import auto
 from enum import IntEnum
+from typing import List
+from typing import NamedTuple
 from typing import Optional
 from typing import Set
+from typing import Tuple
 from uuid import UUID
 
 import numpy as np
@@ -34,6 +36,7 @@ from .architecture_features import Accelerator
 from .architecture_features import NpuBlockType
 from .architecture_features import SHRAMElements
 from .architecture_features import TensorFormat
+from .compilation_context import CompilationContext
 from .nn_graph import Graph
 from .numeric_util import round_up
 from .numeric_util import round_up_to_int
@@ -92,25 +95,45 @@ class PassCycles(IntEnum):
         )
 
 
-class PerformanceQuery:
-    def __init__(self, npu_block_type=0):
-        self.npu_block_type = npu_block_type
-        self.ifm_shape = Shape4D(0)
-        self.ifm_format = TensorFormat.NHWC
-        self.ifm_memory_area = MemArea.Unknown
-        self.ifm2_memory_area = MemArea.Unknown
-        self.ifm_bits = 0
-        self.ifm2_bits = 0
-        self.ifm2_shape = None
-        self.ifm2_format = TensorFormat.NHWC
-        self.ofm_shape = Shape4D(0)
-        self.ofm_format = TensorFormat.NHWC
-        self.ofm_memory_area = MemArea.Unknown
-        self.ofm_bits = 0
-        self.const_shape = Shape4D(0)
-        self.const_memory_area = MemArea.Unknown
-        self.kernel = Kernel(1, 1)
-        self.config = ArchitectureBlockConfig()
+class PerformanceQuery(NamedTuple):
+    """Immutable description of an operation for the performance model. Queries are hashable, and equal if the
+    performance model would give the same answer for them; the kernel and block config compare by value."""
+
+    npu_block_type: NpuBlockType = NpuBlockType.Default
+    ifm_shape: Shape4D = Shape4D(0)
+    ifm_format: TensorFormat = TensorFormat.NHWC
+    ifm_memory_area: MemArea = MemArea.Unknown
+    ifm2_memory_area: Optional[MemArea] = MemArea.Unknown
+    ifm_bits: int = 0
+    ifm2_bits: Optional[int] = 0
+    ifm2_shape: Optional[Shape4D] = None
+    ifm2_format: Optional[TensorFormat] = TensorFormat.NHWC
+    ofm_shape: Shape4D = Shape4D(0)
+    ofm_format: TensorFormat = TensorFormat.NHWC
+    ofm_memory_area: MemArea = MemArea.Unknown
+    ofm_bits: int = 0
+    const_shape: Shape4D = Shape4D(0)
+    const_memory_area: MemArea = MemArea.Unknown
+    kernel: Kernel = Kernel(1, 1)
+    config: ArchitectureBlockConfig = ArchitectureBlockConfig()
+
+    def _key(self):
+        kernel = self.kernel
+        config = self.config
+        return (
+            self[:-2],
+            (kernel.width, kernel.height, kernel.stride, kernel.dilation, kernel.valid_padding),
+            (config.ifm_block, config.ofm_block, config.acc_type, config.is_partkernel),
+        )
+
+    def __eq__(self, other):
+        return isinstance(other, PerformanceQuery) and self._key() == other._key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._key())
 
 
 class CycleCost:
@@ -251,7 +274,7 @@ def _estimate_minimum_memory_cycles(arch, query: PerformanceQuery):
     return cycles_ifm_blk, cycles_ofm_blk
 
 
-def _estimate_output_cycles_per_element(arch, op_type: Op, faf_type: Op, query: PerformanceQuery):
+def _output_perf_index(op_type: Op, query: PerformanceQuery) -> int:
     if query.npu_block_type == NpuBlockType.ElementWise and query.ifm_bits == 32:
         # Unary op else Binary op
         output_perf_index = 0 if query.ifm2_shape is not None else 1
@@ -280,16 +303,23 @@ def _estimate_output_cycles_per_element(arch, op_type: Op, faf_type: Op, query:
         output_perf_index = 6
     else:
         output_perf_index = 7
+    return output_perf_index
 
+
+def _activation_perf_index(faf_type: Op) -> int:
     if faf_type in (Op.Sigmoid, Op.Tanh, Op.LUT):
         activation_perf_index = 0
     elif faf_type in (Op.Relu, Op.Relu6, Op.ReluN1To1):
         activation_perf_index = 1
     else:
         activation_perf_index = 2
+    return activation_perf_index
+
 
+def _estimate_output_cycles_per_element(arch, op_type: Op, faf_type: Op, query: PerformanceQuery):
     cycle_per_elem = max(
-        arch.output_cycles_per_elem[output_perf_index], arch.activation_cycles_per_elem[activation_perf_index]
+        arch.output_cycles_per_elem[_output_perf_index(op_type, query)],
+        arch.activation_cycles_per_elem[_activation_perf_index(faf_type)],
     )
 
     if op_type.is_elementwise_op():
@@ -435,7 +465,14 @@ def measure_mem2mem_cycles(arch, from_mem_area, to_mem_area, to_transfer):
     return max(from_cycles, to_cycles)
 
 
-def measure_cycle_cost(arch, op_type: Op, faf_type: Op, query: PerformanceQuery):
+def measure_cycle_cost(arch, op_type: Op, faf_type: Op, query: PerformanceQuery) -> CycleCost:
+    """Returns the cycle cost of the query, the returned cost is shared and must not be modified"""
+    return CompilationContext.current().cycle_cost_cache.find(
+        (arch, op_type, faf_type, query), _measure_cycle_cost, arch, op_type, faf_type, query
+    )
+
+
+def _measure_cycle_cost(arch, op_type: Op, faf_type: Op, query: PerformanceQuery) -> CycleCost:
     cycles = CycleCost()
 
     # Convolution/Vector product cycle calculation
@@ -469,7 +506,12 @@ def measure_cycle_cost(arch, op_type: Op, faf_type: Op, query: PerformanceQuery)
     return cycles
 
 
-def measure_element_access(arch, query: PerformanceQuery):
+def measure_element_access(arch, query: PerformanceQuery) -> ElementAccess:
+    """Returns the element access of the query, the returned access is shared and must not be modified"""
+    return CompilationContext.current().element_access_cache.find((arch, query), _measure_element_access, arch, query)
+
+
+def _measure_element_access(arch, query: PerformanceQuery) -> ElementAccess:
     access = ElementAccess()
 
     ifm_block = Shape4D.min(query.ifm_shape, query.config.ifm_block)
@@ -541,6 +583,412 @@ def measure_element_access(arch, query: PerformanceQuery):
     return access
 
 
+class _QueryArrays:
+    """The fields of a list of performance queries as arrays, with one row per query. Shapes are (N, 4) arrays"""
+
+    def __init__(self, arch, queries: List[PerformanceQuery]):
+        def shapes(values):
+            return np.array([tuple(value) for value in values], dtype=np.int64).reshape(-1, 4)
+
+        def ints(values):
+            return np.array(list(values), dtype=np.int64)
+
+        def flags(values):
+            return np.array(list(values), dtype=bool)
+
+        self.block_types = [query.npu_block_type for query in queries]
+        self.ifm_shape = shapes(query.ifm_shape for query in queries)
+        self.ifm_bits = ints(query.ifm_bits for query in queries)
+        self.ifm_memory_area = ints(query.ifm_memory_area for query in queries)
+        self.ifm_nhwc = flags(query.ifm_format == TensorFormat.NHWC for query in queries)
+        self.ifm_nhcwb16 = flags(query.ifm_format == TensorFormat.NHCWB16 for query in queries)
+        self.ifm_rounding = shapes(arch.storage_rounding_quantums[query.ifm_format] for query in queries)
+        self.has_ifm2 = flags(query.ifm2_shape is not None for query in queries)
+        self.ifm2_shape = shapes(query.ifm2_shape or Shape4D(0, 0, 0, 0) for query in queries)
+        self.ifm2_bits = ints(query.ifm2_bits or 0 for query in queries)
+        self.ifm2_memory_area = ints(query.ifm2_memory_area or MemArea.Unknown for query in queries)
+        self.ofm_shape = shapes(query.ofm_shape for query in queries)
+        self.ofm_bits = ints(query.ofm_bits for query in queries)
+        self.ofm_memory_area = ints(query.ofm_memory_area for query in queries)
+        self.ofm_nhwc = flags(query.ofm_format == TensorFormat.NHWC for query in queries)
+        self.ofm_nhcwb16 = flags(query.ofm_format == TensorFormat.NHCWB16 for query in queries)
+        self.ofm_rounding = shapes(arch.storage_rounding_quantums[query.ofm_format] for query in queries)
+        self.const_depth = ints(query.const_shape.depth for query in queries)
+        self.const_memory_area = ints(query.const_memory_area for query in queries)
+        self.kernel_width = ints(query.kernel.width for query in queries)
+        self.kernel_height = ints(query.kernel.height for query in queries)
+        self.sub_kernel_limits = np.array(
+            [arch.sub_kernel_limits[query.npu_block_type] for query in queries], dtype=np.int64
+        ).reshape(-1, 2)
+        self.ifm_block = shapes(query.config.ifm_block for query in queries)
+        self.ofm_block = shapes(query.config.ofm_block for query in queries)
+        self.acc_40bits = flags(query.config.acc_type == SHRAMElements.Acc40 for query in queries)
+        self.is_partkernel = flags(query.config.is_partkernel for query in queries)
+
+    def is_block_type(self, *block_types: NpuBlockType) -> np.ndarray:
+        return np.array([block_type in block_types for block_type in self.block_types], dtype=bool)
+
+
+def _elements(shapes: np.ndarray) -> np.ndarray:
+    return np.prod(shapes, axis=1)
+
+
+def _batch_memory_transfer_efficiency(
+    arch, is_read, mem_area, is_nhwc, is_nhcwb16, element_bits, block_size, shape, to_transfer
+):
+    """Batched version of _estimate_memory_transfer_efficiency"""
+    block_width = block_size[:, 2]
+    block_depth = block_size[:, 3]
+    burst_len = np.full(len(to_transfer), 8, dtype=np.int64)
+
+    nhcwb16_stride = (element_bits * 16 * shape[:, 2]) / 8
+    whole_block = element_bits * block_depth * block_width
+    if is_read:
+        nhcwb16_burst = 16 * element_bits * block_width
+    else:
+        nhcwb16_burst = 16 * element_bits * block_width * arch.ncores
+    burst_len = np.where(is_nhcwb16, np.where(nhcwb16_stride == block_depth, whole_block, nhcwb16_burst), burst_len)
+
+    nhwc_stride = element_bits / 8
+    if is_read:
+        nhwc_burst = np.where(nhwc_stride == block_depth, whole_block, element_bits * block_depth)
+    else:
+        nhwc_burst = np.where(
+            (block_depth <= 16) & (nhwc_stride == block_depth),
+            whole_block,
+            np.minimum(np.minimum(64 * 8, 16 * element_bits * arch.ncores), block_depth * element_bits),
+        )
+    burst_len = np.where(is_nhwc, nhwc_burst, burst_len)
+
+    burst_len = burst_len // 8  # bits->bytes
+    burst_len = np.minimum(arch.memory_burst_length[mem_area], burst_len)
+    return to_transfer * (arch.memory_burst_length[mem_area] / burst_len)
+
+
+def _batch_minimum_memory_cycles(arch, queries: _QueryArrays):
+    """Batched version of _estimate_minimum_memory_cycles"""
+    ifm_bytes = _elements(np.minimum(queries.ifm_shape, queries.ifm_block))
+    cycles_ifm_blk = arch.memory_latency[queries.ifm_memory_area, BandwidthDirection.Read]
+    cycles_ifm_blk = cycles_ifm_blk + (
+        _batch_memory_transfer_efficiency(
+            arch,
+            True,
+            queries.ifm_memory_area,
+            queries.ifm_nhwc,
+            queries.ifm_nhcwb16,
+            queries.ifm_bits,
+            queries.ifm_block,
+            queries.ifm_shape,
+            ifm_bytes,
+        )
+        / arch.memory_bandwidths_per_cycle[queries.ifm_memory_area]
+    )
+    ofm_bytes = _elements(np.minimum(queries.ofm_shape, queries.ofm_block))
+    cycles_ofm_blk = arch.memory_latency[queries.ofm_memory_area, BandwidthDirection.Write]
+    cycles_ofm_blk = cycles_ofm_blk + (
+        _batch_memory_transfer_efficiency(
+            arch,
+            False,
+            queries.ofm_memory_area,
+            queries.ofm_nhwc,
+            queries.ofm_nhcwb16,
+            queries.ofm_bits,
+            queries.ofm_block,
+            queries.ofm_shape,
+            ofm_bytes,
+        )
+        / arch.memory_bandwidths_per_cycle[queries.ofm_memory_area]
+    )
+    return cycles_ifm_blk, cycles_ofm_blk
+
+
+def _batch_output_cycles_per_element(arch, op_types, faf_types, queries: List[PerformanceQuery], arrays, memory_cycles):
+    """Batched version of _estimate_output_cycles_per_element"""
+    output_cycles = np.array(
+        [arch.output_cycles_per_elem[_output_perf_index(*args)] for args in zip(op_types, queries)]
+    )
+    activation_cycles = np.array(
+        [arch.activation_cycles_per_elem[_activation_perf_index(faf_type)] for faf_type in faf_types]
+    )
+    cycle_per_elem = np.maximum(output_cycles, activation_cycles)
+
+    is_elementwise = np.array([op_type.is_elementwise_op() for op_type in op_types], dtype=bool)
+    num_elems_blk = _elements(arrays.ofm_block)
+    ifm_blk_cycles, ofm_blk_cycles = memory_cycles
+    cycle_cmd = ifm_blk_cycles + ofm_blk_cycles
+    cycle_cmd = (cycle_cmd + cycle_per_elem * num_elems_blk) / 4  # per DPU
+    return np.where(is_elementwise, np.maximum(cycle_per_elem, cycle_cmd / num_elems_blk), cycle_per_elem)
+
+
+def _batch_conv_cycles(arch, queries: _QueryArrays, cycle_per_elem, memory_cycles):
+    """Batched version of _estimate_conv_cycles"""
+    ifm_block = np.minimum(queries.ifm_shape, queries.ifm_block)
+    ofm_block = np.minimum(queries.ofm_shape, queries.ofm_block)
+    ublock = arch.config.ofm_ublock
+
+    is_mxn = queries.is_block_type(NpuBlockType.ConvolutionMxN)
+    is_depthwise = queries.is_block_type(NpuBlockType.ConvolutionDepthWise)
+    is_pooling = queries.is_block_type(NpuBlockType.Pooling)
+    is_partkernel = is_mxn & queries.is_partkernel
+    use_acc_40bits = queries.acc_40bits
+
+    # Conv1D optimisation, only applies for even width tensors
+    is_conv1d = (
+        (ublock.height == 2)
+        & queries.is_block_type(
+            NpuBlockType.ConvolutionMxN, NpuBlockType.ConvolutionDepthWise, NpuBlockType.VectorProduct
+        )
+        & (queries.ofm_shape[:, 1] == 1)
+        & (queries.ofm_shape[:, 2] % 2 == 0)
+        & (queries.kernel_height == 1)
+    )
+    ofm_block[:, 1] = np.where(is_conv1d, 1, ofm_block[:, 1])
+    ublock_height = np.where(is_conv1d, 1, ublock.height)
+    ublock_width = np.where(is_conv1d, 4, ublock.width)
+
+    num_ublk_x = numeric_util.round_up_divide(ofm_block[:, 2], ublock_width)
+    num_ublk_y = numeric_util.round_up_divide(ofm_block[:, 1], ublock_height)
+    num_ublk_xy = num_ublk_x * num_ublk_y
+    num_ublk_z = numeric_util.round_up_divide(ofm_block[:, 3], ublock.depth)
+    ifm_block_depth_steps = numeric_util.round_up_divide(ifm_block[:, 3], 8)
+
+    limit_y = queries.sub_kernel_limits[:, 0]
+    limit_x = queries.sub_kernel_limits[:, 1]
+    n_sub_kernels_y = numeric_util.round_up_divide(queries.kernel_height, limit_y)
+    n_sub_kernels_x = numeric_util.round_up_divide(queries.kernel_width, limit_x)
+
+    cycles_wb = 32 * ublock.depth // 8
+    cycles_ublk = np.maximum(cycles_wb, 4 * num_ublk_xy)
+    depthwise_cycles = 4 * num_ublk_xy * np.where(queries.ifm_bits == 16, 2, 1)
+    pooling_scale = 2 if arch.accelerator_config != Accelerator.Ethos_U55_32 else 1
+    pooling_scale = np.where(queries.ifm_bits == 16, pooling_scale, 1)
+    partkernel_divider = np.where(queries.ifm_bits == 16, 2, 4)
+
+    if arch.accelerator_config is Accelerator.Ethos_U55_32:
+        delay = np.where(use_acc_40bits, 7, 3)
+    elif arch.accelerator_config in (Accelerator.Ethos_U55_64, Accelerator.Ethos_U55_128):
+        delay = np.where(use_acc_40bits, 3, 2)
+    else:
+        delay = np.full(len(use_acc_40bits), 2, dtype=np.int64)
+    single_ublk_xy = (num_ublk_x == 1) & (num_ublk_y == 1)
+
+    # All sub kernels are accumulated at once, masking out the sub kernels that a query does not have
+    cycles_dpu_blk = np.zeros(len(use_acc_40bits), dtype=np.int64)
+    for y in range(int(n_sub_kernels_y.max(initial=0))):
+        sub_kernel_y = np.minimum(queries.kernel_height - y * limit_y, limit_y)
+        for x in range(int(n_sub_kernels_x.max(initial=0))):
+            sub_kernel_x = np.minimum(queries.kernel_width - x * limit_x, limit_x)
+            num_kernel_elems = sub_kernel_x * sub_kernel_y
+
+            num_kernel_steps = np.select(
+                [is_pooling, is_depthwise, is_partkernel],
+                [
+                    1,
+                    numeric_util.round_up_divide(num_kernel_elems, 4),
+                    numeric_util.round_up_divide(num_kernel_elems, partkernel_divider),
+                ],
+                num_kernel_elems,
+            )
+            cycles = np.select(
+                [is_pooling, is_depthwise, is_partkernel],
+                [
+                    np.maximum(4, num_kernel_elems) * num_ublk_xy * num_ublk_z * pooling_scale,
+                    np.maximum(cycles_wb, depthwise_cycles) * num_kernel_steps * num_ublk_z,
+                    cycles_ublk * (num_kernel_steps * ifm_block_depth_steps * num_ublk_z),
+                ],
+                cycles_ublk * num_kernel_steps * num_ublk_z,
+            )
+
+            delay_cycles = np.where(
+                single_ublk_xy,
+                np.where(
+                    num_ublk_z == 1,
+                    delay * num_kernel_steps,
+                    np.where(num_kernel_steps > 1, delay * (num_kernel_steps - 1) * num_ublk_z, 0),
+                ),
+                0,
+            )
+            if arch.accelerator_config is Accelerator.Ethos_U55_32:
+                delay_cycles += np.where(
+                    ((num_ublk_x == 1) | (num_ublk_y == 1)) & (num_ublk_z > 1) & use_acc_40bits, delay * num_ublk_z, 0
+                )
+            delay_cycles = np.where(is_partkernel, delay_cycles * ifm_block_depth_steps, delay_cycles)
+
+            is_sub_kernel = (y < n_sub_kernels_y) & (x < n_sub_kernels_x)
+            cycles_dpu_blk += np.where(is_sub_kernel, cycles + delay_cycles, 0)
+
+    cycles_dpu_blk = np.where(
+        queries.is_block_type(NpuBlockType.ConvolutionMxN, NpuBlockType.VectorProduct, NpuBlockType.ReduceSum),
+        cycles_dpu_blk * numeric_util.round_up_divide(queries.ifm_shape[:, 3], ifm_block[:, 3]),
+        cycles_dpu_blk,
+    )
+    cycles_dpu_blk = cycles_dpu_blk / arch.ncores
+
+    # Estimate output cycles
+    num_ofm_blks = _elements(numeric_util.round_up_divide(queries.ofm_shape, ofm_block))
+    cycles_output_blk = np.ceil(cycle_per_elem * _elements(ofm_block))
+
+    # Scale and bias tensor
+    cycles_bias_blk = (
+        10 * ofm_block[:, 3] * arch.memory_latency[queries.const_memory_area, BandwidthDirection.Read] / 256
+    )
+    cycles_output_blk = np.where(
+        queries.const_depth > 0, np.maximum(cycles_output_blk, cycles_bias_blk), cycles_output_blk
+    )
+
+    ifm_blk_cycles, ofm_blk_cycles = memory_cycles
+    cycles_cmd = ifm_blk_cycles + ofm_blk_cycles
+    cycles_cmd = (cycles_cmd + cycles_output_blk + cycles_dpu_blk) / 4  # per DPU
+
+    cycles_dpu_blk = np.maximum(cycles_dpu_blk, cycles_cmd)
+    cycles_output_blk = np.maximum(cycles_output_blk, cycles_cmd)
+
+    return np.where(
+        cycles_dpu_blk > cycles_output_blk,
+        cycles_dpu_blk * num_ofm_blks + cycles_output_blk,
+        cycles_output_blk * num_ofm_blks + cycles_dpu_blk,
+    )
+
+
+def measure_cycle_costs(
+    arch, op_types: List[Op], faf_types: List[Op], queries: List[PerformanceQuery]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Batched version of measure_cycle_cost, for scoring many queries at once. Returns the op cycles and the op MACs
+    of every query, as int64 arrays that match the results of measure_cycle_cost"""
+    return _batch_cycle_costs(arch, op_types, faf_types, queries, _QueryArrays(arch, queries))
+
+
+def _batch_cycle_costs(arch, op_types: List[Op], faf_types: List[Op], queries: List[PerformanceQuery], arrays):
+    is_elementwise = arrays.is_block_type(NpuBlockType.ElementWise)
+    is_conv = arrays.is_block_type(
+        NpuBlockType.ConvolutionMxN,
+        NpuBlockType.ConvolutionDepthWise,
+        NpuBlockType.VectorProduct,
+        NpuBlockType.Pooling,
+        NpuBlockType.ReduceSum,
+    )
+    assert np.all(is_conv | is_elementwise)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        memory_cycles = _batch_minimum_memory_cycles(arch, arrays)
+        cycle_per_elem = _batch_output_cycles_per_element(arch, op_types, faf_types, queries, arrays, memory_cycles)
+        conv_cycles = _batch_conv_cycles(arch, arrays, cycle_per_elem, memory_cycles)
+        elementwise_cycles = np.ceil(
+            cycle_per_elem * _elements(numeric_util.round_up(arrays.ofm_shape, arrays.ofm_rounding))
+        )
+    op_cycles = np.where(is_conv, conv_cycles, elementwise_cycles).astype(np.int64)
+
+    # Depthwise and pooling kernels do not reread the ifm depth
+    is_depthwise = arrays.is_block_type(NpuBlockType.ConvolutionDepthWise, NpuBlockType.Pooling)
+    macs_depth = np.where(is_depthwise, 1, arrays.ifm_shape[:, 3])
+    op_macs = arrays.kernel_width * arrays.kernel_height * macs_depth * _elements(arrays.ofm_shape)
+    op_macs = np.where(is_conv, op_macs, 0)
+    return op_cycles, op_macs
+
+
+def measure_element_accesses(arch, queries: List[PerformanceQuery]) -> np.ndarray:
+    """Batched version of measure_element_access. Returns an (N, 6) int64 array with the ifm1 read, ifm2 read, ofm
+    write, weights refetch, weights read and scales read element counts of every query"""
+    return _batch_element_accesses(_QueryArrays(arch, queries))
+
+
+def _batch_element_accesses(arrays: _QueryArrays) -> np.ndarray:
+    access = np.zeros((len(arrays.block_types), 6), dtype=np.int64)
+
+    ifm_block = np.minimum(arrays.ifm_shape, arrays.ifm_block)
+    ofm_block = np.minimum(arrays.ofm_shape, arrays.ofm_block)
+
+    # Number of ofm blocks in the overall output shape
+    ofm_blocks = numeric_util.round_up_divide(arrays.ofm_shape, ofm_block)
+    ofm_block_depth = ofm_block[:, 3]
+    is_depthwise = arrays.is_block_type(NpuBlockType.ConvolutionDepthWise, NpuBlockType.Pooling)
+    ofm_blocks[:, 3] = np.where(is_depthwise, 1, ofm_blocks[:, 3])
+    ofm_block_depth = np.where(is_depthwise, arrays.ifm_shape[:, 3], ofm_block_depth)
+
+    # Convolution & pooling
+    is_conv = arrays.is_block_type(
+        NpuBlockType.ConvolutionMxN,
+        NpuBlockType.ConvolutionDepthWise,
+        NpuBlockType.VectorProduct,
+        NpuBlockType.Pooling,
+        NpuBlockType.ReduceSum,
+    )
+    subkernels = numeric_util.round_up_divide(arrays.kernel_width, arrays.sub_kernel_limits[:, 0])
+    subkernels *= numeric_util.round_up_divide(arrays.kernel_height, arrays.sub_kernel_limits[:, 1])
+    ofm_block_count = _elements(ofm_blocks)
+    ifm_rounded = numeric_util.round_up(arrays.ifm_shape, arrays.ifm_rounding)
+    ifm_block_rounded = numeric_util.round_up(ifm_block, arrays.ifm_rounding)
+    ifm_fetch = ifm_block_rounded[:, 1] * ifm_block_rounded[:, 2] * ifm_rounded[:, 3]
+    kernel_read = arrays.kernel_width * arrays.kernel_height * np.where(is_depthwise, 1, arrays.ifm_shape[:, 3])
+    weight_fetch = kernel_read * ofm_block_depth * ofm_block_count
+    has_weights = is_conv & ~arrays.is_block_type(NpuBlockType.Pooling, NpuBlockType.ReduceSum)
+    access[is_conv, 0] = (ifm_fetch * subkernels * ofm_block_count)[is_conv]
+    access[has_weights, 3] = (ofm_blocks[:, 1] * ofm_blocks[:, 2])[has_weights]
+    access[has_weights, 4] = weight_fetch[has_weights]
+    access[has_weights, 5] = arrays.ofm_shape[has_weights, 3]
+
+    # Elementwise
+    is_elementwise = arrays.is_block_type(NpuBlockType.ElementWise)
+    assert np.all(is_conv | is_elementwise)
+    ofm_elements = _elements(numeric_util.round_up(arrays.ofm_shape, arrays.ifm_rounding))
+    scalar_ifm = _elements(arrays.ifm_shape) == 1
+    scalar_ifm_read = np.where(arrays.ifm_bits > 8, _elements(ifm_rounded), 0)
+    ifm_read = np.where(scalar_ifm, scalar_ifm_read, ofm_elements)
+    scalar_ifm2_read = np.where(
+        arrays.ifm2_bits > 8, _elements(numeric_util.round_up(arrays.ifm2_shape, arrays.ifm_rounding)), 0
+    )
+    ifm2_read = np.where(scalar_ifm | (_elements(arrays.ifm2_shape) > 1), ofm_elements, scalar_ifm2_read)
+    access[is_elementwise, 0] = ifm_read[is_elementwise]
+    access[is_elementwise, 1] = np.where(arrays.has_ifm2, ifm2_read, 0)[is_elementwise]
+
+    access[:, 2] = _elements(numeric_util.round_up(arrays.ofm_shape, arrays.ofm_rounding))
+    return access
+
+
+class PerformanceCosts(NamedTuple):
+    """Batched performance of a list of queries, with one row per query"""
+
+    op_cycles: np.ndarray  # (N,) op cycles, as returned by measure_cycle_costs
+    op_macs: np.ndarray  # (N,) op MACs, as returned by measure_cycle_costs
+    element_access: np.ndarray  # (N, 6) element counts, as returned by measure_element_accesses
+    bandwidths: np.ndarray  # (N, MemArea.Size, BandwidthDirection.Size) bytes read and written per memory area
+
+
+def measure_performance_costs(
+    arch,
+    op_types: List[Op],
+    faf_types: List[Op],
+    queries: List[PerformanceQuery],
+    const_element_sizes: Optional[np.ndarray] = None,
+) -> PerformanceCosts:
+    """Batched performance model, for scoring many queries in one call. The cycles, MACs and element accesses match
+    measure_cycle_cost and measure_element_access. The bandwidths are the bytes of ifm, ifm2 and ofm traffic in every
+    memory area. The weights and scales are only included if const_element_sizes is given, an (N, 2) array with the
+    bytes per weight and per scale element read, since these depend on the weight encoding"""
+    arrays = _QueryArrays(arch, queries)
+    op_cycles, op_macs = _batch_cycle_costs(arch, op_types, faf_types, queries, arrays)
+    access = _batch_element_accesses(arrays)
+
+    bandwidths = np.zeros((len(queries), MemArea.Size, BandwidthDirection.Size))
+    rows = np.arange(len(queries))
+    bandwidths[rows, arrays.ifm_memory_area, BandwidthDirection.Read] += access[:, 0] * (arrays.ifm_bits // 8)
+    bandwidths[rows, arrays.ifm2_memory_area, BandwidthDirection.Read] += access[:, 1] * (arrays.ifm2_bits // 8)
+    bandwidths[rows, arrays.ofm_memory_area, BandwidthDirection.Write] += access[:, 2] * (arrays.ofm_bits // 8)
+    if const_element_sizes is not None:
+        const_bytes = access[:, 4:6] * np.asarray(const_element_sizes).reshape(-1, 2)
+        bandwidths[rows, arrays.const_memory_area, BandwidthDirection.Read] += const_bytes[:, 0] + const_bytes[:, 1]
+    return PerformanceCosts(op_cycles, op_macs, access, bandwidths)
+
+
+def _element_access_from_row(row: np.ndarray) -> ElementAccess:
+    access = ElementAccess()
+    access.ifm_read = [int(row[0]), int(row[1])]
+    access.ofm_write = int(row[2])
+    access.weights_refetch = int(row[3])
+    access.const_read = [int(row[4]), int(row[5])]
+    return access
+
+
 def measure_performance_cost(
     arch, op_type: Op, faf_type: Op, query: PerformanceQuery, offset: Shape4D, sub_shape: Shape4D
 ):
@@ -557,8 +1005,7 @@ def measure_performance_cost(
     else:
         sub_shape = Shape4D.min(sub_shape, query.ofm_shape)
 
-    sub_query = copy.deepcopy(query)
-    sub_query.ofm_shape = query.ofm_shape.clip(offset, sub_shape)
+    sub_query = query._replace(ofm_shape=query.ofm_shape.clip(offset, sub_shape))
 
     access = ElementAccess()
     cycles = CycleCost()
@@ -592,44 +1039,66 @@ def update_summary_cycles(arch, bws, cycles):
     return cycles
 
 
+def _full_op_query(schedule: Schedule, op: SchedulerOperation, block_config) -> PerformanceQuery:
+    query = PerformanceQuery(
+        npu_block_type=op.op_type.npu_block_type,
+        ifm_shape=op.ifm.shape,
+        ifm_format=op.ifm.format,
+        ifm_memory_area=op.ifm.mem_area,
+        ifm_bits=op.ifm.dtype.size_in_bits(),
+        ifm2_shape=op.ifm2 and op.ifm2.shape,
+        ifm2_format=op.ifm2 and op.ifm2.format,
+        ifm2_memory_area=op.ifm2 and op.ifm2.mem_area,
+        ifm2_bits=op.ifm2 and op.ifm2.dtype.size_in_bits(),
+        ofm_shape=op.ofm.shape,
+        ofm_memory_area=op.ofm.mem_area,
+        ofm_bits=op.ofm.dtype.size_in_bits(),
+        ofm_format=op.ofm.format,
+        kernel=op.kernel,
+        config=block_config,
+    )
+
+    cost = schedule.cost_map[op]
+    if op.parent_op.bias:
+        if cost.buffered_weight_tensors:
+            const_memory_area = cost.buffered_weight_tensors[0].mem_area
+        else:
+            const_memory_area = cost.npu_weights_tensor.mem_area
+        query = query._replace(const_shape=Shape4D(1, 1, 1, op.ofm.shape.depth), const_memory_area=const_memory_area)
+    return query
+
+
+def _faf_type(op: SchedulerOperation) -> Optional[Op]:
+    return op.parent_op.activation and op.parent_op.activation.op_type
+
+
 def estimate_full_op_performance(
-    arch, schedule: Schedule, op: SchedulerOperation, prev_op: Optional[SchedulerOperation], block_config
+    arch,
+    schedule: Schedule,
+    op: SchedulerOperation,
+    prev_op: Optional[SchedulerOperation],
+    block_config,
+    cycles: Optional[CycleCost] = None,
+    access: Optional[ElementAccess] = None,
 ):
+    """Estimates the bandwidths, MACs and cycles of the operation. The cycle cost and element access of the
+    operation are measured unless they are given, e.g. from a batched measurement of all operations"""
     cycles_a = make_cycles_array()
     bws = make_bandwidth_array()
     scaled_bws = make_bandwidth_array()  # scaled bw with memory transfer efficiency
     macs = 0
 
-    query = PerformanceQuery(op.op_type.npu_block_type)
-    query.ifm_shape = op.ifm.shape
-    query.ifm_format = op.ifm.format
-    query.ifm_memory_area = op.ifm.mem_area
-    query.ifm_bits = op.ifm.dtype.size_in_bits()
-    query.ifm2_shape = op.ifm2 and op.ifm2.shape
-    query.ifm2_format = op.ifm2 and op.ifm2.format
-    query.ifm2_memory_area = op.ifm2 and op.ifm2.mem_area
-    query.ifm2_bits = op.ifm2 and op.ifm2.dtype.size_in_bits()
-    query.ofm_shape = op.ofm.shape
-    query.ofm_memory_area = op.ofm.mem_area
-    query.ofm_bits = op.ofm.dtype.size_in_bits()
-    query.ofm_format = op.ofm.format
-    query.kernel = op.kernel
-    query.config = block_config
-
+    query = _full_op_query(schedule, op, block_config)
     cost = schedule.cost_map[op]
     prev_cost = schedule.cost_map[prev_op] if prev_op else None
-    if op.parent_op.bias:
-        query.const_shape = Shape4D(1, 1, 1, op.ofm.shape.depth)
-        if cost.buffered_weight_tensors:
-            query.const_memory_area = cost.buffered_weight_tensors[0].mem_area
-        else:
-            query.const_memory_area = cost.npu_weights_tensor.mem_area
 
-    cycles = measure_cycle_cost(arch, op.op_type, op.parent_op.activation and op.parent_op.activation.op_type, query)
+    if cycles is None:
+        cycles = measure_cycle_cost(arch, op.op_type, _faf_type(op), query)
     cycles_a[PassCycles.Npu] = cycles.op_cycles
     macs = cycles.op_macs
 
-    access = measure_element_access(arch, query)
+    if access is None:
+        access = measure_element_access(arch, query)
 
     # How many NPU cycles are available under the previously executing
     # operator for performing buffered DMA transfers
@@ -748,10 +1217,31 @@ def calc_new_performance_for_network(nng: Graph, arch):
     encoded_npu_weight_uuids: Set[UUID] = set()
 
     for sg in nng.subgraphs:
+        # The cycle costs and element accesses of all operations are measured in one batch
+        queries = [
+            _full_op_query(sg.schedule, sched_op, sg.schedule.cost_map[sched_op].block_config)
+            for sched_op in sg.sched_ops
+        ]
+        op_types = [sched_op.op_type for sched_op in sg.sched_ops]
+        faf_types = [_faf_type(sched_op) for sched_op in sg.sched_ops]
+        op_cycles, op_macs = measure_cycle_costs(arch, op_types, faf_types, queries)
+        accesses = measure_element_accesses(arch, queries)
+
         prev_op = None
-        for sched_op in sg.sched_ops:
+        for i, sched_op in enumerate(sg.sched_ops):
             op_info: SchedulerOpInfo = sg.schedule.cost_map[sched_op]
-            bws, macs, cycles = estimate_full_op_performance(arch, sg.schedule, sched_op, prev_op, op_info.block_config)
+            op_cost = CycleCost()
+            op_cost.op_cycles = int(op_cycles[i])
+            op_cost.op_macs = int(op_macs[i])
+            bws, macs, cycles = estimate_full_op_performance(
+                arch,
+                sg.schedule,
+                sched_op,
+                prev_op,
+                op_info.block_config,
+                op_cost,
+                _element_access_from_row(accesses[i]),
+            )
 
             # Tensors for calculating weight sizes
             original_weight = sched_op.parent_op.weights
@@ -66,9 +66,9 @@ def serialise_npu_subgraph_into_tensors(sg, arch, scratch_tens, scratch_fast_ten
     flash_size = sg.memory_used.get(flash_area, 0)
     scratch_size = sg.memory_used.get(scratch_area, 0)
 
-    payload_bytes = driver_actions.create_driver_payload(sg.register_command_stream, arch)
+    payload = driver_actions.create_driver_payload_words(sg.register_command_stream, arch)
 
-    command_stream_size_bytes = len(payload_bytes)
+    command_stream_size_bytes = len(payload) * payload.itemsize
 
     if flash_tens == scratch_tens is None:
         # First Npu subgraph, create scratch and flash tensors
@@ -112,7 +112,8 @@ def serialise_npu_subgraph_into_tensors(sg, arch, scratch_tens, scratch_fast_ten
     sg.command_stream_tensor = make_memory_tensor(
         sg.name + "_command_stream", flash_area, MemType.Permanent_CPU, command_stream_size_bytes, True, arch
     )
-    sg.command_stream_tensor.values = np.frombuffer(payload_bytes, dtype=np.uint8)
+    # View the payload as bytes, without copying it
+    sg.command_stream_tensor.values = np.frombuffer(payload, dtype=np.uint8)
 
     return sg.scratch_tensor, sg.scratch_fast_tensor, sg.flash_tensor
 
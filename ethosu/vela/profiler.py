@@ -0,0 +1,173 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description:
+# Records the wall time, call count and memory usage of the compiler stages and writes them to a JSON file.
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict
+from typing import List
+
+from ._version import __version__
+from .compilation_context import CompilationContext
+
+try:
+    import resource
+except ImportError:
+    # Not available on Microsoft Windows, the peak RSS is then not reported
+    resource = None
+
+
+def peak_rss():
+    """Returns the peak resident set size of the process in bytes, or None if it is not available"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class StageProfile:
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.time = 0.0
+        self.peak_rss = None
+        self.traced_memory_delta = 0
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "time": self.time,
+            "peak_rss": self.peak_rss,
+            "traced_memory_delta": self.traced_memory_delta,
+        }
+
+
+class CompilationProfile:
+    """The stages that are recorded while compiling one network"""
+
+    def __init__(self):
+        self.stages: Dict[str, StageProfile] = {}
+        self.active: List[str] = []
+
+
+class Profiler:
+    """Records the compiler stages of the active compilation context. Stages that are entered while another stage is
+    active are recorded separately, with a name that is prefixed by the names of the active stages. Nothing is
+    recorded unless the profiler has been started in the compilation context.
+
+    Memory allocations are traced for the whole process, while the profiler is started in any context."""
+
+    _tracing_lock = threading.Lock()
+    _tracing_count = 0
+
+    @staticmethod
+    def enabled() -> bool:
+        return CompilationContext.current().profile is not None
+
+    @classmethod
+    def start(cls):
+        CompilationContext.current().profile = CompilationProfile()
+        with cls._tracing_lock:
+            if cls._tracing_count == 0:
+                tracemalloc.start()
+            cls._tracing_count += 1
+
+    @classmethod
+    def stop(cls):
+        context = CompilationContext.current()
+        if context.profile is None:
+            return
+        context.profile = None
+        with cls._tracing_lock:
+            cls._tracing_count -= 1
+            if cls._tracing_count == 0:
+                tracemalloc.stop()
+
+    @classmethod
+    @contextmanager
+    def started(cls, enable: bool = True):
+        """Starts the profiler, if enable is set, for the duration of the with statement"""
+        if not enable:
+            yield
+            return
+        cls.start()
+        try:
+            yield
+        finally:
+            cls.stop()
+
+    @classmethod
+    @contextmanager
+    def stage(cls, name: str):
+        profile = CompilationContext.current().profile
+        if profile is None:
+            yield
+            return
+        profile.active.append(name)
+        path = "/".join(profile.active)
+        start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stop = time.perf_counter()
+            stage = profile.stages.get(path)
+            if stage is None:
+                stage = profile.stages[path] = StageProfile(path)
+            stage.calls += 1
+            stage.time += stop - start
+            stage.traced_memory_delta += tracemalloc.get_traced_memory()[0] - start_memory
+            stage.peak_rss = peak_rss()
+            profile.active.pop()
+
+    @classmethod
+    def profile(cls, function):
+        """Decorator that records every call of the function as a stage with the name of the function"""
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with cls.stage(function.__name__):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    @classmethod
+    def wrap(cls, functions: List) -> List:
+        """Returns the given functions, wrapped so that each function is recorded as a stage if the profiler is
+        started"""
+        if not cls.enabled():
+            return functions
+        return [cls.profile(function) for function in functions]
+
+    @classmethod
+    def write(cls, filename: str, network_name: str):
+        profile = {
+            "vela_version": __version__,
+            "network": network_name,
+            "peak_rss": peak_rss(),
+            "traced_memory_peak": tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None,
+            "stages": [stage.as_dict() for stage in CompilationContext.current().profile.stages.values()],
+        }
+        with open(filename, "w") as f:
+            json.dump(profile, f, indent=4)
@@ -16,7 +16,6 @@
 # Description:
 # Helper classes to track memory accesses for calculating dependencies between Commands.
 from enum import IntEnum
-from functools import lru_cache
 
 
 class RangeSet:
@@ -126,7 +125,6 @@ class MemoryAccessSet:
     def add(self, memory_range_set, access):
         self.accesses[access] |= memory_range_set
 
-    @lru_cache(maxsize=None)
     def conflicts(self, other):
 
         # True dependencies, or write -> read
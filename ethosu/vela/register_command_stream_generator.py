@@ -18,6 +18,7 @@
 # all the register settings. Calculates dependencies between commands and inserts wait operations. And generates a bit
 # stream suitable for interpretation by the Ethos-U processor.
 import math
+from array import array
 from collections import defaultdict
 from enum import Enum
 from enum import IntEnum
@@ -82,6 +83,7 @@ from .register_command_stream_util import get_op_memory_accesses
 from .register_command_stream_util import get_strides
 from .register_command_stream_util import get_wait_dependency
 from .register_command_stream_util import has_ifm2
+from .register_command_stream_util import MemoryAccessTracker
 from .register_command_stream_util import shape3d_to_block
 from .register_command_stream_util import to_kernel
 from .register_command_stream_util import UNARY_ELEMWISE_OPS
@@ -115,7 +117,9 @@ class CommandStreamEmitter:
     WORD_SIZE = 4
 
     def __init__(self):
-        self.cmd_stream = []
+        # The command words, the payload word of a command directly follows its command word
+        self.cmd_stream = array("I")
+        assert self.cmd_stream.itemsize == CommandStreamEmitter.WORD_SIZE
         self.reg_machine = [RegisterMachine(), RegisterMachine()]
         self.last_absolute_wait = defaultdict(int)
         self.offset = 0
@@ -127,17 +131,23 @@ class CommandStreamEmitter:
             return self.reg_machine[0]
 
     def size_in_bytes(self):
-        sz = 0
-        for cmd in self.cmd_stream:
-            sz += len(cmd) * CommandStreamEmitter.WORD_SIZE
-        return sz
+        return len(self.cmd_stream) * CommandStreamEmitter.WORD_SIZE
 
     def to_list(self) -> List[int]:
-        return [elem for cmd in self.cmd_stream for elem in cmd]
+        return self.cmd_stream.tolist()
+
+    def commands(self):
+        """Yields the words of each command in the command stream"""
+        index = 0
+        while index < len(self.cmd_stream):
+            code = self.cmd_stream[index] & 0x0000FFFF  # lower 16 bits
+            num_words = 2 if CmdMode(code & CmdMode.Mask) == CmdMode.Payload32 else 1
+            yield self.cmd_stream[index : index + num_words]
+            index += num_words
 
     def print_cmds(self):
         print("Code:    Command:                       Param: Payload:")
-        for words_for_one_command in self.cmd_stream:
+        for words_for_one_command in self.commands():
             code = words_for_one_command[0] & 0x0000FFFF  # lower 16 bits
             param = words_for_one_command[0] >> 16  # higher 16 bits
 
@@ -172,7 +182,7 @@ class CommandStreamEmitter:
             return
 
         # This is not a redundant command, actually write it
-        self.cmd_stream.append((command,))
+        self.cmd_stream.append(command)
         self.offset += CommandStreamEmitter.WORD_SIZE
 
     def cmd1_with_offset(self, cmd: cmd1, offset, param=0x0):
@@ -184,7 +194,8 @@ class CommandStreamEmitter:
             return
 
         # This is not a redundant command, actually write it
-        self.cmd_stream.append((command, offset))
+        self.cmd_stream.append(command)
+        self.cmd_stream.append(offset)
         self.offset += CommandStreamEmitter.WORD_SIZE * 2
 
     def cmd1_with_address(self, cmd: cmd1, offset):
@@ -193,14 +204,14 @@ class CommandStreamEmitter:
     def cmd_wait(self, cmd: cmd0, channel: int, outstanding_count: int):
         param = (16 * channel) + outstanding_count
         command = ((param & 0xFFFF) << 16) | cmd.value
-        self.cmd_stream.append((command,))
+        self.cmd_stream.append(command)
         self.offset += CommandStreamEmitter.WORD_SIZE
 
     def cmd_do_operation(self, cmd: cmd0, param=0):
         param = int(param)
         command = ((param & 0xFFFF) << 16) | cmd.value
 
-        self.cmd_stream.append((command,))
+        self.cmd_stream.append(command)
         self.offset += CommandStreamEmitter.WORD_SIZE
         self.get_reg_machine(cmd).switch_bank()
 
@@ -992,10 +1003,10 @@ def generate_command_stream(
     mem_limits: Dict[int, int],
     add_to_debug_db=None,
     npu_op_to_cmd=None,
-) -> List[int]:
+) -> array:
     """
     Generates register commands for the given list of NPU operations.
-    Returns Ethos-U instructions, as a list of 32-bit integers.
+    Returns Ethos-U instructions, as an array of 32-bit integers.
     """
     emit = CommandStreamEmitter()
     if verbose:
@@ -1012,13 +1023,14 @@ def generate_command_stream(
 
     if arch.is_ethos_u65_system:
         emit.cmd0_with_param(cmd0.NPU_SET_PARALLEL_MODE, arch.ncores - 1)
+    access_tracker = MemoryAccessTracker(npu_op_list, memory_accesses)
     dep_watermark = Watermark(0, 0)
     prev_op = None
     # Generate register commands for all operations
     for op_index, npu_op in enumerate(npu_op_list):
         try:
             check_mem_limits(memory_accesses[npu_op], mem_limits)
-            dep_watermark, cmd_waits = get_wait_dependency(arch, npu_op_list, memory_accesses, op_index, dep_watermark)
+            dep_watermark, cmd_waits = get_wait_dependency(arch, access_tracker, op_index, dep_watermark)
             generate_registers_for_op(emit, npu_op, arch)
         except VelaError as e:
             # Add operation info and rethrow
@@ -1037,7 +1049,7 @@ def generate_command_stream(
             add_to_debug_db(npu_op, emit.offset)
     # Fill in final part of command stream:
     emit.cmd_do_operation(cmd0.NPU_OP_STOP, param=0xFFFF)
-    res = emit.to_list()
+    res = emit.cmd_stream
 
     if emit.size_in_bytes() >= 1 << 24:
         raise VelaError(
@@ -1047,7 +1059,7 @@ def generate_command_stream(
 
     if verbose:
         emit.print_cmds()
-        print("number of commands", len(emit.cmd_stream))
+        print("number of commands", sum(1 for _ in emit.commands()))
         print("command stream length in words", len(res))
     return res
 
@@ -1067,4 +1079,4 @@ def generate_register_command_stream(npu_op_list: List[NpuOperation], npu_accele
     for region in range(0, 8):
         mem_limits[region] = arch.max_address_offset
     mem_limits[BASE_PTR_INDEX_MEM2MEM] = arch.shram_size_bytes
-    return generate_command_stream(npu_op_list, arch, verbose=False, mem_limits=mem_limits)
+    return generate_command_stream(npu_op_list, arch, verbose=False, mem_limits=mem_limits).tolist()
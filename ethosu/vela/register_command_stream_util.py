@@ -16,6 +16,8 @@
 #
 # Description:
 # Utility functions for code generation
+from bisect import bisect_left
+from typing import Dict
 from typing import List
 from typing import NamedTuple
 from typing import Optional
@@ -281,56 +283,70 @@ def get_op_memory_accesses(npu_op: NpuBlockOperation, arch: ArchitectureFeatures
     return res
 
 
+class MemoryAccessTracker:
+    """Memory accesses of the operations in a command stream, with the indices of the DMA and NPU operations kept
+    separately so that the latest operations of each kind before a given operation are found in logarithmic time"""
+
+    def __init__(self, npu_op_list: List[NpuOperation], memory_accesses: Dict[NpuOperation, MemoryAccessSet]):
+        self.accesses = [memory_accesses[npu_op] for npu_op in npu_op_list]
+        self.is_dma = [isinstance(npu_op, NpuDmaOperation) for npu_op in npu_op_list]
+        self.dma_indices = [index for index, is_dma in enumerate(self.is_dma) if is_dma]
+        self.npu_indices = [index for index, is_dma in enumerate(self.is_dma) if not is_dma]
+
+    @staticmethod
+    def _latest(indices: List[int], op_index: int, watermark: int, count: int) -> List[int]:
+        # The indices of at most count operations between the watermark and op_index, latest first
+        end = bisect_left(indices, op_index)
+        start = max(bisect_left(indices, watermark), end - count)
+        return indices[start:end][::-1]
+
+    def latest_dma_ops(self, op_index: int, watermark: int, count: int) -> List[int]:
+        """Returns the indices of the latest DMA operations before op_index, from the watermark onwards"""
+        return self._latest(self.dma_indices, op_index, watermark, count)
+
+    def latest_npu_ops(self, op_index: int, watermark: int, count: int) -> List[int]:
+        """Returns the indices of the latest NPU operations before op_index, from the watermark onwards"""
+        return self._latest(self.npu_indices, op_index, watermark, count)
+
+
 def get_wait_dependency(
-    arch: ArchitectureFeatures, npu_op_list: List[NpuOperation], memory_accesses, op_index: int, watermark: Watermark
+    arch: ArchitectureFeatures, access_tracker: MemoryAccessTracker, op_index: int, watermark: Watermark
 ):
     """Used to calculate whether DMA wait or kernel wait operations are needed"""
-    npu_op = npu_op_list[op_index]
-    op_access = memory_accesses[npu_op]
-    index = op_index - 1
+    op_access = access_tracker.accesses[op_index]
+    op_is_dma = access_tracker.is_dma[op_index]
 
-    # NPU dependency tracking
-    npu_outstanding = -1
-    npu_ops = 0
-    npu_index = watermark.npu
+    # Only the operations from the watermarks onwards are checked (dependencies before this point have been
+    # satisfied already), and only as many of them as can be outstanding in the pipelines.
+    # The watermark moves to after the latest element we must wait for, not the command that issues the wait.
+    # NPU->NPU dependency is handled via blockdep.
 
-    # DMA dependency tracking
+    # Check NPU consuming DMA output
+    dma_ops = access_tracker.latest_dma_ops(op_index, watermark.dma, arch.max_outstanding_dma)
     dma_outstanding = -1
-    dma_ops = 0
+    if not op_is_dma:
+        for outstanding, index in enumerate(dma_ops):
+            if access_tracker.accesses[index].conflicts(op_access):
+                dma_outstanding = outstanding
+                break
     dma_index = watermark.dma
+    if len(dma_ops) >= arch.max_outstanding_dma:
+        dma_index = max(dma_ops[-1] + 1, dma_index)
 
-    # Seek back in the command stream looking for NPU or DMA dependencies
-    # but only as far as the first dependency or the watermarks (dependencies
-    # before this point have been satisfied already).
-    # The watermark moves to after the latest element we must wait for, not
-    # the command that issues the wait.
-    # NPU->NPU dependency is handled via blockdep.
-    while (index >= npu_index) or (index >= dma_index):
-        prev_op = npu_op_list[index]
-        prev_access = memory_accesses[prev_op]
-
-        # Check NPU consuming DMA output
-        if isinstance(prev_op, NpuDmaOperation):
-            if index >= dma_index:
-                if not isinstance(npu_op, NpuDmaOperation):
-                    if (dma_outstanding == -1) and prev_access.conflicts(op_access):
-                        dma_outstanding = dma_ops
-                dma_ops += 1  # Count DMA ops in the pipeline
-                if dma_ops >= arch.max_outstanding_dma:
-                    dma_index = max(index + 1, dma_index)
-        # Check DMA consuming NPU output
-        else:
-            if index >= npu_index:
-                if isinstance(npu_op, NpuDmaOperation) and npu_outstanding == -1 and prev_access.conflicts(op_access):
-                    npu_outstanding = npu_ops
-                npu_ops += 1  # Count NPU ops in the pipeline
-                if npu_ops >= arch.max_outstanding_kernels:
-                    npu_index = max(index + 1, npu_index)
-
-        index -= 1
+    # Check DMA consuming NPU output
+    npu_ops = access_tracker.latest_npu_ops(op_index, watermark.npu, arch.max_outstanding_kernels)
+    npu_outstanding = -1
+    if op_is_dma:
+        for outstanding, index in enumerate(npu_ops):
+            if access_tracker.accesses[index].conflicts(op_access):
+                npu_outstanding = outstanding
+                break
+    npu_index = watermark.npu
+    if len(npu_ops) >= arch.max_outstanding_kernels:
+        npu_index = max(npu_ops[-1] + 1, npu_index)
 
     # Update DMA watermark if we didn't see any and the NPU pipeline is full
-    if (dma_ops == 0) and (npu_ops >= arch.max_outstanding_kernels):
+    if not dma_ops and len(npu_ops) >= arch.max_outstanding_kernels:
         dma_index = op_index
 
     # Bring the search watermark forwards as we complete for those dependencies
@@ -22,14 +22,22 @@
 # Pre-order traversal, this supports rewrites. Therefore, functions can return something other than the original value.
 #
 # Post-order traversal, this does not support rewrites. Therefore, functions must return the original value.
+from .profiler import Profiler
 
 
 def rewrite_graph_pre_order(nng, sg, arch, tensor_rewrite_list, op_rewrite_list, rewrite_unsupported=True):
 
+    tensor_rewrite_list = Profiler.wrap(tensor_rewrite_list)
+    op_rewrite_list = Profiler.wrap(op_rewrite_list)
     op_visit_dict = dict()
     tens_visit_dict = dict()
+    # The traversal uses an explicit stack instead of recursion. Each frame holds a rewritten op or tensor, the name of
+    # the attribute that its rewritten neighbours are added to, the original neighbours, the index of the next one to
+    # visit and the list that the rewritten op or tensor itself is added to. As in a recursive traversal, that list is
+    # chosen when the visit starts but only added to once all of the neighbours have been visited.
+    stack = []
 
-    def visit_op(op):
+    def visit_op(op, dest):
         if op in op_visit_dict:
             return op_visit_dict[op]
         res = op
@@ -45,17 +53,10 @@ def rewrite_graph_pre_order(nng, sg, arch, tensor_rewrite_list, op_rewrite_list,
 
         inputs = res.inputs
         res.inputs = []
-        for tens in inputs:
-            res.inputs.append(visit_tens(tens))
-
-        outputs = res.outputs
-        res.outputs = []
-        for tens in outputs:
-            res.outputs.append(visit_tens(tens))
-
+        stack.append([res, "inputs", inputs, 0, dest])
         return res
 
-    def visit_tens(tens):
+    def visit_tens(tens, dest):
         if tens in tens_visit_dict:
             return tens_visit_dict[tens]
 
@@ -72,11 +73,36 @@ def rewrite_graph_pre_order(nng, sg, arch, tensor_rewrite_list, op_rewrite_list,
         if res:
             ops = res.ops
             res.ops = []
-            for op in ops:
-                res.ops.append(visit_op(op))
+            stack.append([res, "ops", ops, 0, dest])
+        return res
+
+    def visit(tens):
+        res = visit_tens(tens, None)
+        while stack:
+            frame = stack[-1]
+            node, attr, neighbours, idx, dest = frame
+            if idx < len(neighbours):
+                frame[3] = idx + 1
+                depth = len(stack)
+                neighbour_dest = getattr(node, attr)
+                if attr == "ops":
+                    neighbour = visit_op(neighbours[idx], neighbour_dest)
+                else:
+                    neighbour = visit_tens(neighbours[idx], neighbour_dest)
+                if len(stack) == depth:
+                    # Nothing more to visit for this neighbour
+                    neighbour_dest.append(neighbour)
+            elif attr == "inputs":
+                outputs = node.outputs
+                node.outputs = []
+                stack[-1] = [node, "outputs", outputs, 0, dest]
+            else:
+                stack.pop()
+                if dest is not None:
+                    dest.append(node)
         return res
 
-    sg.output_tensors = [visit_tens(tens) for tens in sg.output_tensors]
+    sg.output_tensors = [visit(tens) for tens in sg.output_tensors]
     sg.refresh_after_modification()
 
     return sg
@@ -86,37 +112,45 @@ def visit_graph_post_order(start_tensors, arch, tensor_visit_list, op_visit_list
     # Depth-first graph traversal, starting from the given list of tensors
     # (typically a subgraph's output_tensors).
     # Visits ops and tensors in input to output order.
+    tensor_visit_list = Profiler.wrap(tensor_visit_list)
+    op_visit_list = Profiler.wrap(op_visit_list)
     op_visit_dict = dict()
     tens_visit_dict = dict()
+    # Explicit stack of the ops and tensors whose neighbours are being visited, see rewrite_graph_pre_order
+    stack = []
 
     def visit_op(op):
         if op in op_visit_dict:
             return
         op_visit_dict[op] = op
-
-        for tens in op.inputs:
-            visit_tens(tens)
-
-        for visit in op_visit_list:
-            visit(op, arch)
-
-        for tens in op.outputs:
-            visit_tens(tens)
+        stack.append([op, "inputs", op.inputs, 0])
 
     def visit_tens(tens):
         if tens is None or tens in tens_visit_dict:
             return
-
         tens_visit_dict[tens] = tens
-
-        for op in tens.ops:
-            visit_op(op)
-
-        for visit in tensor_visit_list:
-            visit(tens, arch)
+        stack.append([tens, "ops", tens.ops, 0])
 
     for tens in start_tensors:
         visit_tens(tens)
+        while stack:
+            frame = stack[-1]
+            node, attr, neighbours, idx = frame
+            if idx < len(neighbours):
+                frame[3] = idx + 1
+                if attr == "ops":
+                    visit_op(neighbours[idx])
+                else:
+                    visit_tens(neighbours[idx])
+            elif attr == "inputs":
+                for visit in op_visit_list:
+                    visit(node, arch)
+                stack[-1] = [node, "outputs", node.outputs, 0]
+            else:
+                stack.pop()
+                if attr == "ops":
+                    for visit in tensor_visit_list:
+                        visit(node, arch)
 
 
 def verify_graph_health(nng):
@@ -130,37 +164,43 @@ def verify_graph_health(nng):
 def verify_subgraph_health(sg):
     op_visit_dict = dict()
     tens_visit_dict = dict()
+    # Explicit stack of the ops and tensors whose neighbours are being visited, see rewrite_graph_pre_order
+    stack = []
 
     def visit_op(op):
         if op in op_visit_dict:
-            return op_visit_dict[op]
+            return
         op_visit_dict[op] = op
-
-        for tens in op.inputs:
-            if not tens:
-                continue
-            assert op in tens.consumers()
-            visit_tens(tens)
-
-        for tens in op.outputs:
-            assert op in tens.ops
-            visit_tens(tens)
-
-        return op
+        stack.append([op, "inputs", op.inputs, 0])
 
     def visit_tens(tens):
         if tens in tens_visit_dict:
-            return tens_visit_dict[tens]
-
+            return
         tens_visit_dict[tens] = tens
-
-        for op in tens.ops:
-            assert tens in op.outputs
-            visit_op(op)
-
-        return tens
+        stack.append([tens, "ops", tens.ops, 0])
 
     for tens in sg.output_tensors:
         visit_tens(tens)
+        while stack:
+            frame = stack[-1]
+            node, attr, neighbours, idx = frame
+            if idx < len(neighbours):
+                frame[3] = idx + 1
+                neighbour = neighbours[idx]
+                if attr == "ops":
+                    assert node in neighbour.outputs
+                    visit_op(neighbour)
+                elif attr == "inputs":
+                    if not neighbour:
+                        continue
+                    assert node in neighbour.consumers()
+                    visit_tens(neighbour)
+                else:
+                    assert node in neighbour.ops
+                    visit_tens(neighbour)
+            elif attr == "inputs":
+                stack[-1] = [node, "outputs", node.outputs, 0]
+            else:
+                stack.pop()
 
     return True
@@ -18,6 +18,8 @@
 import math
 from enum import IntEnum
 
+import numpy as np
+
 from .numeric_util import round_away_zero
 
 
@@ -53,6 +55,27 @@ def reduced_quantise_scale(scale):
     return reduced_multiplier, reduced_shift
 
 
+# Quantise an array of floating point scale values into 32-bit int scales and 6-bit shifts, gives the same results as
+# quantise_scale for every value
+def quantise_scales(scales):
+    significands, exponents = np.frexp(np.asarray(scales, dtype=np.float64))
+    significands_q31 = significands * (1 << 31)
+    significands_q31 = np.trunc(significands_q31 + np.where(significands_q31 < 0, -0.5, 0.5)).astype(np.int64)
+    shifts = 31 - exponents.astype(np.int64)
+
+    # Shifts outside of valid range, set scale to 0
+    valid = (0 <= shifts) & (shifts < (1 << 6))
+    return np.where(valid, significands_q31, 0), np.where(valid, shifts, 16)
+
+
+# Reduced precision quantization of an array of scale values for int16, gives the same results as
+# reduced_quantise_scale for every value
+def reduced_quantise_scales(scales):
+    multipliers, shifts = quantise_scales(scales)
+    reduced_multipliers = np.where(multipliers < 32767 << 16, (multipliers + (1 << 15)) >> 16, 32767)
+    return reduced_multipliers, shifts - 16
+
+
 # Calculate global OFM scale for Average Pooling
 def quantise_pooling_scale(nr_kernel_elements, rescale_bits=0):
     _, k = math.frexp(nr_kernel_elements - 1)
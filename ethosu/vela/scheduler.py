@@ -21,6 +21,7 @@
 from __future__ import annotations
 
 import copy
+import itertools
 from collections import namedtuple
 from enum import auto
 from enum import IntEnum
@@ -47,6 +48,7 @@ from .architecture_features import ArchitectureFeatures
 from .architecture_features import Block
 from .cascade_builder import CascadeBuilder
 from .cascade_builder import CascadeInfo
+from .compilation_context import CompilationContext
 from .data_type import DataType
 from .nn_graph import CascadedPass
 from .nn_graph import Graph
@@ -58,6 +60,7 @@ from .numeric_util import round_down
 from .numeric_util import round_up
 from .operation import NpuBlockType
 from .operation import Op
+from .profiler import Profiler
 from .shape4d import Shape4D
 from .tensor import MemArea
 from .tensor import MemType
@@ -66,6 +69,7 @@ from .tensor import TensorFormat
 from .tensor import TensorPurpose
 from .tensor import TensorSubPurpose
 from .weight_compressor import NpuWeightTensor
+from .weight_compressor import WeightEncodeRequest
 
 
 def shape_for_format(shape: Shape4D, tensor_format: TensorFormat) -> Shape4D:
@@ -104,8 +108,10 @@ class SchedulerOpInfo:
         self.cascade = 0  # Assigned by CascadeBuilder. 0 means not part of a cascade
         self.time_index = None  # Set by update_op_memory_snapshot
         self.ofm_depth_slices: List[int] = [0, stripe.depth]
-        self.npu_weights_tensor: Optional[NpuWeightTensor] = None
-        self.npu_scales_tensor: Optional[NpuWeightTensor] = None
+        self._npu_weights_tensor: Optional[NpuWeightTensor] = None
+        self._npu_scales_tensor: Optional[NpuWeightTensor] = None
+        # Weight encoding that is deferred until the schedule is applied, see Scheduler.encode_weights
+        self.pending_weight_encoding: Optional[WeightEncodeRequest] = None
         self.buffered_weight_tensors: List[Tensor] = []
         self.cycles: Optional[CycleCost] = None
         self.slack_buffering_cycles = 0
@@ -123,13 +129,31 @@ class SchedulerOpInfo:
         res.cascade = self.cascade
         return res
 
+    @property
+    def npu_weights_tensor(self) -> Optional[NpuWeightTensor]:
+        assert self.pending_weight_encoding is None, "Deferred weight encoding must be resolved before use"
+        return self._npu_weights_tensor
+
+    @property
+    def npu_scales_tensor(self) -> Optional[NpuWeightTensor]:
+        assert self.pending_weight_encoding is None, "Deferred weight encoding must be resolved before use"
+        return self._npu_scales_tensor
+
+    def set_encoded_weights(
+        self, npu_weights_tensor: Optional[NpuWeightTensor], npu_scales_tensor: Optional[NpuWeightTensor]
+    ):
+        """Sets the encoded weights and scales of the Op, replacing any deferred weight encoding"""
+        self.pending_weight_encoding = None
+        self._npu_weights_tensor = npu_weights_tensor
+        self._npu_scales_tensor = npu_scales_tensor
+
     def __str__(self):
         res = f"\t\tBlock Config = {self.block_config}\n"
         res += f"\t\tOFM Block = {self.block_config.ofm_block}\n"
         res += f"\t\tIFM Stripe   = {self.stripe_input}\n"
         res += f"\t\tIFM2 Stripe  = {self.stripe_input2}\n"
         res += f"\t\tOFM Stripe   = {self.stripe}\n"
-        res += f"\t\tEncoded Weights = {self.npu_weights_tensor and len(self.npu_weights_tensor.buffer)} bytes\n"
+        res += f"\t\tEncoded Weights = {self._npu_weights_tensor and len(self._npu_weights_tensor.buffer)} bytes\n"
         for idx, tens in enumerate(self.buffered_weight_tensors):
             res += f"\t\tWeight buffer{idx + 1} = {tens.storage_size()} bytes\n"
         res += f"\t\tDepth slices = {self.ofm_depth_slices}\n"
@@ -145,10 +169,13 @@ class SchedulerOptions:
         optimization_strategy,
         sram_target,
         verbose_schedule,
+        search_effort=1,
     ):
         self.optimization_strategy = optimization_strategy
         self.optimization_sram_limit = sram_target
         self.verbose_schedule = verbose_schedule
+        # Number of stripe heights proposed per cascade in addition to the binary search, 1 disables the wider search
+        self.search_effort = search_effort
 
     def __str__(self) -> str:
         return f"{type(self).__name__}: {str(self.__dict__)}"
@@ -279,24 +306,21 @@ class SchedulerOperation:
         block_config = self._get_block_config(ifm_shape, ifm2_shape, self.uses_scalar, ofm_shape)
 
         scheduler_op_info = SchedulerOpInfo(block_config, 0, ifm_shape, ifm2_shape, ofm_shape)
-        if self.parent_op.weights:
-            # Default full-depth weight encoding with no buffering
-            (
-                scheduler_op_info.npu_weights_tensor,
-                scheduler_op_info.npu_scales_tensor,
-            ) = weight_compressor.encode_weight_and_scale_tensor(
-                self.arch,
-                self.parent_op,
-                self.parent_op.weights,
-                self.parent_op.bias,
-                self.kernel,
-                block_config,
-                [0, self.ofm.shape.depth],
-            )
 
         self.parent_ps.block_config = block_config.old_style_representation()
         return scheduler_op_info
 
+    def weight_encode_request(self, block_config: ArchitectureBlockConfig) -> weight_compressor.WeightEncodeRequest:
+        """Returns the request for the default full-depth weight encoding with no buffering"""
+        return weight_compressor.WeightEncodeRequest(
+            self.parent_op,
+            self.parent_op.weights,
+            self.parent_op.bias,
+            self.kernel,
+            block_config,
+            [0, self.ofm.shape.depth],
+        )
+
     def _get_stripe_input_requirement(self, stripe_shape: Shape4D) -> Tuple[int, int]:
         """Returns the amount of IFM required to produce the stripe with shape:'stripe_shape'"""
         ofm_shape_to_produce = Block.from_shape(stripe_shape.as_list())
@@ -372,6 +396,8 @@ class Scheduler:
         self.sched_ops: List[SchedulerOperation] = []
         self.max_schedule: Optional[Schedule] = None
         self.scheduler_options = options
+        # Memory usage without the buffered weights, and the time index of each op, keyed by the cascade layout
+        self.memory_snapshot_cache: Dict[Tuple, Tuple[np.ndarray, List[int]]] = {}
 
     def avoid_nhcwb16_for_ofm(self, tens, ps, arch):
         # Only run this check for opt strategy Size
@@ -412,6 +438,7 @@ class Scheduler:
 
         return False
 
+    @Profiler.profile
     def create_scheduler_representation(self, arch: ArchitectureFeatures):
         """Creates a Scheduler Graph representation"""
         # Temporary dict for creating connections between the Operations
@@ -486,6 +513,7 @@ class Scheduler:
         # Theoretical minimum required memory - used to guide the cascade building
         self.min_memory_req = min_memory_req
 
+    @Profiler.profile
     def create_initial_schedule(self) -> Schedule:
         """Creates an initial schedule with no cascading or buffering of any kind"""
         schedule = Schedule(self.sg, "MAX")
@@ -494,52 +522,127 @@ class Scheduler:
             cost.cycles = self.estimate_op_performance(op, cost.block_config, op.ofm.shape.depth)
             schedule.cost_map[op] = cost
 
+        self.encode_weights(schedule)
         return schedule
 
+    def encode_weights(self, schedule: Schedule, lazy: bool = False):
+        """Performs the default full-depth weight encoding, with no buffering, for all Ops in the schedule. If lazy is
+        set then the encoding is deferred until the schedule is applied, which avoids encoding the weights of schedule
+        proposals that are only used for their memory usage and cycle estimates. The encoded weights of a deferred
+        encoding must not be used before resolve_weight_encodings has been called.
+
+        Only the default encoding can be deferred. The weight buffering proposals of propose_schedule_buffering
+        depend on the sizes of the encoded streams, which are only known after encoding the weights, so they are
+        always encoded immediately. Encoding the same weights again later is served by CompressedWeightCache."""
+        for sched_op, cost in schedule.cost_map.items():
+            if sched_op.parent_op.weights:
+                cost.pending_weight_encoding = sched_op.weight_encode_request(cost.block_config)
+
+        if not lazy:
+            self.resolve_weight_encodings(schedule)
+
+    @Profiler.profile
+    def resolve_weight_encodings(self, schedule: Schedule):
+        """Performs all deferred weight encodings of the schedule. The weights of all Ops are encoded together so that
+        they can be encoded in parallel"""
+        costs = [cost for cost in schedule.cost_map.values() if cost.pending_weight_encoding is not None]
+        requests = [cost.pending_weight_encoding for cost in costs]
+        encoded = weight_compressor.encode_weight_and_scale_tensors(self.arch, requests)
+        for cost, (npu_weights_tensor, npu_scales_tensor) in zip(costs, encoded):
+            cost.set_encoded_weights(npu_weights_tensor, npu_scales_tensor)
+
+    def memory_snapshot_key(self, schedule: Schedule) -> Tuple:
+        """Returns the parts of the schedule that decide the time index of each op, and the sizes of the cascade
+        buffers"""
+        key = []
+        for sched_op in self.sched_ops:
+            op_info = schedule.cost_map[sched_op]
+            cascade_info = schedule.cascades.get(op_info.cascade, None)
+            if cascade_info and sched_op in cascade_info.buffers:
+                buffer_size = cascade_info.buffers[sched_op].elements() * sched_op.ifm.dtype.size_in_bytes()
+            else:
+                buffer_size = None
+            key.append((op_info.cascade, buffer_size))
+        return tuple(key)
+
+    def buffered_weights_memory_usage(self, schedule: Schedule, time_indices: List[int], length: int) -> np.ndarray:
+        """Returns the temporal memory usage of the buffered weights of the schedule"""
+        mem_area = self.arch.fast_storage_mem_area
+        mem_type_set = set((MemType.Scratch, MemType.Scratch_fast))
+        lr_graph = live_range.LiveRangeGraph()
+        for sched_op, time_index in zip(self.sched_ops, time_indices):
+            op_info = schedule.cost_map[sched_op]
+            live_range.mark_buffered_weights_usage(op_info, time_index, lr_graph, mem_area, mem_type_set)
+        lr_graph.current_time = length - 1
+        return lr_graph.get_temporal_memory_usage(mem_area)
+
+    @Profiler.profile
     def update_op_memory_snapshot(self, schedule: Schedule):
-        memories_list = [(self.arch.fast_storage_mem_area, set((MemType.Scratch, MemType.Scratch_fast)))]
+        # The live ranges are extracted from the schedule of the subgraph
+        sg_schedule = self.sg.schedule
+        key = self.memory_snapshot_key(sg_schedule)
+        cached = self.memory_snapshot_cache.get(key)
+        if cached is not None:
+            # Only the buffered weights differ from an earlier snapshot with the same cascades, so only their usage
+            # needs to be added
+            base_usage, time_indices = cached
+            for sched_op, time_index in zip(self.sched_ops, time_indices):
+                sg_schedule.cost_map[sched_op].time_index = time_index
+            temporal_usage = base_usage + self.buffered_weights_memory_usage(sg_schedule, time_indices, len(base_usage))
+        else:
+            memories_list = [(self.arch.fast_storage_mem_area, set((MemType.Scratch, MemType.Scratch_fast)))]
+
+            # Collect live ranges from tensors
+            lr_graph = live_range.LiveRangeGraph()
+            for mem_area, mem_type_set in memories_list:
+                live_range.extract_live_ranges_from_cascaded_passes(
+                    self.nng.get_root_subgraph(),
+                    mem_area,
+                    mem_type_set,
+                    lr_graph,
+                    Tensor.AllocationQuantum,
+                )
 
-        # Collect live ranges from tensors
-        lr_graph = live_range.LiveRangeGraph()
-        for mem_area, mem_type_set in memories_list:
-            live_range.extract_live_ranges_from_cascaded_passes(
-                self.nng.get_root_subgraph(),
-                mem_area,
-                mem_type_set,
-                lr_graph,
-                Tensor.AllocationQuantum,
+            # Populate time-array with memory used by live ranges
+            temporal_usage = lr_graph.get_temporal_memory_usage(self.arch.fast_storage_mem_area)
+
+            time_indices = [sg_schedule.cost_map[sched_op].time_index for sched_op in self.sched_ops]
+            base_usage = temporal_usage - self.buffered_weights_memory_usage(
+                sg_schedule, time_indices, len(temporal_usage)
             )
+            self.memory_snapshot_cache[key] = (base_usage, time_indices)
 
-        # Populate time-array with memory used by live ranges
-        temporal_usage = lr_graph.get_temporal_memory_usage(self.arch.fast_storage_mem_area)
         schedule.memory_snapshot = temporal_usage
 
         # Set the peak memory usage
         schedule.fast_storage_peak_usage = max(temporal_usage, default=0)
 
     def estimate_op_performance(self, op: SchedulerOperation, block_config, ofm_depth):
-        query = npu_performance.PerformanceQuery(op.op_type.npu_block_type)
-        query.ifm_shape = op.ifm.shape
-        query.ifm_memory_area = op.ifm.mem_area
-        query.ifm_bits = op.ifm.dtype.size_in_bits()
-        query.ifm_format = op.ifm.format
-        query.ifm2_shape = op.ifm2 and op.ifm2.shape
-        query.ifm2_memory_area = op.ifm2 and op.ifm2.mem_area
-        query.ifm2_bits = op.ifm2 and op.ifm2.dtype.size_in_bits()
-        query.ifm2_format = op.ifm2 and op.ifm2.format
-        query.ofm_shape = op.ofm.shape.with_depth(ofm_depth)
-        query.ofm_memory_area = op.ofm.mem_area
-        query.ofm_bits = op.ofm.dtype.size_in_bits()
-        query.ofm_format = op.ofm.format
+        query = npu_performance.PerformanceQuery(
+            npu_block_type=op.op_type.npu_block_type,
+            ifm_shape=op.ifm.shape,
+            ifm_memory_area=op.ifm.mem_area,
+            ifm_bits=op.ifm.dtype.size_in_bits(),
+            ifm_format=op.ifm.format,
+            ifm2_shape=op.ifm2 and op.ifm2.shape,
+            ifm2_memory_area=op.ifm2 and op.ifm2.mem_area,
+            ifm2_bits=op.ifm2 and op.ifm2.dtype.size_in_bits(),
+            ifm2_format=op.ifm2 and op.ifm2.format,
+            ofm_shape=op.ofm.shape.with_depth(ofm_depth),
+            ofm_memory_area=op.ofm.mem_area,
+            ofm_bits=op.ofm.dtype.size_in_bits(),
+            ofm_format=op.ofm.format,
+            kernel=op.kernel,
+            config=block_config,
+        )
         if op.parent_op.bias:
-            query.const_shape = Shape4D(1, 1, 1, op.ofm.shape.depth)
-            query.const_memory_area = self.arch.fast_storage_mem_area
-
-        query.kernel = op.kernel
-        query.config = block_config
+            query = query._replace(
+                const_shape=Shape4D(1, 1, 1, op.ofm.shape.depth), const_memory_area=self.arch.fast_storage_mem_area
+            )
 
         return npu_performance.measure_cycle_cost(self.arch, op.op_type, op.activation and op.activation.op_type, query)
 
+    @Profiler.profile
     def propose_schedule_buffering(self, ref_schedule: Schedule, staging_limit_bytes):
         """Create a buffered schedule"""
         buffered_schedule = Schedule(self.sg, f"{ref_schedule.label}_BUFFERED")
@@ -635,8 +738,7 @@ class Scheduler:
 
         # No buffering required - take all the weights from permanent storage
         if sched_op.op_type == Op.FullyConnected or not needs_dma:
-            cost.npu_weights_tensor = full_weights
-            cost.npu_scales_tensor = full_scales
+            cost.set_encoded_weights(full_weights, full_scales)
             return
 
         encoded_weights: Optional[NpuWeightTensor] = full_weights
@@ -778,8 +880,7 @@ class Scheduler:
             encoded_weights = full_weights
             encoded_scales = full_scales
 
-        cost.npu_weights_tensor = encoded_weights
-        cost.npu_scales_tensor = encoded_scales
+        cost.set_encoded_weights(encoded_weights, encoded_scales)
 
     def buffer_tensor(self, src_tensor: Tensor, sub_purpose: TensorSubPurpose, buffer_size: int, name: str) -> Tensor:
         buffered_weight_tensor = Tensor([1, 1, 1, buffer_size], DataType.uint8, name)
@@ -790,6 +891,7 @@ class Scheduler:
         buffered_weight_tensor.sub_purpose = sub_purpose
         return buffered_weight_tensor
 
+    @Profiler.profile
     def propose_minimal_schedule(self) -> Schedule:
         """Proposes scheduling parameters where every operator is subdivided into the smallest stripe that satisfies the
         next operators stride"""
@@ -808,6 +910,7 @@ class Scheduler:
 
             prev_op = sched_op
 
+        self.encode_weights(min_schedule, lazy=True)
         return min_schedule
 
     def propose_schedule_striping(self, final_stripe: Shape4D, label: str, ref_schedule: Schedule) -> Schedule:
@@ -824,15 +927,6 @@ class Scheduler:
             # Create a cost entry with the new stripe
             cost = sched_op.create_scheduler_info(self.nng, stripe)
 
-            for buffered_tens in ref_cost[sched_op].buffered_weight_tensors:
-                # If the weights are buffered in the reference schedule they should be in the new proposal
-                weight_tensor = cost.npu_weights_tensor
-                cost.buffered_weight_tensors.append(
-                    self.buffer_tensor(
-                        weight_tensor, TensorSubPurpose.Standard, buffered_tens.storage_size(), buffered_tens.name
-                    )
-                )
-
             # Estimate performance
             cost.cycles = self.estimate_op_performance(sched_op, cost.block_config, sched_op.ofm.shape.depth)
             striped_schedule.cost_map[sched_op] = cost
@@ -840,6 +934,19 @@ class Scheduler:
             # Calculate the preceeding Op's stripe
             stripe = sched_op.ifm.shape.with_height(stripe.height * sched_op.kernel.stride.y)
 
+        # The encoded weights are only needed if this proposal ends up in the final schedule
+        self.encode_weights(striped_schedule, lazy=True)
+
+        for sched_op, cost in striped_schedule.cost_map.items():
+            for buffered_tens in ref_cost[sched_op].buffered_weight_tensors:
+                # If the weights are buffered in the reference schedule they should be in the new proposal. The
+                # src_tensor is set by apply_schedule, once the weights have been encoded
+                cost.buffered_weight_tensors.append(
+                    self.buffer_tensor(
+                        None, TensorSubPurpose.Standard, buffered_tens.storage_size(), buffered_tens.name
+                    )
+                )
+
         return striped_schedule
 
     def estimate_schedule_memory_usage(self, schedule: Schedule, non_local_mem_usage: dict):
@@ -919,6 +1026,7 @@ class Scheduler:
         possible_stripes = [
             final_ofm_shape.with_height(stripe_h) for stripe_h in range(1, final_ofm_shape.height // 2 + 1)
         ]
+        all_stripes = possible_stripes
 
         # Propose different striping - the possible stripes are proposed similarly to a binary search
         best_schedule = None
@@ -946,8 +1054,93 @@ class Scheduler:
 
             iteration += 1
 
+        # The wider search is only done for sub-schedules that the binary search had to cascade, or could not fit.
+        # A binary search result without cascades runs every Op unstriped, which is what the search is trying to get
+        # closer to, so it is kept as it is, like the early exit above does.
+        if self.scheduler_options.search_effort > 1 and (best_schedule is None or best_schedule.cascades):
+            best_schedule = self.search_sub_schedule(
+                best_schedule,
+                all_stripes,
+                buffered_sub_schedule,
+                cascade_builder,
+                max_template,
+                memory_limit,
+                non_local_mem_usage,
+            )
+
+        return best_schedule
+
+    def search_sub_schedule(
+        self,
+        best_schedule: Optional[Schedule],
+        possible_stripes: List[Shape4D],
+        buffered_sub_schedule: Schedule,
+        cascade_builder: CascadeBuilder,
+        max_template: Schedule,
+        memory_limit: int,
+        non_local_mem_usage: dict,
+    ) -> Optional[Schedule]:
+        """Proposes more stripings and cascade splits of a sub-schedule than the binary search does, and returns the
+        proposal with the fewest estimated cycles that fits within the memory limit. The stripe heights are spread
+        evenly over the possible stripes, and each one is cascaded with a lower and a higher guiding memory limit too,
+        which gives longer and shorter cascades respectively"""
+        effort = self.scheduler_options.search_effort
+        num_stripes = len(possible_stripes)
+        if num_stripes == 0:
+            return best_schedule
+        stripes = sorted({possible_stripes[(num_stripes - 1) * i // (effort - 1)] for i in range(effort)})
+        guiding_limits = (memory_limit, memory_limit // 2, memory_limit * 2)
+
+        best_cycles = self.estimate_schedule_cycles(best_schedule) if best_schedule else None
+        for iteration, (proposed_stripe, guiding_limit) in enumerate(itertools.product(stripes, guiding_limits)):
+            proposed_schedule = self.propose_schedule_striping(
+                proposed_stripe, f"SEARCH_{iteration}", buffered_sub_schedule
+            )
+            cascade_builder.build_cascades(proposed_schedule, max_template, guiding_limit)
+            if self.estimate_schedule_memory_usage(proposed_schedule, non_local_mem_usage) > memory_limit:
+                continue
+
+            # Ties keep the earlier proposal, so a wider search never replaces the binary search result needlessly
+            proposed_cycles = self.estimate_schedule_cycles(proposed_schedule)
+            if best_cycles is None or proposed_cycles < best_cycles:
+                best_schedule = proposed_schedule
+                best_cycles = proposed_cycles
+
         return best_schedule
 
+    def estimate_schedule_cycles(self, schedule: Schedule) -> float:
+        """Estimates the cycles of a schedule as the sum, over its Ops, of the NPU cycles or the cycles for
+        transferring the feature maps if that takes longer. The feature maps that are buffered within a cascade are
+        transferred to and from fast storage.
+
+        This is only used to compare the proposals of search_sub_schedule, and leaves out the cycles for transferring
+        weights. The weight buffering of the Ops is only proposed after the search, by propose_schedule_buffering on
+        the optimised schedule, so the proposals have no weight buffers yet and their weights are not encoded. The
+        full performance model of npu_performance needs both."""
+        bandwidths = self.arch.memory_bandwidths_per_cycle
+        fast_storage_mem_area = self.arch.fast_storage_mem_area
+        total_cycles = 0.0
+        for sched_op, cost in schedule.cost_map.items():
+            ifm_mem_area = sched_op.ifm.mem_area
+            ofm_mem_area = sched_op.ofm.mem_area
+            cascade_info = schedule.cascades.get(cost.cascade)
+            if cascade_info:
+                if sched_op in cascade_info.buffers:
+                    ifm_mem_area = fast_storage_mem_area
+                if sched_op.index != cascade_info.end:
+                    ofm_mem_area = fast_storage_mem_area
+
+            transfer_cycles = (
+                sched_op.ifm_size_in_bytes() / bandwidths[ifm_mem_area]
+                + sched_op.ofm_size_in_bytes() / bandwidths[ofm_mem_area]
+            )
+            if sched_op.ifm2:
+                transfer_cycles += sched_op.ifm2_size_in_bytes() / bandwidths[sched_op.ifm2.mem_area]
+            total_cycles += max(cost.cycles.op_cycles, transfer_cycles)
+
+        return total_cycles
+
+    @Profiler.profile
     def optimize_schedule(
         self,
         schedule: Schedule,
@@ -981,8 +1174,12 @@ class Scheduler:
         optimized_sched.cascades = schedule.cascades
         return optimized_sched
 
+    @Profiler.profile
     def apply_schedule(self, sched: Schedule):
         """Applies the given schedule as a final solution"""
+        # The memory areas of the tensors change, so earlier memory snapshots can no longer be reused
+        self.memory_snapshot_cache.clear()
+        self.resolve_weight_encodings(sched)
         for sched_op in self.sched_ops:
             op_info = sched.cost_map[sched_op]
             cascade_info = sched.cascades.get(op_info.cascade, None)
@@ -1001,6 +1198,7 @@ class Scheduler:
             for tens in op_info.buffered_weight_tensors:
                 tens.src_tensor = op_info.npu_weights_tensor
 
+    @Profiler.profile
     def use_fast_storage_for_feature_maps(self, schedule, staging_limit):
         scratched_fms = {}
         max_mem_usage = []
@@ -1092,6 +1290,7 @@ class Scheduler:
             component_allocator, competing_lrs[start:sz], max_mem_usage, base_mem_usage, staging_limit, scratched_fms
         )
 
+    @Profiler.profile
     def move_constant_data(self):
         """Determine if  data, can be moved from permanent storage to another memory area. A move
         will generate a DMA command in the high-level command stream"""
@@ -1195,6 +1394,9 @@ def _update_tensor_allocation(nng: Graph, arch: ArchitectureFeatures, options):
 
 
 class FastStorageComponentAllocator:
+    """Finds the subset of a component of competing live ranges that keeps the largest total size in fast storage,
+    using a depth first branch-and-bound search over keeping or evicting each live range"""
+
     def __init__(self, base_mem_usage, max_mem_usage, staging_limit):
         self.base_mem_usage = base_mem_usage
         self.max_mem_usage = list(max_mem_usage)
@@ -1204,7 +1406,35 @@ class FastStorageComponentAllocator:
         self.curr_evicted = []
         self.remaining_total_size = []
         self.best_allocated_size = 0
-        self.max_exhaustive_size = 20
+        self.max_exhaustive_size = 60
+        # Larger components first get an initial allocation by allocating them in parts of this size
+        self.max_part_size = 20
+        # Number of search nodes after which a search that is seeded with the allocation of the parts uses the best
+        # allocation found so far. The searches of components and parts of up to max_part_size are exact.
+        self.max_search_nodes = 1 << 15
+        self.search_nodes = 0
+        self.limit_search = False
+
+    def remaining_size_bound(self, ix):
+        """Returns an upper bound on the total size of the live ranges, from index ix onwards, that can be kept.
+        The live ranges are split into groups that are all live during a common time window, the live ranges that
+        are kept from a group cannot exceed the memory that is still available during that window."""
+        bound = 0
+        group_size = 0
+        group_start = group_end = -1
+        for lr in itertools.islice(self.lrs, ix, None):
+            if lr.start_time > group_end:
+                if group_size:
+                    available = self.staging_limit - max(self.base_mem_usage[group_start : group_end + 1])
+                    bound += min(group_size, max(0, available))
+                group_size = 0
+                group_end = lr.end_time
+            else:
+                group_end = min(group_end, lr.end_time)
+            group_start = lr.start_time
+            group_size += lr.size
+        available = self.staging_limit - max(self.base_mem_usage[group_start : group_end + 1])
+        return bound + min(group_size, max(0, available))
 
     def allocate_exhaustive(self, ix, alloc_size):
         if ix >= len(self.lrs):
@@ -1213,6 +1443,16 @@ class FastStorageComponentAllocator:
                 self.evicted = self.curr_evicted.copy()
             return
 
+        # Prune if the remaining live ranges cannot improve on the best allocation. Only strictly better allocations
+        # are recorded, so the result is the same as that of a search without pruning.
+        if alloc_size + self.remaining_total_size[ix] <= self.best_allocated_size:
+            return
+        if alloc_size + self.remaining_size_bound(ix) <= self.best_allocated_size:
+            return
+        self.search_nodes += 1
+        if self.limit_search and self.search_nodes > self.max_search_nodes:
+            return
+
         lr = self.lrs[ix]
         for t in range(lr.start_time, lr.end_time):
             assert self.base_mem_usage[t] <= self.max_mem_usage[t]
@@ -1258,17 +1498,49 @@ class FastStorageComponentAllocator:
             base_mem_usage[t] += lr.size
             assert base_mem_usage[t] <= staging_limit
 
+    def search(self, lrs, base_mem_usage, evicted, allocated_size, limit_search=False):
+        """Searches for the allocation of the lrs that keeps the largest total size, starting from the given best
+        allocation. The search is stopped after max_search_nodes if limit_search is set. Returns the evicted flags
+        and the total size of the kept lrs of the best allocation found."""
+        self.lrs = lrs
+        self.limit_search = limit_search
+        self.base_mem_usage = base_mem_usage
+        self.evicted = evicted
+        self.curr_evicted = [0] * len(lrs)
+        self.best_allocated_size = allocated_size
+        self.remaining_total_size = list(itertools.accumulate(lr.size for lr in reversed(lrs)))[::-1] + [0]
+        self.search_nodes = 0
+        self.allocate_exhaustive(0, 0)
+        return self.evicted, self.best_allocated_size
+
     def allocate_component(self, allocator, lrs, max_mem, min_mem, staging_limit, scratched_fms):
-        sz = len(lrs)
-        allocator.lrs = lrs
-        allocator.evicted = [0] * len(lrs)
-        allocator.curr_evicted = [0] * sz
-        allocator.best_allocated_size = -1
-        # Recursively evaluate all permutations of allocations of the lrs found in the component
-        allocator.allocate_exhaustive(0, 0)
-
-        # Optimal allocation has been found, move lrs accordingly
-        for i, e in enumerate(allocator.evicted):
+        # The search is done on a copy of the memory usage, as a list for fast element access
+        base_mem_usage = [int(usage) for usage in min_mem]
+        evicted = [0] * len(lrs)
+        allocated_size = -1
+        if len(lrs) > allocator.max_part_size:
+            # Allocate the parts one after the other, the search of the whole component then only has to find
+            # allocations that are better than this one
+            evicted = []
+            allocated_size = 0
+            for start in range(0, len(lrs), allocator.max_part_size):
+                part = lrs[start : start + allocator.max_part_size]
+                part_evicted, part_size = allocator.search(part, base_mem_usage, [0] * len(part), -1)
+                evicted += part_evicted
+                allocated_size += part_size
+                for lr, e in zip(part, part_evicted):
+                    if not e:
+                        allocator.update_mem_usage(base_mem_usage, lr, True)
+            base_mem_usage = [int(usage) for usage in min_mem]
+
+        # Recursively search the allocations of the lrs found in the component. The search of a large component is
+        # limited, as it always has the allocation of its parts to fall back on.
+        evicted, _ = allocator.search(
+            lrs, base_mem_usage, evicted, allocated_size, limit_search=len(lrs) > allocator.max_part_size
+        )
+
+        # Best allocation has been found, move lrs accordingly
+        for i, e in enumerate(evicted):
             if e:
                 self.evict(lrs[i], max_mem, scratched_fms)
             else:
@@ -1344,6 +1616,9 @@ def schedule_passes(nng: Graph, arch: ArchitectureFeatures, options, scheduler_o
 
             if scheduler_options.verbose_schedule:
                 scheduler.print_schedule(sg.schedule)
+                context = CompilationContext.current()
+                for cache in (context.block_config_cache, context.cycle_cost_cache, context.element_access_cache):
+                    print(f"\t{cache.stats()}")
 
     # Evaluate schedule
     _update_tensor_allocation(nng, arch, options)
@@ -16,7 +16,6 @@
 # Description:
 # Writes out per-pass and summary performance statistics to CSV files.
 import csv
-import sys
 
 import numpy as np
 
@@ -34,105 +33,117 @@ def mem_areas_to_report():
     return [area for area in MemArea.all() if area != MemArea.Shram]
 
 
-def write_summary_metrics_csv(nng, summary_filename, arch):
-    with open(summary_filename, "w") as f:
-        writer = csv.writer(f)
-        mem_areas = mem_areas_to_report()
+def summary_metrics(nng, arch):
+    """Returns the column labels and the values of the summary metrics of a compiled network"""
+    mem_areas = mem_areas_to_report()
 
-        labels = [
-            "experiment",
-            "network",
-        ]
+    labels = [
+        "experiment",
+        "network",
+    ]
 
-        labels += (
-            ["accelerator_configuration", "system_config", "memory_mode", "core_clock", "arena_cache_size"]
-            + [area.identifier_name() + "_bandwidth" for area in mem_areas]
-            + ["weights_storage_area", "feature_map_storage_area"]
-        )
+    labels += (
+        ["accelerator_configuration", "system_config", "memory_mode", "core_clock", "arena_cache_size"]
+        + [area.identifier_name() + "_bandwidth" for area in mem_areas]
+        + ["weights_storage_area", "feature_map_storage_area"]
+    )
 
+    labels += [
+        "inferences_per_second",
+        "batch_size",
+        "inference_time",
+        "passes_before_fusing",
+        "passes_after_fusing",
+    ]
+    labels += [area.identifier_name() + "_memory_used" for area in mem_areas]
+    labels += ["total_original_weights"]
+    labels += ["total_npu_weights"]
+    labels += ["total_npu_encoded_weights"]
+
+    for mem_area in mem_areas:
         labels += [
-            "inferences_per_second",
-            "batch_size",
-            "inference_time",
-            "passes_before_fusing",
-            "passes_after_fusing",
+            mem_area.identifier_name() + "_feature_map_read_bytes",
+            mem_area.identifier_name() + "_feature_map_write_bytes",
+            mem_area.identifier_name() + "_weight_read_bytes",
+            mem_area.identifier_name() + "_weight_write_bytes",
+            mem_area.identifier_name() + "_total_bytes",
         ]
-        labels += [area.identifier_name() + "_memory_used" for area in mem_areas]
-        labels += ["total_original_weights"]
-        labels += ["total_npu_weights"]
-        labels += ["total_npu_encoded_weights"]
-
-        for mem_area in mem_areas:
-            labels += [
-                mem_area.identifier_name() + "_feature_map_read_bytes",
-                mem_area.identifier_name() + "_feature_map_write_bytes",
-                mem_area.identifier_name() + "_weight_read_bytes",
-                mem_area.identifier_name() + "_weight_write_bytes",
-                mem_area.identifier_name() + "_total_bytes",
-            ]
 
-        labels += ["nn_macs", "nn_tops"]
+    labels += ["nn_macs", "nn_tops"]
 
-        labels += ["cycles_" + kind.identifier_name() for kind in PassCycles.all()]
+    labels += ["cycles_" + kind.identifier_name() for kind in PassCycles.all()]
 
-        writer.writerow(labels)
-
-        data_items = [
-            "default",
-            nng.name,
-        ]
+    data_items = [
+        "default",
+        nng.name,
+    ]
 
-        if arch:
-            data_items += (
-                [
-                    arch.accelerator_config.name,
-                    arch.system_config,
-                    arch.memory_mode,
-                    arch.core_clock,
-                    arch.arena_cache_size / 1024,
-                ]
-                + [arch.memory_bandwidths_per_second[mem_area] / 1000.0 / 1000 / 1000 for mem_area in mem_areas]
-                + [
-                    arch.tensor_storage_mem_area[TensorPurpose.Weights].display_name(),
-                    arch.tensor_storage_mem_area[TensorPurpose.FeatureMap].display_name(),
-                ]
-            )
-
-        midpoint_inference_time = nng.cycles[PassCycles.Total] / arch.core_clock
-        if midpoint_inference_time > 0:
-            midpoint_fps = 1 / midpoint_inference_time
-        else:
-            midpoint_fps = np.nan
-
-        n_passes = sum(len(sg.passes) for sg in nng.subgraphs)
-        n_cascaded_passes = sum(len(sg.cascaded_passes) for sg in nng.subgraphs)
-
-        data_items += [midpoint_fps, nng.batch_size, midpoint_inference_time, n_passes, n_cascaded_passes]
-        data_items += [nng.memory_used.get(mem_area, 0) / 1024.0 for mem_area in mem_areas]
-        data_items += [nng.total_original_weights]
-        data_items += [nng.total_npu_encoded_weights]
-
-        for mem_area in mem_areas:
-            bws = nng.bandwidths[mem_area]
-            total_bw = np.sum(bws)
-            weight_bws = bws[TensorPurpose.Weights]
-            fm_bws = bws[TensorPurpose.FeatureMap]
-            data_items += [
-                fm_bws[BandwidthDirection.Read],
-                fm_bws[BandwidthDirection.Write],
-                weight_bws[BandwidthDirection.Read],
-                weight_bws[BandwidthDirection.Write],
-                total_bw,
+    if arch:
+        data_items += (
+            [
+                arch.accelerator_config.name,
+                arch.system_config,
+                arch.memory_mode,
+                arch.core_clock,
+                arch.arena_cache_size / 1024,
             ]
+            + [arch.memory_bandwidths_per_second[mem_area] / 1000.0 / 1000 / 1000 for mem_area in mem_areas]
+            + [
+                arch.tensor_storage_mem_area[TensorPurpose.Weights].display_name(),
+                arch.tensor_storage_mem_area[TensorPurpose.FeatureMap].display_name(),
+            ]
+        )
 
+    midpoint_inference_time = nng.cycles[PassCycles.Total] / arch.core_clock
+    if midpoint_inference_time > 0:
+        midpoint_fps = 1 / midpoint_inference_time
+    else:
+        midpoint_fps = np.nan
+
+    n_passes = sum(len(sg.passes) for sg in nng.subgraphs)
+    n_cascaded_passes = sum(len(sg.cascaded_passes) for sg in nng.subgraphs)
+
+    data_items += [midpoint_fps, nng.batch_size, midpoint_inference_time, n_passes, n_cascaded_passes]
+    data_items += [nng.memory_used.get(mem_area, 0) / 1024.0 for mem_area in mem_areas]
+    data_items += [nng.total_original_weights]
+    data_items += [nng.total_npu_encoded_weights]
+
+    for mem_area in mem_areas:
+        bws = nng.bandwidths[mem_area]
+        total_bw = np.sum(bws)
+        weight_bws = bws[TensorPurpose.Weights]
+        fm_bws = bws[TensorPurpose.FeatureMap]
         data_items += [
-            nng.macs,
-            nng.macs * 2 * midpoint_fps / 1e12,
+            fm_bws[BandwidthDirection.Read],
+            fm_bws[BandwidthDirection.Write],
+            weight_bws[BandwidthDirection.Read],
+            weight_bws[BandwidthDirection.Write],
+            total_bw,
         ]
 
-        data_items += [nng.cycles[kind] for kind in PassCycles.all()]
+    data_items += [
+        nng.macs,
+        nng.macs * 2 * midpoint_fps / 1e12,
+    ]
+
+    data_items += [nng.cycles[kind] for kind in PassCycles.all()]
+
+    return labels, data_items
 
-        writer.writerow(data_items)
+
+def write_summary_metrics_csv(nng, summary_filename, arch):
+    labels, data_items = summary_metrics(nng, arch)
+    write_combined_summary_metrics_csv([(labels, data_items)], summary_filename)
+
+
+def write_combined_summary_metrics_csv(summaries, summary_filename):
+    """Writes the summary metrics of several networks, as returned by summary_metrics, to a single CSV file"""
+    with open(summary_filename, "w") as f:
+        writer = csv.writer(f)
+        for idx, (labels, data_items) in enumerate(summaries):
+            if idx == 0:
+                writer.writerow(labels)
+            writer.writerow(data_items)
 
 
 def write_pass_metrics_csv(nng, pass_filename):
@@ -230,7 +241,7 @@ def print_performance_metrics_for_strat(
     npu_operations=None,
     show_cpu_operations=False,
     weights_data=None,
-    f=sys.stdout,
+    f=None,
 ):
 
     orig_mem_areas_labels = [(v, v.display_name()) for v in mem_areas_to_report()]
@@ -353,7 +364,7 @@ def print_performance_metrics_for_strat(
     print(file=f)
 
 
-def print_performance_metrics(nng, arch, show_cpu_operations=False, verbose_weights=False, f=sys.stdout):
+def print_performance_metrics(nng, arch, show_cpu_operations=False, verbose_weights=False, f=None):
     cpu_operations = []
     npu_operations = []
     ir_only_ops = (
@@ -18,11 +18,8 @@
 import copy
 import enum
 import uuid
-from collections import defaultdict
 from enum import auto
-from functools import lru_cache
 from functools import total_ordering
-from typing import Dict
 from typing import List
 from typing import Optional
 from typing import Tuple
@@ -32,6 +29,7 @@ from uuid import UUID
 import numpy as np
 
 from . import numeric_util
+from .compilation_context import CompilationContext
 from .data_type import BaseType
 from .data_type import DataType
 from .errors import UnsupportedFeatureError
@@ -201,10 +199,12 @@ def shape_round_to_quantum(shp: Shape, quantum: Tuple) -> Shape:
     return new_shp
 
 
-@lru_cache(maxsize=None)
 def create_equivalence_id(key) -> UUID:
-    # Generates equivalence_id based on the given key.
-    return uuid.uuid4()
+    # Generates equivalence_id based on the given key. The same key gives the same id within a compilation.
+    equivalence_ids = CompilationContext.current().equivalence_ids
+    if key not in equivalence_ids:
+        equivalence_ids[key] = uuid.uuid4()
+    return equivalence_ids[key]
 
 
 class QuantizationParameters:
@@ -314,23 +314,22 @@ def create_const_tensor(
     return const_tensor
 
 
-# class that keeps track of all tensor addresses in the different memory types
+# class that keeps track of all tensor addresses in the different memory types of the current compilation
 class TensorAddressMap:
-    address_map: Dict = defaultdict(dict)  # dict (tens.equivalence_id -> dict (mem_type -> address))
-
     @classmethod
     def get_address_for_tens(cls, tens_id: UUID, mem_type: MemType) -> int:
-        return cls.address_map[tens_id].get(mem_type)
+        return CompilationContext.current().tensor_addresses[tens_id].get(mem_type)
 
     @classmethod
     def set_address_for_tens(cls, tens_id: UUID, mem_type: MemType, address: int):
+        address_map = CompilationContext.current().tensor_addresses
         # Check previous address if there is one
-        previous_address = cls.address_map[tens_id].get(mem_type)
+        previous_address = address_map[tens_id].get(mem_type)
         if address is not None and previous_address is not None:
             assert previous_address == address, "Two different addresses cannot be assigned to the same tensor."
 
         # Set tensor's address for memory type
-        cls.address_map[tens_id][mem_type] = address
+        address_map[tens_id][mem_type] = address
 
 
 @total_ordering
@@ -28,7 +28,9 @@ from .errors import AllocationError
 from .greedy_allocation import allocate_live_ranges as greedy_allocate_live_ranges
 from .live_range import LiveRange
 from .live_range import LiveRangeGraph
+from .live_range import LiveRangeTable
 from .nn_graph import TensorAllocator
+from .profiler import Profiler
 from .tensor import MemArea
 from .tensor import MemType
 from .tensor import Tensor
@@ -178,12 +180,7 @@ def print_allocation(lrs, mem_area, mem_type_set, tensor_allocator, sg, actual_m
 
 
 def memory_usage_histogram(lrs: List[LiveRange]):
-    histogram = [0] * (1 + max(lr.end_time for lr in lrs))
-    for lr in lrs:
-        for t in range(lr.start_time, lr.end_time + 1):
-            histogram[t] += lr.size
-
-    return histogram
+    return LiveRangeTable(lrs).usage().tolist()
 
 
 def allocate(
@@ -232,15 +229,16 @@ def allocate_tensors(
     dry_test=False,
 ):
     # Allocates addresses to tensors, returns False if tensors could not be fit within max_size
-    lrs, total_sz = allocate(
-        sg,
-        arch,
-        mem_area,
-        mem_type_set,
-        tensor_allocator=tensor_allocator,
-        lr_graph=lr_graph,
-        cpu_tensor_alignment=cpu_tensor_alignment,
-    )
+    with Profiler.stage("tensor_allocation_" + mem_area.identifier_name()):
+        lrs, total_sz = allocate(
+            sg,
+            arch,
+            mem_area,
+            mem_type_set,
+            tensor_allocator=tensor_allocator,
+            lr_graph=lr_graph,
+            cpu_tensor_alignment=cpu_tensor_alignment,
+        )
 
     if lrs.ranges:
         alloc_ok = max_size is None or total_sz <= max_size
@@ -0,0 +1,28 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description:
+# Common fixtures of the unit tests
+import pytest
+
+from ethosu.vela.compilation_context import CompilationContext
+
+
+@pytest.fixture(autouse=True)
+def compilation_context():
+    """Runs every test in a new compilation context, like a compilation of its own"""
+    with CompilationContext().activate() as context:
+        yield context
@@ -16,13 +16,19 @@
 #
 # Description:
 # Unit tests for architecture_allocator.py
+import numpy as np
 import pytest
 
+from ethosu.vela.architecture_allocator import _fits_shram
+from ethosu.vela.architecture_allocator import _try_block_config
+from ethosu.vela.architecture_allocator import ElementwiseUsage
 from ethosu.vela.architecture_allocator import find_block_config
 from ethosu.vela.architecture_allocator import try_block_config
 from ethosu.vela.architecture_features import Accelerator
 from ethosu.vela.architecture_features import Block
 from ethosu.vela.architecture_features import create_default_arch
+from ethosu.vela.architecture_features import SHRAMElements
+from ethosu.vela.compilation_context import CompilationContext
 from ethosu.vela.ethos_u55_regs.ethos_u55_regs import resampling_mode
 from ethosu.vela.operation import Kernel
 from ethosu.vela.operation import NpuBlockType
@@ -122,3 +128,40 @@ def test_allocate(test_data):
     assert config.layout.ab_start == config2.layout.ab_start
     assert config.layout.ib_start2 == config2.layout.ib_start2
     assert config.acc_type == config2.acc_type
+
+
+def test_find_block_config_cache():
+    arch = create_default_arch(Accelerator.Ethos_U55_128)
+    args = (NpuBlockType.ConvolutionMxN, Shape4D(1, 16, 16, 32), Shape4D(1, 16, 16, 16), None, False, 8)
+    with CompilationContext().activate() as context:
+        block_config_cache = context.block_config_cache
+        config = find_block_config(arch, *args, Kernel(3, 3), 0, True, resampling_mode.NONE)
+        # The same shapes with an equal kernel are found in the cache
+        assert find_block_config(arch, *args, Kernel(3, 3), 0, True, resampling_mode.NONE) is config
+        assert (block_config_cache.hits, block_config_cache.misses) == (1, 1)
+        # A different stride or architecture is searched for
+        find_block_config(arch, *args, Kernel(3, 3, 2, 2), 0, True, resampling_mode.NONE)
+        other_arch = create_default_arch(Accelerator.Ethos_U55_256)
+        find_block_config(other_arch, *args, Kernel(3, 3), 0, True, resampling_mode.NONE)
+        assert (block_config_cache.hits, block_config_cache.misses) == (1, 3)
+    # Every compilation has its own cache
+    with CompilationContext().activate() as context:
+        assert len(context.block_config_cache) == 0
+        find_block_config(arch, *args, Kernel(3, 3), 0, True, resampling_mode.NONE)
+        assert (context.block_config_cache.hits, context.block_config_cache.misses) == (0, 1)
+
+
+@pytest.mark.parametrize("ew_usage", list(ElementwiseUsage))
+def test_fits_shram(ew_usage):
+    """Tests that the vectorised SHRAM check agrees with _try_block_config"""
+    arch = create_default_arch(Accelerator.Ethos_U55_64)
+    depth = np.arange(8, 129, 8)[:, None, None]
+    height = np.arange(1, 17)[None, :, None]
+    width = np.arange(1, 17)[None, None, :]
+    args = (16, arch.ifm_ew_bank_granules[16], 40, arch.accumulator_granules[SHRAMElements.Acc40], 2, 1, arch.ncores)
+    fits = _fits_shram(arch.shram, ew_usage, width, height, depth, width + 2, height + 2, depth, *args)
+    fits = np.broadcast_to(fits, (depth.size, height.size, width.size))
+    for (d, h, w), expected in np.ndenumerate(fits):
+        ofm_block = Block(int(width[0, 0, w]), int(height[0, h, 0]), int(depth[d, 0, 0]))
+        ifm_block = Block(ofm_block.width + 2, ofm_block.height + 2, ofm_block.depth)
+        assert (_try_block_config(arch.shram, ew_usage, ofm_block, ifm_block, *args) is not None) == expected
@@ -0,0 +1,74 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description:
+# Unit tests for the compilation context
+import contextvars
+import threading
+
+import pytest
+
+from ethosu.vela.compilation_context import CompilationContext
+from ethosu.vela.data_type import DataType
+from ethosu.vela.errors import VelaError
+from ethosu.vela.tensor import create_equivalence_id
+from ethosu.vela.tensor import MemType
+from ethosu.vela.tensor import Tensor
+
+
+def test_equivalence_ids_per_context():
+    default_id = create_equivalence_id((1, 2, 3))
+    with CompilationContext().activate():
+        context_id = create_equivalence_id((1, 2, 3))
+        assert create_equivalence_id((1, 2, 3)) == context_id
+        assert context_id != default_id
+    assert create_equivalence_id((1, 2, 3)) == default_id
+
+
+def test_tensor_addresses_per_context():
+    tens = Tensor([1, 8, 8, 8], DataType.uint8, "tens")
+    tens.mem_type = MemType.Scratch
+    with CompilationContext().activate() as context:
+        tens.address = 64
+        assert context.tensor_addresses[tens.equivalence_id][MemType.Scratch] == 64
+    with CompilationContext().activate():
+        # A new compilation can assign a different address without conflicting with the previous one
+        assert tens.address is None
+        tens.address = 128
+        assert tens.address == 128
+
+
+def test_contexts_per_thread():
+    contexts = {}
+
+    def compile_thread(name):
+        with CompilationContext().activate() as context:
+            contexts[name] = (context, CompilationContext.current())
+
+    threads = [threading.Thread(target=compile_thread, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert contexts["a"][0] is contexts["a"][1]
+    assert contexts["b"][0] is contexts["b"][1]
+    assert contexts["a"][0] is not contexts["b"][0]
+
+
+def test_no_active_context():
+    # Outside of an activated context, e.g. in a new thread, the compiler state cannot be used
+    with pytest.raises(VelaError):
+        contextvars.Context().run(CompilationContext.current)
@@ -16,7 +16,14 @@
 #
 # Description:
 # Unit tests for compiler driver
+import os
+
+import pytest
+
+from ethosu.vela import compiler_driver
+from ethosu.vela import vela
 from ethosu.vela.compiler_driver import next_sram_factor
+from ethosu.vela.test import testutil
 
 
 def test_next_sram_factor():
@@ -42,3 +49,23 @@ def test_next_sram_factor():
             assert len(alloc_results) < 100
         assert bisected_factor <= allocator_factor
         assert abs(bisected_factor - allocator_factor) < 0.02
+
+
+@pytest.mark.parametrize("graph_checks, expected_checks", [("off", 0), ("final", 1), ("all", 5)])
+def test_graph_checks(tmpdir, monkeypatch, capsys, graph_checks, expected_checks):
+    network = os.path.join(str(tmpdir), "net.tflite")
+    testutil.write_conv_network(network)
+    verify_graph_health = compiler_driver.verify_graph_health
+    checks = []
+
+    def verify_graph_health_wrapper(nng):
+        checks.append(nng)
+        return verify_graph_health(nng)
+
+    monkeypatch.setattr(compiler_driver, "verify_graph_health", verify_graph_health_wrapper)
+    assert vela.main([network, "--output-dir", str(tmpdir), "--graph-checks", graph_checks, "--timing"]) == 0
+    assert len(checks) == expected_checks
+    output = capsys.readouterr().out
+    assert output.count("Graph check after") == 5
+    # The time saved by the skipped checks is estimated from the final check
+    assert output.count("saved about") == (4 if graph_checks == "final" else 0)
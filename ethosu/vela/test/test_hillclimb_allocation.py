@@ -19,6 +19,7 @@
 import pytest
 
 from ethosu.vela.hillclimb_allocation import allocate_live_ranges
+from ethosu.vela.hillclimb_allocation import HillClimbAllocator
 from ethosu.vela.live_range import LiveRange
 
 
@@ -61,3 +62,18 @@ def test_allocate(lrs, expected_size):
 
 def test_allocate_empty_input():
     assert [] == allocate_live_ranges([])
+
+
+def test_allocate_indices_incremental():
+    """Tests that re-allocating a changed order gives the same result as allocating it from scratch"""
+    lr_list = [live_range(start, end, size) for start, end, size in test_data[1][0]]
+    order = list(range(len(lr_list)))
+    swapped_order = order[:]
+    swapped_order[3], swapped_order[7] = swapped_order[7], swapped_order[3]
+    allocator = HillClimbAllocator(lr_list)
+    allocator.allocate_indices(order)
+    size = allocator.allocate_indices(swapped_order)
+    fresh_allocator = HillClimbAllocator(lr_list)
+    assert fresh_allocator.allocate_indices(swapped_order) == size
+    for lr, fresh_lr in zip(allocator.lrs, fresh_allocator.lrs):
+        assert (lr.address, lr.predecessor, lr.turn) == (fresh_lr.address, fresh_lr.predecessor, fresh_lr.turn)
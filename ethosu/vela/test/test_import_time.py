@@ -0,0 +1,54 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description:
+# Checks the modules that are imported by the command line interface
+import subprocess
+import sys
+
+# Modules that are only imported when they are needed for the type of the network, or for the options
+LAZY_MODULES = (
+    "lxml.etree",
+    "ethosu.vela.tflite.Model",
+    "ethosu.vela.tflite_reader",
+    "ethosu.vela.tflite_writer",
+    "ethosu.vela.tflite_graph_optimiser",
+    "ethosu.vela.tflite_supported_operators",
+    "ethosu.vela.tosa_reader",
+    "ethosu.vela.rawdata_writer",
+    "ethosu.vela.tosa_graph_optimiser",
+    "ethosu.vela.tosa_supported_operators",
+)
+
+
+def imported_modules(args):
+    # Returns the names of the modules that are imported when running Vela with the given arguments
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "ethosu.vela"] + args, capture_output=True, text=True, check=True
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        fields = line[len("import time:") :].split("|")
+        if line.startswith("import time:") and fields[0].strip().isdigit():
+            modules.add(fields[2].strip())
+    return modules
+
+
+def test_version_imports():
+    modules = imported_modules(["--version"])
+    assert "ethosu.vela.vela" in modules
+    for module in LAZY_MODULES:
+        assert module not in modules
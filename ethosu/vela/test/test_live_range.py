@@ -19,7 +19,10 @@ from unittest.mock import MagicMock
 
 import pytest
 
+from ethosu.vela.data_type import DataType
 from ethosu.vela.live_range import LiveRange
+from ethosu.vela.live_range import LiveRangeGraph
+from ethosu.vela.live_range import LiveRangeTable
 from ethosu.vela.tensor import Tensor
 
 
@@ -62,3 +65,35 @@ class TestLiveRange:
         assert live_range.size == 4
         assert live_range.name == "test"
         assert live_range.tensors == [tens]
+
+
+def test_live_range_graph_equivalent_tensors():
+    lr_graph = LiveRangeGraph()
+    tens = Tensor([1, 8, 8, 8], DataType.uint8, "tens")
+    clone = tens.clone()
+    other = Tensor([1, 8, 8, 8], DataType.uint8, "other")
+    fused = Tensor([1, 8, 8, 8], DataType.uint8, "fused")
+    fused_clone = fused.clone()
+
+    # Clones share the live range of the original tensor
+    rng = lr_graph.get_or_create_range(tens)
+    assert lr_graph.get_or_create_range(clone) is rng
+    assert lr_graph.get_or_create_range(other) is not rng
+    # A fused tensor, and its clones, share the live range that it was fused with
+    assert lr_graph.fuse_ranges(clone, fused) is rng
+    assert lr_graph.get_or_create_range(fused_clone) is rng
+    assert rng.tensors == [tens, fused]
+    assert lr_graph.lrs == [rng, lr_graph.ranges[other]]
+
+
+def test_live_range_table_usage():
+    live_ranges = []
+    for start_time, end_time, size in ((0, 3, 10), (2, 2, 5), (3, 6, 1), (99999999999, -1, 7)):
+        lr = LiveRange(None, Tensor.AllocationQuantum)
+        lr.start_time, lr.end_time, lr.size = start_time, end_time, size
+        live_ranges.append(lr)
+    table = LiveRangeTable(live_ranges)
+    # The unused live range does not contribute, end times are inclusive
+    assert table.usage().tolist() == [10, 10, 15, 11, 1, 1, 1]
+    assert table.usage(3).tolist() == [10, 10, 15]
+    assert table.usage(9).tolist() == [10, 10, 15, 11, 1, 1, 1, 0, 0]
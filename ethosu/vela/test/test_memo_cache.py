@@ -0,0 +1,54 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description:
+# Unit tests for memo_cache
+from concurrent.futures import ThreadPoolExecutor
+
+from ethosu.vela.memo_cache import MemoCache
+
+
+def square(value):
+    return value * value
+
+
+def test_memo_cache():
+    cache = MemoCache("Square", 2)
+    assert cache.find(1, square, 1) == 1
+    assert cache.find(2, square, 2) == 4
+    assert cache.find(1, square, 1) == 1
+    # The least recently used entry is evicted
+    assert cache.find(3, square, 3) == 9
+    assert len(cache) == 2
+    assert cache.find(2, square, 2) == 4
+    assert (cache.hits, cache.misses) == (1, 4)
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_memo_cache_threads():
+    # Lookups of the same keys from several threads, with entries evicted while they are looked up
+    cache = MemoCache("Square", 4)
+
+    def find_all(offset):
+        return [cache.find(value % 8, square, value % 8) for value in range(offset, offset + 2000)]
+
+    with ThreadPoolExecutor(4) as executor:
+        for offset, results in zip(range(4), executor.map(find_all, range(4))):
+            assert results == [square(value % 8) for value in range(offset, offset + 2000)]
+    assert cache.hits + cache.misses == 4 * 2000
+    assert len(cache) == 4
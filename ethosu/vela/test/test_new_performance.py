@@ -16,42 +16,54 @@
 #
 # Description:
 # Contains unit tests for new performance estimation code
+import os
+
+import numpy as np
+
 from ethosu.vela import architecture_allocator
 from ethosu.vela import architecture_features
 from ethosu.vela import npu_performance
 from ethosu.vela import operation
+from ethosu.vela import vela
 from ethosu.vela.architecture_features import resampling_mode
 from ethosu.vela.shape4d import Shape4D
 from ethosu.vela.shape4d import VolumeIterator
+from ethosu.vela.tensor import BandwidthDirection
 from ethosu.vela.tensor import MemArea
+from ethosu.vela.test import testutil
 
 
 def test_new_performance():
     arch = architecture_features.create_default_arch(architecture_features.Accelerator.Ethos_U55_128)
 
-    query = npu_performance.PerformanceQuery(architecture_features.NpuBlockType.ConvolutionMxN)
-    query.ifm_shape = Shape4D(1, 16, 16, 16)
-    query.ifm2_shape = Shape4D()
-    query.ifm_memory_area = MemArea.Sram
-    query.ifm_bits = 8
-    query.ofm_shape = Shape4D(1, 16, 16, 1)
-    query.ofm_memory_area = MemArea.Sram
-    query.ofm_bits = 8
-    query.const_shape = Shape4D(1, 1, 1, query.ofm_shape.depth)
-    query.const_memory_area = MemArea.OffChipFlash
-    query.kernel = operation.Kernel(1, 1, 1, 1, 1, 1, valid_padding=False)
-    query.config = architecture_allocator.find_block_config(
-        arch,
-        architecture_features.NpuBlockType.ConvolutionMxN,
-        Shape4D(1, 16, 16, 1),
-        query.ifm_shape,
-        None,
-        False,
-        8,
-        query.kernel,
-        0,
-        False,
-        resampling_mode.NONE,
+    ifm_shape = Shape4D(1, 16, 16, 16)
+    ofm_shape = Shape4D(1, 16, 16, 1)
+    kernel = operation.Kernel(1, 1, 1, 1, 1, 1, valid_padding=False)
+    query = npu_performance.PerformanceQuery(
+        npu_block_type=architecture_features.NpuBlockType.ConvolutionMxN,
+        ifm_shape=ifm_shape,
+        ifm2_shape=Shape4D(),
+        ifm_memory_area=MemArea.Sram,
+        ifm_bits=8,
+        ofm_shape=ofm_shape,
+        ofm_memory_area=MemArea.Sram,
+        ofm_bits=8,
+        const_shape=Shape4D(1, 1, 1, ofm_shape.depth),
+        const_memory_area=MemArea.OffChipFlash,
+        kernel=kernel,
+        config=architecture_allocator.find_block_config(
+            arch,
+            architecture_features.NpuBlockType.ConvolutionMxN,
+            ofm_shape,
+            ifm_shape,
+            None,
+            False,
+            8,
+            kernel,
+            0,
+            False,
+            resampling_mode.NONE,
+        ),
     )
 
     print("For block Config = {}".format(query.config))
@@ -76,3 +88,126 @@ def test_new_performance():
         assert c.op_macs == 4096
 
     assert True  # Any successful result is okay
+
+
+def test_performance_query_hashable():
+    kwargs = dict(
+        npu_block_type=architecture_features.NpuBlockType.ConvolutionMxN,
+        ifm_shape=Shape4D(1, 8, 8, 16),
+        ofm_shape=Shape4D(1, 8, 8, 16),
+    )
+    # Equal kernels and block configs compare by value
+    query = npu_performance.PerformanceQuery(**kwargs, kernel=operation.Kernel(3, 3))
+    assert query == npu_performance.PerformanceQuery(**kwargs, kernel=operation.Kernel(3, 3))
+    assert hash(query) == hash(npu_performance.PerformanceQuery(**kwargs, kernel=operation.Kernel(3, 3)))
+    assert query != npu_performance.PerformanceQuery(**kwargs, kernel=operation.Kernel(3, 3, 2, 2))
+    assert query != query._replace(ofm_shape=Shape4D(1, 4, 8, 16))
+
+
+def test_batched_performance():
+    arch = architecture_features.create_default_arch(architecture_features.Accelerator.Ethos_U55_64)
+    op_types = []
+    faf_types = []
+    queries = []
+    for block_type, op_type, kernel, ifm2_shape in (
+        (architecture_features.NpuBlockType.ConvolutionMxN, operation.Op.Conv2DBias, operation.Kernel(3, 3), None),
+        (architecture_features.NpuBlockType.ConvolutionMxN, operation.Op.Conv2DBias, operation.Kernel(1, 9), None),
+        (
+            architecture_features.NpuBlockType.ConvolutionDepthWise,
+            operation.Op.DepthwiseConv2DBias,
+            operation.Kernel(5, 5),
+            None,
+        ),
+        (architecture_features.NpuBlockType.Pooling, operation.Op.MaxPool, operation.Kernel(11, 11), None),
+        (architecture_features.NpuBlockType.VectorProduct, operation.Op.FullyConnected, operation.Kernel(1, 1), None),
+        (
+            architecture_features.NpuBlockType.ElementWise,
+            operation.Op.Add,
+            operation.Kernel(1, 1),
+            Shape4D(1, 16, 16, 32),
+        ),
+        (architecture_features.NpuBlockType.ElementWise, operation.Op.Mul, operation.Kernel(1, 1), Shape4D(1, 1, 1, 1)),
+    ):
+        ifm_shape = Shape4D(1, 16, 16, 32)
+        ofm_shape = Shape4D(1, 16, 16, 32)
+        queries.append(
+            npu_performance.PerformanceQuery(
+                npu_block_type=block_type,
+                ifm_shape=ifm_shape,
+                ifm_memory_area=MemArea.Sram,
+                ifm_bits=8,
+                ifm2_shape=ifm2_shape,
+                ifm2_memory_area=MemArea.Dram,
+                ifm2_bits=ifm2_shape and 16,
+                ofm_shape=ofm_shape,
+                ofm_memory_area=MemArea.Sram,
+                ofm_bits=8,
+                const_shape=Shape4D(1, 1, 1, ofm_shape.depth),
+                const_memory_area=MemArea.OffChipFlash,
+                kernel=kernel,
+                config=architecture_allocator.find_block_config(
+                    arch,
+                    block_type,
+                    ofm_shape,
+                    ifm_shape,
+                    ifm2_shape,
+                    False,
+                    8,
+                    kernel,
+                    0,
+                    False,
+                    resampling_mode.NONE,
+                ),
+            )
+        )
+        op_types.append(op_type)
+        faf_types.append(operation.Op.Relu)
+
+    # The batched results match the results of the single query functions
+    const_element_sizes = np.array([[0.5, 4]] * len(queries))
+    costs = npu_performance.measure_performance_costs(arch, op_types, faf_types, queries, const_element_sizes)
+    op_cycles, op_macs = npu_performance.measure_cycle_costs(arch, op_types, faf_types, queries)
+    assert np.array_equal(costs.op_cycles, op_cycles) and np.array_equal(costs.op_macs, op_macs)
+    assert np.array_equal(costs.element_access, npu_performance.measure_element_accesses(arch, queries))
+    for i, (op_type, faf_type, query) in enumerate(zip(op_types, faf_types, queries)):
+        cycles = npu_performance.measure_cycle_cost(arch, op_type, faf_type, query)
+        access = npu_performance.measure_element_access(arch, query)
+        assert (op_cycles[i], op_macs[i]) == (cycles.op_cycles, cycles.op_macs)
+        assert list(costs.element_access[i]) == [
+            access.ifm_read[0],
+            access.ifm_read[1],
+            access.ofm_write,
+            access.weights_refetch,
+            access.const_read[0],
+            access.const_read[1],
+        ]
+        bws = np.zeros((MemArea.Size, BandwidthDirection.Size))
+        bws[query.ifm_memory_area, BandwidthDirection.Read] += access.ifm_read[0] * query.ifm_bits // 8
+        if query.ifm2_shape:
+            bws[query.ifm2_memory_area, BandwidthDirection.Read] += access.ifm_read[1] * query.ifm2_bits // 8
+        bws[query.ofm_memory_area, BandwidthDirection.Write] += access.ofm_write * query.ofm_bits // 8
+        bws[query.const_memory_area, BandwidthDirection.Read] += access.const_read[0] * 0.5 + access.const_read[1] * 4
+        assert np.array_equal(costs.bandwidths[i], bws)
+
+
+def test_network_performance_is_batched(tmpdir, monkeypatch):
+    network = os.path.join(str(tmpdir), "net.tflite")
+    testutil.write_conv_network(network, depths=(16, 32, 32, 64))
+    estimate_full_op_performance = npu_performance.estimate_full_op_performance
+    estimated = []
+
+    def estimate_full_op_performance_wrapper(arch, schedule, op, prev_op, block_config, cycles=None, access=None):
+        # The batched cycles and element accesses match the single query model
+        bws, macs, cycles_a = estimate_full_op_performance(arch, schedule, op, prev_op, block_config, cycles, access)
+        expected_bws, expected_macs, expected_cycles = estimate_full_op_performance(
+            arch, schedule, op, prev_op, block_config
+        )
+        assert cycles is not None and access is not None
+        assert np.array_equal(bws, expected_bws) and macs == expected_macs
+        assert np.array_equal(cycles_a, expected_cycles)
+        estimated.append(op)
+        return bws, macs, cycles_a
+
+    monkeypatch.setattr(npu_performance, "estimate_full_op_performance", estimate_full_op_performance_wrapper)
+    assert vela.main([network, "--output-dir", str(tmpdir)]) == 0
+    assert len(estimated) == 3
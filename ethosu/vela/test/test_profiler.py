@@ -0,0 +1,86 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description:
+# Unit tests for the compiler stage profiler
+import json
+import os
+import tracemalloc
+
+import pytest
+
+from ethosu.vela.compilation_context import CompilationContext
+from ethosu.vela.profiler import Profiler
+
+
+def rewrite(value):
+    return value + 1
+
+
+def test_profiler_disabled():
+    functions = [rewrite]
+    assert Profiler.wrap(functions) is functions
+    with Profiler.stage("stage"):
+        pass
+    assert not Profiler.enabled()
+
+
+def test_profiler(tmpdir):
+    Profiler.start()
+    try:
+        with Profiler.stage("outer"):
+            (wrapped,) = Profiler.wrap([rewrite])
+            for i in range(3):
+                assert wrapped(i) == i + 1
+            data = bytearray(1 << 20)
+        with Profiler.stage("outer"):
+            pass
+        filename = os.path.join(str(tmpdir), "profile.json")
+        Profiler.write(filename, "network")
+    finally:
+        Profiler.stop()
+    del data
+
+    with open(filename) as f:
+        profile = json.load(f)
+    assert profile["network"] == "network"
+    stages = {stage["name"]: stage for stage in profile["stages"]}
+    # Nested stages are recorded before the stages that contain them, as they are finished first
+    assert list(stages) == ["outer/rewrite", "outer"]
+    assert stages["outer/rewrite"]["calls"] == 3
+    assert stages["outer"]["calls"] == 2
+    assert stages["outer"]["traced_memory_delta"] >= 1 << 20
+    assert stages["outer"]["time"] >= stages["outer/rewrite"]["time"]
+
+
+def test_profiler_stopped_on_error():
+    with pytest.raises(ValueError):
+        with Profiler.started():
+            assert Profiler.enabled()
+            raise ValueError("Compilation failed")
+    assert not Profiler.enabled()
+    assert not tracemalloc.is_tracing()
+
+
+def test_profiler_per_compilation_context():
+    with CompilationContext().activate(), Profiler.started():
+        with Profiler.stage("outer"):
+            # Another compilation is not profiled, and does not record its stages in this profile
+            with CompilationContext().activate():
+                assert not Profiler.enabled()
+                with Profiler.stage("other"):
+                    pass
+        assert list(CompilationContext.current().profile.stages) == ["outer"]
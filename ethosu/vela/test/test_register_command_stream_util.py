@@ -16,11 +16,15 @@
 #
 # Description:
 # Contains unit tests for register command stream generator
+import numpy as np
+
+from ethosu.vela import driver_actions
 from ethosu.vela.api import NpuAddressRange
 from ethosu.vela.api import NpuBlockTraversal
 from ethosu.vela.api import NpuConv2DOperation
 from ethosu.vela.api import NpuConvDepthWiseOperation
 from ethosu.vela.api import NpuDataType
+from ethosu.vela.api import NpuDmaOperation
 from ethosu.vela.api import NpuElementWiseOp
 from ethosu.vela.api import NpuElementWiseOperation
 from ethosu.vela.api import NpuFeatureMap
@@ -31,9 +35,19 @@ from ethosu.vela.api import NpuShape3D
 from ethosu.vela.api import NpuTileBox
 from ethosu.vela.architecture_features import Accelerator
 from ethosu.vela.architecture_features import create_default_arch
+from ethosu.vela.ethos_u55_regs.ethos_u55_regs import cmd0
+from ethosu.vela.ethos_u55_regs.ethos_u55_regs import cmd1
+from ethosu.vela.range_set import AccessDirection
+from ethosu.vela.range_set import MemoryAccessSet
+from ethosu.vela.range_set import MemoryRangeSet
 from ethosu.vela.register_command_stream_generator import calc_blockdep
+from ethosu.vela.register_command_stream_generator import CmdMode
+from ethosu.vela.register_command_stream_generator import CommandStreamEmitter
 from ethosu.vela.register_command_stream_generator import get_strides
 from ethosu.vela.register_command_stream_util import get_address_ranges
+from ethosu.vela.register_command_stream_util import get_wait_dependency
+from ethosu.vela.register_command_stream_util import MemoryAccessTracker
+from ethosu.vela.register_command_stream_util import Watermark
 from ethosu.vela.test.extapi.test_extapi_generate_commands import create_feature_map
 
 
@@ -50,6 +64,31 @@ def test_get_fm_strides():
     assert get_strides(fm) == NpuShape3D(height=240, width=24, depth=1)
 
 
+def test_command_stream_emitter():
+    """Tests the command words and the driver payload of the command stream emitter"""
+    emit = CommandStreamEmitter()
+    emit.cmd0_with_param(cmd0.NPU_SET_IFM_REGION, 1)
+    emit.cmd1_with_offset(cmd1.NPU_SET_IFM_BASE0, 0x12345678)
+    # Redundant commands are not written
+    emit.cmd0_with_param(cmd0.NPU_SET_IFM_REGION, 1)
+    emit.cmd_do_operation(cmd0.NPU_OP_STOP, param=0xFFFF)
+    words = [
+        cmd0.NPU_SET_IFM_REGION.value | (1 << 16),
+        cmd1.NPU_SET_IFM_BASE0.value | CmdMode.Payload32.value,
+        0x12345678,
+        cmd0.NPU_OP_STOP.value | (0xFFFF << 16),
+    ]
+    assert emit.to_list() == words
+    assert emit.size_in_bytes() == emit.offset == 4 * len(words)
+    assert [list(command) for command in emit.commands()] == [words[:1], words[1:3], words[3:]]
+
+    arch = create_default_arch(Accelerator.Ethos_U55_128)
+    payload = driver_actions.create_driver_payload_words(emit.cmd_stream, arch)
+    assert payload.tobytes() == driver_actions.create_driver_payload(words, arch)
+    # The command stream words are at the end of the payload, in little endian format
+    assert list(np.frombuffer(payload, dtype="<u4")[-len(words) :]) == words
+
+
 # -------------------------------------------------------------------
 # ADDRESS TESTS
 # -------------------------------------------------------------------
@@ -262,3 +301,49 @@ def test_calc_blockdep3():
     arch = create_default_arch(Accelerator.Ethos_U55_128)
     block_dep = calc_blockdep(arch, op1, op2)
     assert block_dep == 3
+
+
+# -------------------------------------------------------------------
+# WAIT DEPENDENCY TESTS
+# -------------------------------------------------------------------
+
+
+def create_memory_access(read_address, write_address):
+    access = MemoryAccessSet()
+    access.add(MemoryRangeSet(1, read_address, read_address + 16), AccessDirection.Read)
+    access.add(MemoryRangeSet(1, write_address, write_address + 16), AccessDirection.Write)
+    return access
+
+
+def test_get_wait_dependency():
+    """Tests calculation of the DMA and kernel waits in a command stream"""
+    arch = create_default_arch(Accelerator.Ethos_U65_256)
+    assert arch.max_outstanding_dma == 2
+    dma_range = NpuAddressRange(region=1, address=0, length=16)
+    npu_op_list = [
+        NpuDmaOperation(dma_range, dma_range),
+        NpuDmaOperation(dma_range, dma_range),
+        NpuConv2DOperation(),
+        NpuConv2DOperation(),
+        NpuDmaOperation(dma_range, dma_range),
+        NpuConv2DOperation(),
+    ]
+    memory_accesses = {
+        npu_op: create_memory_access(read_address, write_address)
+        for npu_op, (read_address, write_address) in zip(
+            npu_op_list, [(0, 100), (0, 200), (100, 300), (300, 400), (0, 300), (500, 600)]
+        )
+    }
+    tracker = MemoryAccessTracker(npu_op_list, memory_accesses)
+    watermark = Watermark(0, 0)
+    waits = []
+    for op_index in range(len(npu_op_list)):
+        watermark, outstanding = get_wait_dependency(arch, tracker, op_index, watermark)
+        waits.append(outstanding)
+    # The first convolution reads the output of the first DMA, with one later DMA outstanding
+    assert waits[2] == Watermark(npu=-1, dma=1)
+    # The last DMA overwrites the input of the second convolution, that is the latest kernel
+    assert waits[4] == Watermark(npu=0, dma=-1)
+    assert waits[5] == Watermark(npu=-1, dma=-1)
+    # Only the latest two DMA operations are checked, the watermark moves past the older ones
+    assert watermark.dma == 2
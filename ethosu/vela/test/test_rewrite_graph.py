@@ -0,0 +1,79 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description:
+# Unit tests for graph traversal and rewriting
+import sys
+
+from ethosu.vela.data_type import DataType
+from ethosu.vela.operation import Op
+from ethosu.vela.rewrite_graph import rewrite_graph_pre_order
+from ethosu.vela.rewrite_graph import verify_graph_health
+from ethosu.vela.rewrite_graph import visit_graph_post_order
+from ethosu.vela.tensor import Tensor
+from ethosu.vela.test import testutil
+
+
+def create_chain(length):
+    tens = Tensor([1, 8, 8, 8], DataType.uint8, "t0")
+    ops = []
+    for i in range(length):
+        out = Tensor([1, 8, 8, 8], DataType.uint8, f"t{i + 1}")
+        ops.append(testutil.create_op(Op.Relu, [tens], out))
+        tens = out
+    return ops
+
+
+def test_visit_graph_post_order():
+    # t0 -> op1 -> t1 -> op3 -> t3
+    #    -> op2 -> t2 ->
+    t0 = Tensor([1, 8, 8, 8], DataType.uint8, "t0")
+    t1 = Tensor([1, 8, 8, 8], DataType.uint8, "t1")
+    t2 = Tensor([1, 8, 8, 8], DataType.uint8, "t2")
+    t3 = Tensor([1, 8, 8, 8], DataType.uint8, "t3")
+    ops = [
+        testutil.create_op(Op.Relu, [t0], t1),
+        testutil.create_op(Op.Relu, [t0], t2),
+        testutil.create_op(Op.Add, [t1, t2], t3),
+    ]
+    visited = []
+    visit_graph_post_order(
+        [t3],
+        None,
+        [lambda tens, arch: visited.append(tens.name)],
+        [lambda op, arch: visited.append(op.name)],
+    )
+    assert visited == ["t0", "t1_op", "t1", "t2_op", "t2", "t3_op", "t3"]
+    assert verify_graph_health(testutil.create_graph(ops))
+
+
+def test_deep_graph_traversal():
+    # The traversals do not use recursion, so graphs deeper than the recursion limit are fine
+    ops = create_chain(sys.getrecursionlimit() * 2)
+    nng = testutil.create_graph(ops)
+    sg = nng.subgraphs[0]
+    visited = []
+    visit_graph_post_order(sg.output_tensors, None, [], [lambda op, arch: visited.append(op)])
+    assert visited == ops
+
+    def rewrite_op(op, arch, nng):
+        op.name = op.name.upper()
+        return op
+
+    rewrite_graph_pre_order(nng, sg, None, [], [rewrite_op])
+    assert all(op.name == op.outputs[0].name.upper() + "_OP" for op in ops)
+    assert all(op.outputs[0].consumers() == [next_op] for op, next_op in zip(ops, ops[1:]))
+    assert verify_graph_health(nng)
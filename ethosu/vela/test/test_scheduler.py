@@ -0,0 +1,186 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description:
+# Unit tests for the allocation of feature maps to fast storage in the scheduler
+import itertools
+import os
+import random
+
+import numpy as np
+import pytest
+
+from ethosu.vela import npu_performance  # noqa: F401 Imported before the scheduler to avoid a circular import
+from ethosu.vela import vela
+from ethosu.vela.live_range import LiveRange
+from ethosu.vela.scheduler import FastStorageComponentAllocator
+from ethosu.vela.scheduler import Scheduler
+from ethosu.vela.scheduler import SchedulerOpInfo
+from ethosu.vela.shape4d import Shape4D
+from ethosu.vela.test import testutil
+
+STAGING_LIMIT = 1000
+
+
+def create_component(rng, num_lrs, num_time_steps):
+    lrs = []
+    for _ in range(num_lrs):
+        lr = LiveRange(None, 16)
+        lr.start_time = rng.randrange(num_time_steps)
+        lr.end_time = min(num_time_steps - 1, lr.start_time + rng.randrange(1, 6))
+        lr.size = 16 * rng.randint(1, 24)
+        lrs.append(lr)
+    lrs.sort(key=lambda lr: (lr.start_time, lr.end_time + 1, lr.size))
+    base_mem_usage = np.array([rng.randrange(0, 400) for _ in range(num_time_steps)])
+    return lrs, base_mem_usage
+
+
+def mem_usage_with(lrs, base_mem_usage, keep):
+    mem_usage = base_mem_usage.copy()
+    for lr, kept in zip(lrs, keep):
+        if kept:
+            mem_usage[lr.start_time : lr.end_time + 1] += lr.size
+    return mem_usage
+
+
+def kept_size(lrs, keep):
+    return sum(lr.size for lr, kept in zip(lrs, keep) if kept)
+
+
+def allocate(lrs, base_mem_usage, max_search_nodes=None):
+    """Allocates the component and returns for each live range if it is kept in fast storage"""
+    max_mem_usage = list(mem_usage_with(lrs, base_mem_usage, [True] * len(lrs)))
+    min_mem_usage = base_mem_usage.copy()
+    allocator = FastStorageComponentAllocator(min_mem_usage, max_mem_usage, STAGING_LIMIT)
+    if max_search_nodes is not None:
+        allocator.max_search_nodes = max_search_nodes
+    allocator.allocate_component(allocator, lrs, max_mem_usage, min_mem_usage, STAGING_LIMIT, {})
+    keep = [not e for e in allocator.evicted]
+    assert np.array_equal(min_mem_usage, mem_usage_with(lrs, base_mem_usage, keep))
+    assert max(min_mem_usage) <= STAGING_LIMIT
+    return keep
+
+
+# The search node limit only applies to large components, small components are always searched exhaustively
+@pytest.mark.parametrize("max_search_nodes", [None, 1])
+def test_fast_storage_allocation_is_optimal(max_search_nodes):
+    rng = random.Random(0)
+    for _ in range(10):
+        lrs, base_mem_usage = create_component(rng, 10, 12)
+        # Largest total size of the live ranges that can be kept, found by trying all subsets
+        best_size = max(
+            kept_size(lrs, keep)
+            for keep in itertools.product((False, True), repeat=len(lrs))
+            if max(mem_usage_with(lrs, base_mem_usage, keep)) <= STAGING_LIMIT
+        )
+        assert kept_size(lrs, allocate(lrs, base_mem_usage, max_search_nodes)) == best_size
+
+
+def test_fast_storage_allocation_large_component():
+    rng = random.Random(1)
+    lrs, base_mem_usage = create_component(rng, 40, 40)
+    max_part_size = FastStorageComponentAllocator(base_mem_usage, [], STAGING_LIMIT).max_part_size
+    # Allocating the parts of the component one after the other gives a lower bound for the whole component
+    part_mem_usage = base_mem_usage
+    part_size = 0
+    for start in range(0, len(lrs), max_part_size):
+        part = lrs[start : start + max_part_size]
+        keep = allocate(part, part_mem_usage)
+        part_size += kept_size(part, keep)
+        part_mem_usage = mem_usage_with(part, part_mem_usage, keep)
+    assert kept_size(lrs, allocate(lrs, base_mem_usage)) >= part_size
+
+
+def compile_and_get_weights(network, output_dir, monkeypatch, lazy_encoding):
+    """Compiles the network and returns the encoded weights of the final schedule and the output network"""
+    weights = []
+    encode_weights = Scheduler.encode_weights
+    apply_schedule = Scheduler.apply_schedule
+
+    def encode_weights_wrapper(self, schedule, lazy=False):
+        encode_weights(self, schedule, lazy and lazy_encoding)
+
+    def apply_schedule_wrapper(self, sched):
+        apply_schedule(self, sched)
+        for cost in sched.cost_map.values():
+            assert cost.pending_weight_encoding is None
+            if cost.npu_weights_tensor:
+                weights.append((bytes(cost.npu_weights_tensor.buffer), cost.ofm_depth_slices))
+
+    with monkeypatch.context() as m:
+        m.setattr(Scheduler, "encode_weights", encode_weights_wrapper)
+        m.setattr(Scheduler, "apply_schedule", apply_schedule_wrapper)
+        vela.main([network, "--output-dir", output_dir, "--arena-cache-size", "20000"])
+    with open(os.path.join(output_dir, "net_vela.tflite"), "rb") as f:
+        return weights, f.read()
+
+
+def test_lazy_weight_encoding(tmpdir, monkeypatch):
+    network = os.path.join(str(tmpdir), "net.tflite")
+    testutil.write_conv_network(network, depths=(16, 32, 32, 64))
+    lazy_weights, lazy_output = compile_and_get_weights(network, str(tmpdir.join("lazy")), monkeypatch, True)
+    eager_weights, eager_output = compile_and_get_weights(network, str(tmpdir.join("eager")), monkeypatch, False)
+    assert lazy_weights
+    assert lazy_weights == eager_weights
+    assert lazy_output == eager_output
+
+
+def test_pending_weight_encoding():
+    cost = SchedulerOpInfo(None, 0, Shape4D(1, 8, 8, 16), None, Shape4D(1, 8, 8, 16))
+    cost.pending_weight_encoding = object()
+    # Neither the weights nor the scales can be used before the deferred encoding is resolved
+    with pytest.raises(AssertionError):
+        cost.npu_weights_tensor
+    with pytest.raises(AssertionError):
+        cost.npu_scales_tensor
+    weights, scales = object(), object()
+    cost.set_encoded_weights(weights, scales)
+    assert cost.pending_weight_encoding is None
+    assert cost.npu_weights_tensor is weights and cost.npu_scales_tensor is scales
+
+
+def test_search_effort_one_uses_binary_search(tmpdir, monkeypatch):
+    network = os.path.join(str(tmpdir), "net.tflite")
+    testutil.write_conv_network(network, depths=(8, 64, 8), size=32)
+
+    def search_sub_schedule(*args):
+        assert False, "The wider search is not used with a search effort of 1"
+
+    monkeypatch.setattr(Scheduler, "search_sub_schedule", search_sub_schedule)
+    assert vela.main([network, "--output-dir", str(tmpdir), "--arena-cache-size", "50000", "--search-effort", "1"]) == 0
+
+
+def test_search_effort(tmpdir, monkeypatch):
+    network = os.path.join(str(tmpdir), "net.tflite")
+    testutil.write_conv_network(network, depths=(8, 64, 8), size=32)
+    search_sub_schedule = Scheduler.search_sub_schedule
+    searched = []
+
+    def search_sub_schedule_wrapper(self, best_schedule, *args):
+        memory_limit, non_local_mem_usage = args[-2:]
+        schedule = search_sub_schedule(self, best_schedule, *args)
+        # The result fits, and is never estimated to be slower than the binary search result
+        if schedule is not None:
+            assert self.estimate_schedule_memory_usage(schedule, non_local_mem_usage) <= memory_limit
+        if best_schedule is not None:
+            assert self.estimate_schedule_cycles(schedule) <= self.estimate_schedule_cycles(best_schedule)
+            searched.append(schedule is not best_schedule)
+        return schedule
+
+    monkeypatch.setattr(Scheduler, "search_sub_schedule", search_sub_schedule_wrapper)
+    assert vela.main([network, "--output-dir", str(tmpdir), "--arena-cache-size", "50000", "--search-effort", "4"]) == 0
+    # The binary search result was replaced by a faster proposal
+    assert searched == [True]
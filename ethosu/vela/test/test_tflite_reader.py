@@ -15,16 +15,20 @@
 # limitations under the License.
 # Description:
 # Contains unit tests for tflite_reader
+import os
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
 import numpy as np
 import pytest
 
+from ethosu.vela import vela
 from ethosu.vela.operation import Op
+from ethosu.vela.test import testutil
 from ethosu.vela.tflite.TensorType import TensorType
 from ethosu.vela.tflite_mapping import TFLITE_CONV2D_BACKPROP_INDICES
 from ethosu.vela.tflite_mapping import TFLITE_IFM_WEIGHTS_BIAS_INDICES
+from ethosu.vela.tflite_reader import TFLiteGraph
 from ethosu.vela.tflite_reader import TFLiteSubgraph
 
 
@@ -116,3 +120,24 @@ class TestTFLiteSubgraph:
 
         tens = subgraph.parse_tensor(tens_data)
         assert np.array_equal(tens.values, buffer)
+
+
+def test_constant_values_are_read_only(tmpdir):
+    filename = os.path.join(str(tmpdir), "net.tflite")
+    testutil.write_conv_network(filename, weights_zero_point=1)
+    tflite_graph = TFLiteGraph(filename, 1, {}, [], [])
+    tensors = {tens.name: tens for tens in tflite_graph.subgraphs[0].tensors}
+    # The values are views of the memory mapped file
+    for name in ("conv0_weights_0", "conv0_bias_0"):
+        assert not tensors[name].values.flags.writeable
+    # The quantisation parameters are copied, as they are modified by graph rewrites
+    assert tensors["conv0_weights_0"].quantization.zero_point.flags.writeable
+
+
+def test_compile_rewritten_constants(tmpdir):
+    # The weights of a strided first convolution are rewritten, and asymmetric weight zero points are adjusted,
+    # without modifying the read-only values
+    network = os.path.join(str(tmpdir), "net.tflite")
+    testutil.write_conv_network(network, depths=(3, 16, 16), stride=2, weights_zero_point=1)
+    assert vela.main([network, "--output-dir", str(tmpdir)]) == 0
+    assert os.path.exists(os.path.join(str(tmpdir), "net_vela.tflite"))
@@ -0,0 +1,86 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description:
+# Unit tests for tflite_writer
+import os
+
+import numpy as np
+
+from ethosu.vela.data_type import DataType
+from ethosu.vela.nn_graph import Graph
+from ethosu.vela.nn_graph import Pass
+from ethosu.vela.nn_graph import PassPlacement
+from ethosu.vela.nn_graph import Subgraph
+from ethosu.vela.operation import Op
+from ethosu.vela.operation import Operation
+from ethosu.vela.tensor import create_const_tensor
+from ethosu.vela.tensor import Tensor
+from ethosu.vela.tflite_reader import TFLiteGraph
+from ethosu.vela.tflite_writer import TFLiteSerialiser
+from ethosu.vela.tflite_writer import write_tflite
+
+
+def create_fully_connected_graph():
+    ifm = Tensor([1, 8], DataType.int8, "ifm")
+    placeholder = Operation(Op.Placeholder, "input")
+    placeholder.set_output_tensor(ifm)
+    weights = np.arange(8 * 3, dtype=np.int8).reshape(8, 3)
+    weight_tens = create_const_tensor("weights", [8, 3], DataType.int8, weights, np.int8)
+    bias_tens = create_const_tensor("bias", [3], DataType.int32, [1, -2, 3], np.int32)
+    ofm = Tensor([1, 3], DataType.int8, "ofm")
+    op = Operation(Op.FullyConnected, "fc")
+    op.attrs = {"weights_format": 0, "keep_num_dims": False, "asymmetric_quantize_inputs": False}
+    op.add_input_tensor(ifm)
+    op.add_input_tensor(weight_tens)
+    op.add_input_tensor(bias_tens)
+    op.set_output_tensor(ofm)
+    sg = Subgraph("main", PassPlacement.Cpu)
+    for pass_op in (placeholder, op):
+        ps = Pass(pass_op.name, PassPlacement.Cpu, False, None)
+        ps.ops = [pass_op]
+        sg.passes.append(ps)
+    sg.input_tensors = [ifm]
+    sg.original_inputs = [ifm]
+    sg.output_tensors = [ofm]
+    nng = Graph("fc")
+    nng.subgraphs.append(sg)
+    return nng, weights
+
+
+def test_write_tflite(tmpdir):
+    nng, weights = create_fully_connected_graph()
+    filename = os.path.join(str(tmpdir), "fc.tflite")
+    write_tflite(nng, filename)
+    tflite_graph = TFLiteGraph(filename, 1, {}, [], [])
+    tensors = {tens.name: tens for tens in tflite_graph.subgraphs[0].tensors}
+    # Fully connected weights are stored with the output channels first
+    assert np.array_equal(tensors["weights_0"].values, weights.T)
+    assert list(tensors["bias_0"].values) == [1, -2, 3]
+    with open(filename, "rb") as f:
+        data = f.read()
+    # The constant buffers are written 16 byte aligned
+    assert data.index(weights.T.tobytes()) % 16 == 0
+
+
+def test_reserve_bytes_keeps_output():
+    outputs = []
+    for reserve in (False, True):
+        serialiser = TFLiteSerialiser(create_fully_connected_graph()[0])
+        if reserve:
+            serialiser.reserve_bytes(1 << 16)
+        outputs.append(bytes(serialiser.serialise()))
+    assert outputs[0] == outputs[1]
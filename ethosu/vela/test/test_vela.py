@@ -0,0 +1,175 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description:
+# Unit tests for the command line interface
+import csv
+import io
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from ethosu.vela import stats_writer
+from ethosu.vela import vela
+from ethosu.vela import weight_compressor
+from ethosu.vela.test import testutil
+from ethosu.vela.weight_compressor import CompressedWeightCache
+from ethosu.vela.weight_compressor import WeightEncoderPool
+
+
+def test_read_batch_manifest(tmpdir):
+    manifest = os.path.join(str(tmpdir), "manifest.txt")
+    with open(manifest, "w") as f:
+        f.write("# Networks to compile\nnet1.tflite\n\n  sub/net2.tflite  \n/abs/net3.tflite\n")
+    assert vela.read_batch_manifest(manifest) == [
+        os.path.join(str(tmpdir), "net1.tflite"),
+        os.path.join(str(tmpdir), "sub", "net2.tflite"),
+        "/abs/net3.tflite",
+    ]
+
+
+def test_batch_duplicate_output_names(tmpdir):
+    networks = []
+    for sub_dir in ("a", "b"):
+        os.makedirs(os.path.join(str(tmpdir), sub_dir))
+        networks.append(os.path.join(str(tmpdir), sub_dir, "net.tflite"))
+        open(networks[-1], "w").close()
+    # Both networks would be written to the same output files
+    with pytest.raises(SystemExit):
+        vela.main(networks + ["--output-dir", str(tmpdir)])
+
+
+def test_batch_invalid_network(tmpdir, capsys):
+    networks = [os.path.join(str(tmpdir), name) for name in ("empty.tflite", "garbage.tflite", "net.tflite")]
+    open(networks[0], "w").close()
+    with open(networks[1], "wb") as f:
+        f.write(b"garbage" * 16)
+    testutil.write_conv_network(networks[2])
+    output_dir = os.path.join(str(tmpdir), "output")
+    # The invalid networks fail, but do not stop the compilation of the other networks
+    assert vela.main(networks + ["--output-dir", output_dir, "--batch-jobs", "2"]) == 1
+    assert "Compiled 1 of 3 networks" in capsys.readouterr().out
+    assert os.path.exists(os.path.join(output_dir, "net_vela.tflite"))
+    with open(os.path.join(output_dir, "batch_summary_internal-default.csv")) as f:
+        assert len(list(csv.reader(f))) == 2
+
+
+def test_batch_weight_cache_dir(tmpdir, monkeypatch):
+    networks = [os.path.join(str(tmpdir), name) for name in ("net1.tflite", "net2.tflite")]
+    testutil.write_conv_network(networks[0])
+    testutil.write_conv_network(networks[1], depths=(16, 64))
+    cache_dir = os.path.join(str(tmpdir), "cache")
+    # Spawned worker processes do not inherit the state of the parent process
+    monkeypatch.setattr(multiprocessing, "Pool", multiprocessing.get_context("spawn").Pool)
+    args = ["--output-dir", str(tmpdir), "--batch-jobs", "2", "--weight-cache-dir", cache_dir]
+    assert vela.main(networks + args) == 0
+    assert os.listdir(cache_dir)
+
+
+def test_invalid_search_effort(tmpdir):
+    network = os.path.join(str(tmpdir), "net.tflite")
+    open(network, "w").close()
+    with pytest.raises(SystemExit):
+        vela.main([network, "--search-effort", "0"])
+
+
+def test_write_combined_summary_metrics_csv(tmpdir):
+    summaries = [(["network", "cycles"], ["net1", 100]), (["network", "cycles"], ["net2", 200])]
+    summary_filename = os.path.join(str(tmpdir), "summary.csv")
+    stats_writer.write_combined_summary_metrics_csv(summaries, summary_filename)
+    with open(summary_filename) as f:
+        assert list(csv.reader(f)) == [["network", "cycles"], ["net1", "100"], ["net2", "200"]]
+
+
+def test_compile_server_invalid_jobs():
+    server = vela.CompileServer({}, False, None, None, None, False, False)
+    requests = io.StringIO('not json\n\n[1]\n{"network": "does_not_exist.tflite"}\n')
+    responses = io.StringIO()
+    assert server.serve(requests, responses) == 3
+    results = [json.loads(line) for line in responses.getvalue().splitlines()]
+    assert [result["status"] for result in results] == ["error", "error", "error"]
+    assert results[0]["output"].startswith("Error: Invalid compile job")
+    assert results[1]["output"].startswith("Error: Invalid compile job")
+    assert results[2]["network"] == "does_not_exist.tflite"
+    assert "File not found" in results[2]["output"]
+
+
+def test_compile_server_continues_after_failure(tmpdir, monkeypatch, capsys):
+    empty_network = os.path.join(str(tmpdir), "empty.tflite")
+    open(empty_network, "w").close()
+    network = os.path.join(str(tmpdir), "net.tflite")
+    testutil.write_conv_network(network)
+    jobs = [{"network": empty_network}, {"network": network}]
+    monkeypatch.setattr("sys.stdin", io.StringIO("".join(json.dumps(job) + "\n" for job in jobs)))
+    # The empty network exits the TFLite reader, the server still answers it and compiles the next job
+    assert vela.main(["--serve", "--output-dir", str(tmpdir)]) == 1
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [result["status"] for result in results] == ["error", "ok"]
+    assert "Error" in results[0]["output"]
+    assert os.path.join(str(tmpdir), "net_vela.tflite") in results[1]["output_files"]
+
+
+def test_weight_cache_dir(tmpdir, monkeypatch):
+    network = os.path.join(str(tmpdir), "net.tflite")
+    testutil.write_conv_network(network)
+    cache_dir = os.path.join(str(tmpdir), "cache")
+    encode_weights_batch = weight_compressor.encode_weights_batch
+    encoded = []
+
+    def encode_weights_batch_wrapper(jobs):
+        encoded.extend(jobs)
+        return encode_weights_batch(jobs)
+
+    def compile_network(output_dir, *args):
+        encoded.clear()
+        assert vela.main([network, "--output-dir", os.path.join(str(tmpdir), output_dir), *args]) == 0
+        # The cache is only used by the compilation that enabled it
+        assert CompressedWeightCache.persistent_cache is None
+        with open(os.path.join(str(tmpdir), output_dir, "net_vela.tflite"), "rb") as f:
+            return f.read()
+
+    monkeypatch.setattr(weight_compressor, "encode_weights_batch", encode_weights_batch_wrapper)
+    output = compile_network("first", "--weight-cache-dir", cache_dir)
+    assert encoded
+    entries = sorted(os.listdir(cache_dir))
+    assert entries
+    # A second run is served from the cache and gives the same output
+    assert compile_network("second", "--weight-cache-dir", cache_dir) == output
+    assert not encoded
+    # A run without the option neither uses nor updates the cache
+    assert compile_network("third") == output
+    assert encoded
+    assert sorted(os.listdir(cache_dir)) == entries
+
+
+@pytest.mark.parametrize("args, expected_workers", [([], 1), (["--weight-encode-jobs", "0"], os.cpu_count() or 1)])
+def test_weight_encode_jobs(tmpdir, monkeypatch, args, expected_workers):
+    network = os.path.join(str(tmpdir), "net.tflite")
+    testutil.write_conv_network(network)
+    start = WeightEncoderPool.start
+    workers = []
+
+    def start_wrapper(jobs):
+        workers.append(jobs)
+        start(jobs)
+
+    monkeypatch.setattr(WeightEncoderPool, "start", start_wrapper)
+    # The weights are encoded serially unless more jobs are asked for, 0 uses one job per CPU
+    assert vela.main([network, "--output-dir", str(tmpdir)] + args) == 0
+    assert workers == [expected_workers]
+    assert WeightEncoderPool.executor is None
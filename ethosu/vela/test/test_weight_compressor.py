@@ -0,0 +1,170 @@
+# Copyright (C) 2021 Arm Limited or its affiliates. All rights reserved.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the License); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Description:
+# Contains unit tests for weight compression
+import os
+
+import numpy as np
+
+from ethosu.vela import scaling
+from ethosu.vela import weight_compressor
+from ethosu.vela.api import NpuBlockTraversal
+from ethosu.vela.architecture_features import Accelerator
+from ethosu.vela.weight_compressor import CompressedWeightCache
+from ethosu.vela.weight_compressor import PersistentWeightCache
+from ethosu.vela.weight_compressor import WeightEncodeJob
+from ethosu.vela.weight_compressor import WeightEncoderPool
+
+
+def _encode_args(weights):
+    return WeightEncodeJob(Accelerator.Ethos_U55_128, weights, (1, 1), 8, 16, False, NpuBlockTraversal.DEPTH_FIRST)
+
+
+def test_persistent_weight_cache_key():
+    weights = np.arange(-72, 72, dtype=np.int16).reshape(16, 3, 3, 1)
+    key = PersistentWeightCache.create_key(*_encode_args(weights))
+    # Same values give the same key, regardless of memory layout
+    assert key == PersistentWeightCache.create_key(*_encode_args(np.asfortranarray(weights)))
+    # Any change to the values or to the encoding options give a different key
+    assert key != PersistentWeightCache.create_key(*_encode_args(weights + 1))
+    args = list(_encode_args(weights))
+    args[0] = Accelerator.Ethos_U55_256
+    assert key != PersistentWeightCache.create_key(*args)
+    args = list(_encode_args(weights))
+    args[4] = 32
+    assert key != PersistentWeightCache.create_key(*args)
+
+
+def test_persistent_weight_cache_encode(tmpdir):
+    weights = np.arange(-72, 72, dtype=np.int16).reshape(16, 3, 3, 1)
+    expected = weight_compressor.encode_weights(*_encode_args(weights))
+
+    cache = PersistentWeightCache(str(tmpdir), 1 << 20)
+    CompressedWeightCache.persistent_cache = cache
+    try:
+        # First call populates the cache, second call is served from it
+        assert WeightEncoderPool.encode([_encode_args(weights)]) == [expected]
+        assert cache.size > 0
+        assert len(os.listdir(str(tmpdir))) == 1
+        assert WeightEncoderPool.encode([_encode_args(weights)]) == [expected]
+    finally:
+        CompressedWeightCache.persistent_cache = None
+
+    # A new cache instance on the same directory (i.e. a new compiler run) sees the earlier entries
+    cache = PersistentWeightCache(str(tmpdir), 1 << 20)
+    key = cache.create_key(*_encode_args(weights))
+    assert cache.get(key) == expected
+
+
+def test_persistent_weight_cache_eviction(tmpdir):
+    entry_size = PersistentWeightCache.HEADER.size + 100
+    cache = PersistentWeightCache(str(tmpdir), 3 * entry_size)
+    for i in range(3):
+        cache.put(f"key{i}", bytearray(100), i)
+        os.utime(cache._path(f"key{i}"), (i, i))
+    assert cache.size == 3 * entry_size
+
+    # Using the oldest entry makes it the most recently used
+    assert cache.get("key0") == (bytearray(100), 0)
+    cache.put("key3", bytearray(100), 3)
+    assert cache.size == 3 * entry_size
+    assert cache.get("key1") is None
+    for key in ("key0", "key2", "key3"):
+        assert cache.get(key) is not None
+
+
+def test_persistent_weight_cache_overwrite(tmpdir):
+    entry_size = PersistentWeightCache.HEADER.size + 100
+    cache = PersistentWeightCache(str(tmpdir), 1 << 20)
+    cache.put("key", bytearray(100), 0)
+    cache.put("key", bytearray(100), 0)
+    assert cache.size == entry_size
+    assert cache.size == PersistentWeightCache(str(tmpdir), 1 << 20).size
+
+
+def test_persistent_weight_cache_corrupt_entry(tmpdir):
+    cache = PersistentWeightCache(str(tmpdir), 1 << 20)
+    cache.put("key", bytearray(range(100)), 0)
+    path = cache._path("key")
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\xff")
+    assert cache.get("key") is None
+    # Corrupted padded length
+    cache.put("key", bytearray(range(100)), 0)
+    with open(path, "r+b") as f:
+        f.write(PersistentWeightCache.HEADER.pack(1, b"")[:8])
+    assert cache.get("key") is None
+    # Truncated entry
+    with open(path, "r+b") as f:
+        f.truncate(PersistentWeightCache.HEADER.size + 50)
+    assert cache.get("key") is None
+
+
+def test_persistent_weight_cache_failed_write(tmpdir, monkeypatch):
+    cache = PersistentWeightCache(str(tmpdir), 1 << 20)
+
+    def failing_replace(src, dst):
+        raise OSError("Simulated failure")
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    cache.put("key", bytearray(100), 0)
+    assert os.listdir(str(tmpdir)) == []
+    assert cache.size == 0
+
+
+def test_weight_encoder_pool():
+    rng = np.random.default_rng(0)
+    jobs = [_encode_args(rng.integers(-127, 128, size=(16, 3, 3, 8), dtype=np.int16)) for _ in range(5)]
+    expected = [weight_compressor.encode_weights(*job) for job in jobs]
+    WeightEncoderPool.start(2)
+    try:
+        # Results are in the same order as the jobs
+        assert WeightEncoderPool.encode(jobs) == expected
+    finally:
+        WeightEncoderPool.shutdown()
+    assert WeightEncoderPool.executor is None
+    assert WeightEncoderPool.encode(jobs) == expected
+
+
+def test_encode_weights_batch():
+    rng = np.random.default_rng(1)
+    jobs = [_encode_args(rng.integers(-127, 128, size=(16, 3, 3, 8), dtype=np.int16)) for _ in range(3)]
+    jobs.append(jobs[0]._replace(is_depthwise=True, weights_volume=jobs[0].weights_volume[:, :, :, :1]))
+    expected = [weight_compressor.encode_weights(*job) for job in jobs]
+    assert weight_compressor.encode_weights_batch(jobs) == expected
+
+
+def test_quantise_scales():
+    scales = [0.0, 1e-3, 0.25, 0.5, 0.75, 1.0, 1.5, 3e-10, 1e-20, 1e6, (1 << 31) - 0.5]
+    multipliers, shifts = scaling.quantise_scales(scales)
+    assert list(zip(multipliers, shifts)) == [scaling.quantise_scale(scale) for scale in scales]
+    multipliers, shifts = scaling.reduced_quantise_scales(scales)
+    assert list(zip(multipliers, shifts)) == [scaling.reduced_quantise_scale(scale) for scale in scales]
+
+
+def test_encode_biases():
+    biases = [0, -1, 1, 12345678, -(1 << 39), (1 << 39) - 1]
+    scales = [0, 1, (1 << 32) - 1, 0x12345678, 1 << 31, 7]
+    shifts = [0, 63, 1, 31, 16, 2]
+    records = weight_compressor.encode_biases(biases, scales, shifts)
+    assert records.nbytes == 10 * len(biases)
+    assert records.tobytes() == b"".join(
+        weight_compressor.encode_bias(np.int64(bias), scale, shift)
+        for bias, scale, shift in zip(biases, scales, shifts)
+    )
+    # The records are little endian [bias(40-bits), scale(32-bits), shift(6-bits)]
+    assert records[1].tobytes() == bytes([0xFF] * 5 + [1, 0, 0, 0, 63])
@@ -20,13 +20,16 @@ import numpy as np
 from ethosu.vela import architecture_features
 from ethosu.vela.data_type import DataType
 from ethosu.vela.nn_graph import Graph
+from ethosu.vela.nn_graph import Pass
 from ethosu.vela.nn_graph import PassPlacement
 from ethosu.vela.nn_graph import Subgraph
 from ethosu.vela.operation import Op
 from ethosu.vela.operation import Operation
+from ethosu.vela.operation import Padding
 from ethosu.vela.tensor import create_const_tensor
 from ethosu.vela.tensor import QuantizationParameters
 from ethosu.vela.tensor import Tensor
+from ethosu.vela.tflite_writer import write_tflite
 
 
 def create_arch():
@@ -146,3 +149,55 @@ def create_graph(op_list):
     sg = create_subgraph(op_list)
     nng.subgraphs.append(sg)
     return nng
+
+
+def write_conv_network(filename, depths=(16, 32, 32), stride=1, weights_zero_point=0, size=16):
+    # Writes a TFLite network of int8 convolutions that can be compiled by Vela, the depth of the input and the
+    # output of each convolution are given by depths. All convolutions use the given stride and weight zero point,
+    # and the input has the given height and width.
+    rng = np.random.default_rng(0)
+    ifm = Tensor([1, size, size, depths[0]], DataType.int8, "input")
+    ifm.quantization = default_quant_params()
+    placeholder = Operation(Op.Placeholder, "input")
+    placeholder.set_output_tensor(ifm)
+    ops = [placeholder]
+    for idx, depth in enumerate(depths[1:]):
+        weights_shape = [3, 3, ifm.shape[-1], depth]
+        weights_quant = default_quant_params()
+        weights_quant.scale_f32 = np.full(depth, 0.01, dtype=np.float32)
+        weights_quant.zero_point = np.full(depth, weights_zero_point, dtype=np.int64)
+        weights = rng.integers(-127, 128, size=weights_shape, dtype=np.int8)
+        ofm_height, ofm_width = [-(-size // stride) for size in ifm.shape[1:3]]
+        ofm = Tensor([1, ofm_height, ofm_width, depth], DataType.int8, f"conv{idx}_ofm")
+        ofm.quantization = default_quant_params()
+        op = create_op(
+            Op.Conv2DBias,
+            [
+                ifm,
+                create_const_tensor(
+                    f"conv{idx}_weights", weights_shape, DataType.int8, weights, np.int8, quantization=weights_quant
+                ),
+                create_const_tensor(f"conv{idx}_bias", [depth], DataType.int32, np.zeros(depth), np.int32),
+            ],
+            ofm,
+            attrs={
+                "padding": Padding.SAME,
+                "stride_w": stride,
+                "stride_h": stride,
+                "dilation_w_factor": 1,
+                "dilation_h_factor": 1,
+            },
+        )
+        ops.append(op)
+        ifm = ofm
+    sg = Subgraph("main", PassPlacement.Cpu)
+    for op in ops:
+        ps = Pass(op.name, PassPlacement.Cpu, False, None)
+        ps.ops = [op]
+        sg.passes.append(ps)
+    sg.input_tensors = [placeholder.ofm]
+    sg.original_inputs = [placeholder.ofm]
+    sg.output_tensors = [ifm]
+    nng = Graph("conv")
+    nng.subgraphs.append(sg)
+    write_tflite(nng, filename)
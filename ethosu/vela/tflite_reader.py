@@ -15,6 +15,7 @@
 # limitations under the License.
 # Description:
 # Functions used to read from a TensorFlow Lite format file.
+import mmap
 import os.path
 import struct
 import sys
@@ -103,11 +104,13 @@ class TFLiteSubgraph:
         tens.values = None
         buf = self.graph.buffers[tens_data.Buffer()]
         if buf is not None:
+            # The values are a read-only view of the memory mapped file, graph rewrites that change the values
+            # create new arrays
             np_dtype = datatype_map_numpy[tens_dtype]
             if dtype == DataType.string:
-                tens.values = np.array(buf.view(np_dtype))
+                tens.values = buf.view(np_dtype)
             else:
-                tens.values = np.array(buf.view(np_dtype).reshape(shape))
+                tens.values = buf.view(np_dtype).reshape(shape)
         return tens
 
     def parse_operator(self, op_index, op_data):
@@ -189,7 +192,8 @@ class TFLiteSubgraph:
             return None
         if len(arr) == 1:
             return arr[0]
-        return arr
+        # The array is a read-only view of the memory mapped file, and graph rewrites modify the quantisation
+        return arr.copy()
 
 
 class TFLiteGraph:
@@ -203,7 +207,9 @@ class TFLiteGraph:
         self.initialisation_nodes = initialisation_nodes
 
         with open(filename, "rb") as f:
-            buf = bytearray(f.read())
+            # The file is memory mapped instead of read into memory, the constant buffers are views of the mapping.
+            # An empty file can not be mapped, it fails to parse below.
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
 
         try:
             parsing_step = "parsing root"
@@ -71,6 +71,10 @@ def make_vector(v):
 
 
 class TFLiteSerialiser:
+    # Upper bound of the bytes, besides the data, that are written for every buffer: the alignment padding, the
+    # vector length, the Buffer table with its vtable and the entry in the vector of buffers
+    buffer_overhead = 64
+
     def __init__(self, nng):
         self.builder = flatbuffers.Builder(0)
         self.nng = nng
@@ -255,8 +259,9 @@ class TFLiteSerialiser:
             tens_shape = [tens_shape[idx] for idx in reorder]
             values = values.transpose(reorder)
 
+        # The values are flattened when the buffer is written, so that transposed copies only exist one at a time
         buf_id = self.buffer_map[tens]
-        self.buffers_to_write[buf_id] = values.flatten().view(np.uint8)
+        self.buffers_to_write[buf_id] = values
 
         shape = self.write_int_vector(tens_shape)
 
@@ -387,14 +392,25 @@ class TFLiteSerialiser:
 
         return SubGraph.SubGraphEnd(builder)
 
+    def reserve_bytes(self, nbytes):
+        """Grows the builder in one step so that nbytes more can be written to it without it having to be regrown"""
+        builder = self.builder
+        if builder.Head() < nbytes:
+            used = len(builder.Bytes) - builder.Head()
+            new_bytes = bytearray(used + nbytes)
+            new_bytes[nbytes:] = memoryview(builder.Bytes)[builder.Head() :]
+            builder.Bytes = new_bytes
+            builder.head = UOffsetTFlags.py_type(nbytes)
+
     def write_aligned_bytes(self, buf):
         builder = self.builder
         builder.nested = True
-        data = bytes(buf)
+        data = memoryview(np.ascontiguousarray(buf).reshape(-1).view(np.uint8))
         length_bytes = UOffsetTFlags.py_type(len(data))
         builder.Prep(16, length_bytes)  # Reserve aligned storage
         builder.head = UOffsetTFlags.py_type(builder.Head() - length_bytes)  # Update FlatBuffer internal pointer
-        builder.Bytes[builder.Head() : builder.Head() + length_bytes] = data  # Assign bytes to aligned area
+        # Assign bytes to aligned area, through a memoryview since assigning to a bytearray slice makes a copy first
+        memoryview(builder.Bytes)[builder.Head() : builder.Head() + length_bytes] = data
         return builder.EndVector(length_bytes)
 
     def serialise_buffer(self, buf):
@@ -451,6 +467,12 @@ class TFLiteSerialiser:
             self.buffers_to_write.append(buffer)
             metadata_list.append((name, len(self.buffers_to_write) - 1))
 
+        # The buffers make up most of the model, the builder is grown for them up front because every time it
+        # grows by itself it needs to hold both the old and the new copy of everything written so far
+        self.reserve_bytes(
+            sum(np.asarray(buf).nbytes for buf in self.buffers_to_write if buf is not None)
+            + self.buffer_overhead * len(self.buffers_to_write)
+        )
         buffers_offset = self.write_offset_vector([self.serialise_buffer(buf) for buf in self.buffers_to_write])
         metadata_offset = self.write_offset_vector([self.serialise_metadata(metadata) for metadata in metadata_list])
 
@@ -469,7 +491,8 @@ class TFLiteSerialiser:
 
         self.builder.FinishWithFileIdentifier(model, tflite_file_identifier)
 
-        return self.builder.Output()
+        # A view of the used part of the builder, Output() would return a copy of it
+        return memoryview(self.builder.Bytes)[self.builder.Head() :]
 
     def write(self, filename):
         with open(self.filename, "wb") as f:
@@ -18,35 +18,40 @@
 #
 # Provides command line interface, options parsing, and network loading. Before calling the compiler driver.
 import argparse
+import contextlib
+import copy
+import glob
+import io
+import json
+import multiprocessing
 import os
 import sys
 import time
-
-import flatbuffers
+import traceback
+from typing import Dict
+from typing import Tuple
 
 from . import architecture_features
 from . import compiler_driver
 from . import model_reader
-from . import rawdata_writer
 from . import scheduler
 from . import stats_writer
-from . import tflite_writer
 from ._version import __version__
 from .api import API_VERSION
+from .compilation_context import CompilationContext
 from .debug_database import DebugDatabase
+from .errors import CompileJobError
 from .errors import InputFileError
 from .errors import VelaError
 from .nn_graph import NetworkType
 from .nn_graph import TensorAllocator
+from .profiler import peak_rss
+from .profiler import Profiler
 from .tensor import MemArea
 from .tensor import Tensor
-from .tflite.Model import Model
-from .tflite_mapping import builtin_operator_map
-from .tflite_mapping import builtin_operator_name_map
-from .tflite_model_semantic import TFLiteSemantic
-from .tflite_supported_operators import TFLiteSupportedOperators
-from .tosa_model_semantic import TosaSemantic
-from .tosa_supported_operators import TosaSupportedOperators
+from .weight_compressor import CompressedWeightCache
+from .weight_compressor import PersistentWeightCache
+from .weight_compressor import WeightEncoderPool
 from ethosu.vela.architecture_features import ArchitectureFeatures
 
 
@@ -56,55 +61,281 @@ def process(input_name, enable_debug_db, arch, model_reader_options, compiler_op
 
     os.makedirs(compiler_options.output_dir, exist_ok=True)
     output_basename = os.path.join(compiler_options.output_dir, os.path.splitext(os.path.basename(input_name))[0])
-    DebugDatabase.show_warnings = enable_debug_db
 
-    nng, network_type = model_reader.read_model(input_name, model_reader_options)
+    # Every network is compiled in a new compilation context, so that its state is not shared with other compilations
+    with CompilationContext().activate() as context, Profiler.started(compiler_options.profile):
+        context.debug_show_warnings = enable_debug_db
+        with Profiler.stage("model_reading"):
+            nng, network_type = model_reader.read_model(input_name, model_reader_options)
 
-    if not nng:
-        raise InputFileError(input_name, "Input file could not be read")
+        if not nng:
+            raise InputFileError(input_name, "Input file could not be read")
 
-    if compiler_options.verbose_operators:
-        nng.print_operators()
+        if compiler_options.verbose_operators:
+            nng.print_operators()
 
-    if compiler_options.timing:
-        stop = time.time()
-        print("Model reading took %f s" % (stop - start))
-        start = time.time()
+        if compiler_options.timing:
+            stop = time.time()
+            print("Model reading took %f s" % (stop - start))
+            rss = peak_rss()
+            if rss is not None:
+                print("Model reading peak RSS %.2f MiB" % (rss / (1024 * 1024)))
+            start = time.time()
 
-    compiler_driver.compiler_driver(nng, arch, compiler_options, scheduler_options, network_type)
+        compiler_driver.compiler_driver(nng, arch, compiler_options, scheduler_options, network_type)
 
-    summary_csv_file = "{0}_summary_{1}.csv".format(output_basename, arch.system_config)
-    stats_writer.write_summary_metrics_csv(nng, summary_csv_file, arch)
+        summary_csv_file = "{0}_summary_{1}.csv".format(output_basename, arch.system_config)
+        stats_writer.write_summary_metrics_csv(nng, summary_csv_file, arch)
 
-    stats_writer.print_performance_metrics(
-        nng,
-        show_cpu_operations=compiler_options.show_cpu_operations,
-        verbose_weights=compiler_options.verbose_weights,
-        arch=arch,
-    )
+        stats_writer.print_performance_metrics(
+            nng,
+            show_cpu_operations=compiler_options.show_cpu_operations,
+            verbose_weights=compiler_options.verbose_weights,
+            arch=arch,
+        )
 
-    output_tfl_filename = output_basename + "_vela.tflite"
-    if input_name.endswith(".tflite"):
-        tflite_writer.write_tflite(nng, output_tfl_filename)
-    if input_name.endswith(".tosa"):
-        rawdata_writer.write_rawdata_output(nng, arch, output_basename)
+        output_tfl_filename = output_basename + "_vela.tflite"
+        with Profiler.stage("output_writing"):
+            # The writer of the network type is imported on first use
+            if input_name.endswith(".tflite"):
+                from . import tflite_writer
 
-    if enable_debug_db:
-        file_offsets = calculate_operator_file_offsets(output_tfl_filename)
-        for idx, offset in enumerate(sorted(file_offsets)):
-            sg = find_subgraph_with_command_stream_order(nng, idx)
-            if sg is not None:
-                DebugDatabase.set_stream_offset(sg, offset)
-        debug_filename = output_basename + "_debug.xml"
-        DebugDatabase.write(debug_filename, input_name, output_tfl_filename)
+                tflite_writer.write_tflite(nng, output_tfl_filename)
+            if input_name.endswith(".tosa"):
+                from . import rawdata_writer
 
-    if compiler_options.timing:
-        stop = time.time()
-        print("Compiler driver took %f s" % (stop - start))
+                rawdata_writer.write_rawdata_output(nng, arch, output_basename)
+
+        if enable_debug_db:
+            file_offsets = calculate_operator_file_offsets(output_tfl_filename)
+            for idx, offset in enumerate(sorted(file_offsets)):
+                sg = find_subgraph_with_command_stream_order(nng, idx)
+                if sg is not None:
+                    DebugDatabase.set_stream_offset(sg, offset)
+            debug_filename = output_basename + "_debug.xml"
+            DebugDatabase.write(debug_filename, input_name, output_tfl_filename)
+
+        if compiler_options.profile:
+            profile_file = "{0}_profile_{1}.json".format(output_basename, arch.system_config)
+            Profiler.write(profile_file, nng.name)
+
+        if compiler_options.timing:
+            stop = time.time()
+            print("Compiler driver took %f s" % (stop - start))
 
     return nng
 
 
+def print_compile_error(e):
+    """Prints the error that failed the compilation of one network when several networks are compiled, so that the
+    other networks can still be compiled. Errors other than VelaError are internal errors and their traceback is
+    printed, and the reader of the network type might have printed its own error before exiting."""
+    if isinstance(e, VelaError):
+        print(e.data)
+    elif isinstance(e, SystemExit):
+        print(f"Error: Compilation exited with status {e.code}")
+    else:
+        traceback.print_exc(file=sys.stdout)
+        print(f"Error: Internal error: {type(e).__name__}: {e}")
+
+
+# Options shared by all networks of a batch compilation, set in each worker process by init_batch_worker
+_batch_options = None
+
+
+def init_batch_worker(batch_options):
+    global _batch_options
+    _batch_options = batch_options
+    # The persistent weight cache is created in the worker, since it is not inherited with the spawn start method
+    weight_cache_dir, weight_cache_size = batch_options[-2:]
+    CompressedWeightCache.persistent_cache = None
+    if weight_cache_dir is not None:
+        CompressedWeightCache.persistent_cache = PersistentWeightCache(weight_cache_dir, weight_cache_size)
+
+
+def process_batch_network(input_name):
+    """Compiles one network of a batch in a worker process and returns its captured output and summary metrics.
+    The summary metrics are None if the network failed to compile, any error only fails the compilation of this
+    network."""
+    (
+        enable_debug_db,
+        arch,
+        model_reader_options,
+        compiler_options,
+        scheduler_options,
+        show_io_summary,
+        _weight_cache_dir,
+        _weight_cache_size,
+    ) = _batch_options
+    output = io.StringIO()
+    summary = None
+    with contextlib.redirect_stdout(output):
+        try:
+            nng = process(input_name, enable_debug_db, arch, model_reader_options, compiler_options, scheduler_options)
+            if show_io_summary:
+                print_subgraph_io_summary(nng)
+            summary = stats_writer.summary_metrics(nng, arch)
+        except (Exception, SystemExit) as e:
+            print_compile_error(e)
+    return output.getvalue(), summary
+
+
+def process_batch(input_names, jobs, batch_options):
+    """Compiles several networks concurrently using the same architecture and options, and writes a combined summary
+    CSV file of all successfully compiled networks. Returns the number of networks that failed to compile."""
+    arch = batch_options[1]
+    compiler_options = batch_options[3]
+    summaries = []
+    failed = 0
+    # Each network is compiled in its own compilation context, and the state that is not held by the context is the
+    # same for all networks of the batch, so the worker processes are reused between networks
+    with multiprocessing.Pool(min(jobs, len(input_names)), init_batch_worker, (batch_options,)) as pool:
+        for input_name, (output, summary) in zip(input_names, pool.imap(process_batch_network, input_names)):
+            print(f"Network: {input_name}")
+            print(output, end="")
+            if summary is None:
+                failed += 1
+            else:
+                summaries.append(summary)
+
+    os.makedirs(compiler_options.output_dir, exist_ok=True)
+    summary_csv_file = os.path.join(compiler_options.output_dir, "batch_summary_{}.csv".format(arch.system_config))
+    stats_writer.write_combined_summary_metrics_csv(summaries, summary_csv_file)
+    print(f"Compiled {len(input_names) - failed} of {len(input_names)} networks, summary written to {summary_csv_file}")
+    return failed
+
+
+def read_batch_manifest(filename):
+    """Returns the network filenames listed in a batch manifest file, one per line. Empty lines and lines starting
+    with '#' are ignored, and relative paths are relative to the directory of the manifest file."""
+    try:
+        with open(filename, "r") as f:
+            lines = [line.strip() for line in f]
+    except OSError:
+        raise InputFileError(filename, "File not found or is not readable")
+    manifest_dir = os.path.dirname(filename)
+    return [os.path.join(manifest_dir, line) for line in lines if line and not line.startswith("#")]
+
+
+def output_filenames(input_name, enable_debug_db, arch, compiler_options):
+    """Returns the names of the files that are written by process for a network"""
+    output_basename = os.path.join(compiler_options.output_dir, os.path.splitext(os.path.basename(input_name))[0])
+    filenames = ["{0}_summary_{1}.csv".format(output_basename, arch.system_config)]
+    if input_name.endswith(".tflite"):
+        filenames.append(output_basename + "_vela.tflite")
+    if input_name.endswith(".tosa"):
+        filenames += sorted(glob.glob(glob.escape(output_basename) + "_sg*_vela.npz"))
+    if enable_debug_db:
+        filenames.append(output_basename + "_debug.xml")
+    if compiler_options.profile:
+        filenames.append("{0}_profile_{1}.json".format(output_basename, arch.system_config))
+    return filenames
+
+
+class CompileServer:
+    """Compiles the networks of compile jobs that are read one JSON object per line, and writes one JSON response
+    line per job. The architectures are created on first use, and are then reused by all jobs with the same
+    accelerator configuration, system configuration and memory mode."""
+
+    # Job fields that select the architecture, they default to the command line options
+    ARCHITECTURE_FIELDS = ("accelerator_config", "system_config", "memory_mode")
+
+    def __init__(
+        self,
+        arch_options,
+        enable_debug_db,
+        model_reader_options,
+        compiler_options,
+        optimization_strategy,
+        verbose_schedule,
+        show_subgraph_io_summary,
+        search_effort=1,
+    ):
+        self.arch_options = arch_options
+        self.enable_debug_db = enable_debug_db
+        self.model_reader_options = model_reader_options
+        self.compiler_options = compiler_options
+        self.optimization_strategy = optimization_strategy
+        self.verbose_schedule = verbose_schedule
+        self.show_subgraph_io_summary = show_subgraph_io_summary
+        self.search_effort = search_effort
+        self.architectures: Dict[Tuple[str, ...], architecture_features.ArchitectureFeatures] = {}
+
+    def get_architecture(self, job):
+        arch_options = dict(self.arch_options)
+        for field in CompileServer.ARCHITECTURE_FIELDS:
+            if field in job:
+                if not isinstance(job[field], str):
+                    raise CompileJobError(f"'{field}' must be a string")
+                arch_options[field] = job[field]
+        key = tuple(arch_options[field] for field in CompileServer.ARCHITECTURE_FIELDS)
+        arch = self.architectures.get(key)
+        if arch is None:
+            if arch_options["system_config"] == ArchitectureFeatures.DEFAULT_CONFIG:
+                print(f"Warning: Using {ArchitectureFeatures.DEFAULT_CONFIG} values for system configuration")
+            if arch_options["memory_mode"] == ArchitectureFeatures.DEFAULT_CONFIG:
+                print(f"Warning: Using {ArchitectureFeatures.DEFAULT_CONFIG} values for memory mode")
+            arch = architecture_features.ArchitectureFeatures(**arch_options)
+            self.architectures[key] = arch
+        return arch
+
+    def compile(self, job):
+        """Compiles the network of a compile job and returns the written files and the summary metrics"""
+        if not isinstance(job, dict) or not isinstance(job.get("network"), str):
+            raise CompileJobError("expected an object with a 'network' filename")
+        network = job["network"]
+        if not os.access(network, os.R_OK):
+            raise InputFileError(network, "File not found or is not readable")
+        arch = self.get_architecture(job)
+        compiler_options = copy.copy(self.compiler_options)
+        if "output_dir" in job:
+            if not isinstance(job["output_dir"], str):
+                raise CompileJobError("'output_dir' must be a string")
+            compiler_options.output_dir = job["output_dir"]
+        scheduler_options = scheduler.SchedulerOptions(
+            optimization_strategy=self.optimization_strategy,
+            sram_target=arch.arena_cache_size,
+            verbose_schedule=self.verbose_schedule,
+            search_effort=self.search_effort,
+        )
+        nng = process(
+            network, self.enable_debug_db, arch, self.model_reader_options, compiler_options, scheduler_options
+        )
+        if self.show_subgraph_io_summary:
+            print_subgraph_io_summary(nng)
+        labels, data_items = stats_writer.summary_metrics(nng, arch)
+        return output_filenames(network, self.enable_debug_db, arch, compiler_options), dict(zip(labels, data_items))
+
+    def serve(self, requests, responses):
+        """Compiles the jobs that are read from requests until it is closed, and writes a response for every job to
+        responses. A job that fails with any error gets an error response, and the following jobs are still compiled.
+        Returns the number of jobs that failed."""
+        failed = 0
+        for line in requests:
+            if not line.strip():
+                continue
+            response = {"network": None, "status": "error", "output_files": [], "summary": None}
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                try:
+                    try:
+                        job = json.loads(line)
+                    except ValueError as e:
+                        raise CompileJobError(e)
+                    if isinstance(job, dict):
+                        response["network"] = job.get("network")
+                    response["output_files"], response["summary"] = self.compile(job)
+                    response["status"] = "ok"
+                except (Exception, SystemExit) as e:
+                    print_compile_error(e)
+                    failed += 1
+            response["output"] = output.getvalue()
+            # NumPy scalars in the summary metrics are converted to Python numbers
+            responses.write(json.dumps(response, default=lambda value: value.item()) + "\n")
+            responses.flush()
+        return failed
+
+
 def find_subgraph_with_command_stream_order(nng, idx):
     for sg in nng.subgraphs:
         if sg.generated_stream_id == idx:
@@ -113,6 +344,10 @@ def find_subgraph_with_command_stream_order(nng, idx):
 
 
 def calculate_operator_file_offsets(name: str):
+    import flatbuffers
+
+    from .tflite.Model import Model
+
     # Read the vela optimized tflite file
     with open(name, "rb") as f:
         buf = bytearray(f.read())
@@ -170,6 +405,13 @@ def print_subgraph_io_summary(nng):
 
 
 def generate_supported_ops():
+    from .tflite_mapping import builtin_operator_map
+    from .tflite_mapping import builtin_operator_name_map
+    from .tflite_model_semantic import TFLiteSemantic
+    from .tflite_supported_operators import TFLiteSupportedOperators
+    from .tosa_model_semantic import TosaSemantic
+    from .tosa_supported_operators import TosaSupportedOperators
+
     # Exclude network type from generation by adding value to exclude list.
     # To easily exclude NetworkType from generated documentation.
     exclude_generation_network_type_value = [NetworkType.TOSA.value]
@@ -283,6 +525,8 @@ def generate_supported_ops():
 
 
 def main(args=None):
+    # The persistent weight cache is only used by this call, and is restored for any later calls in the process
+    persistent_weight_cache = CompressedWeightCache.persistent_cache
     try:
         if args is None:
             args = sys.argv[1:]
@@ -303,9 +547,34 @@ def main(args=None):
             "network",
             metavar="NETWORK",
             type=str,
+            nargs="*",
+            help=(
+                "Filename of the input TensorFlow Lite for Microcontrollers network. Several networks are compiled"
+                " as a batch"
+            ),
+        )
+        parser.add_argument(
+            "--batch",
+            type=str,
             default=None,
-            nargs="?",
-            help="Filename of the input TensorFlow Lite for Microcontrollers network",
+            help="Manifest file listing the networks to compile as a batch, one filename per line",
+        )
+        parser.add_argument(
+            "--batch-jobs",
+            type=int,
+            default=0,
+            help=(
+                "Number of worker processes used to compile the networks of a batch, 0 uses one per CPU"
+                " (default: %(default)s)"
+            ),
+        )
+        parser.add_argument(
+            "--serve",
+            action="store_true",
+            help=(
+                "Run as a compile server that reads compile jobs from stdin and writes the results to stdout, one JSON"
+                " object per line"
+            ),
         )
         parser.add_argument(
             "--output-dir", type=str, default="output", help="Output directory to write files to (default: %(default)s)"
@@ -345,6 +614,11 @@ def main(args=None):
             "--show-cpu-operations", action="store_true", help="Show the operations that fall back to the CPU"
         )
         parser.add_argument("--timing", action="store_true", help="Time the compiler doing operations")
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Write the time and memory usage of each compiler stage to a JSON file in the output directory",
+        )
         parser.add_argument(
             "--accelerator-config",
             type=str,
@@ -397,6 +671,16 @@ def main(args=None):
                 " if specified) (default: %(default)s)"
             ),
         )
+        parser.add_argument(
+            "--search-effort",
+            type=int,
+            default=1,
+            help=(
+                "Number of stripe heights, each with shorter and longer cascades, that the Performance strategy"
+                " evaluates per cascade in addition to its binary search. Higher values can give faster schedules at"
+                " the cost of compilation time (default: %(default)s)"
+            ),
+        )
         parser.add_argument(
             "--arena-cache-size",
             type=int,
@@ -414,6 +698,40 @@ def main(args=None):
                 " operator inputs and outputs (default: %(default)s)"
             ),
         )
+        parser.add_argument(
+            "--graph-checks",
+            type=compiler_driver.GraphChecks,
+            default=compiler_driver.GraphChecks.Final,
+            choices=list(compiler_driver.GraphChecks),
+            help=(
+                "Select which graph health checks to run between the compiler stages. The final check verifies the"
+                " graph that is passed to the scheduler (default: %(default)s)"
+            ),
+        )
+        parser.add_argument(
+            "--weight-cache-dir",
+            type=str,
+            default=None,
+            help=(
+                "Directory of a persistent cache of encoded weights that is shared between compiler runs. Disabled if"
+                " not specified"
+            ),
+        )
+        parser.add_argument(
+            "--weight-cache-size",
+            type=int,
+            default=1 << 30,
+            help="Maximum size of the persistent weight cache, in bytes (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--weight-encode-jobs",
+            type=int,
+            default=1,
+            help=(
+                "Number of worker threads used to encode weights in parallel, 0 uses one per CPU"
+                " (default: %(default)s)"
+            ),
+        )
         parser.add_argument(
             "--recursion-limit",
             type=int,
@@ -427,9 +745,26 @@ def main(args=None):
             generate_supported_ops()
             return 0
 
-        if args.network is None:
+        networks = args.network
+        if args.batch is not None:
+            networks += read_batch_manifest(args.batch)
+
+        if args.serve:
+            if networks:
+                parser.error("NETWORK and --batch can not be used with --serve, the networks are given by the jobs")
+        elif not networks:
             parser.error("the following argument is required: NETWORK")
 
+        # Networks are written to the same output directory, so their output filenames must not clash
+        output_names = set()
+        for network in networks:
+            if not os.access(network, os.R_OK):
+                raise InputFileError(network, "File not found or is not readable")
+            output_name = os.path.splitext(os.path.basename(network))[0]
+            if output_name in output_names:
+                parser.error("Networks with the same output filename '{}' can not be compiled together".format(network))
+            output_names.add(output_name)
+
         # check all config files exist because they will be read as a group
         if args.config is not None:
             for filename in args.config:
@@ -442,10 +777,35 @@ def main(args=None):
                 "".format(args.cpu_tensor_alignment)
             )
 
-        if args.system_config == ArchitectureFeatures.DEFAULT_CONFIG:
+        if args.weight_cache_size <= 0:
+            parser.error(
+                "Invalid argument to --weight-cache-size = {} (must be greater than 0)".format(args.weight_cache_size)
+            )
+
+        if args.weight_encode_jobs < 0:
+            parser.error(
+                "Invalid argument to --weight-encode-jobs = {} (must be greater than or equal to 0)".format(
+                    args.weight_encode_jobs
+                )
+            )
+
+        if args.search_effort < 1:
+            parser.error(
+                "Invalid argument to --search-effort = {} (must be greater than or equal to 1)".format(
+                    args.search_effort
+                )
+            )
+
+        if args.batch_jobs < 0:
+            parser.error(
+                "Invalid argument to --batch-jobs = {} (must be greater than or equal to 0)".format(args.batch_jobs)
+            )
+
+        # The compile server reports these warnings in the responses of the jobs that use the default values
+        if args.system_config == ArchitectureFeatures.DEFAULT_CONFIG and not args.serve:
             print(f"Warning: Using {ArchitectureFeatures.DEFAULT_CONFIG} values for system configuration")
 
-        if args.memory_mode == ArchitectureFeatures.DEFAULT_CONFIG:
+        if args.memory_mode == ArchitectureFeatures.DEFAULT_CONFIG and not args.serve:
             print(f"Warning: Using {ArchitectureFeatures.DEFAULT_CONFIG} values for memory mode")
 
         if args.verbose_all:
@@ -455,7 +815,13 @@ def main(args=None):
 
         sys.setrecursionlimit(args.recursion_limit)
 
-        arch = architecture_features.ArchitectureFeatures(
+        CompressedWeightCache.persistent_cache = None
+        if args.weight_cache_dir is not None:
+            CompressedWeightCache.persistent_cache = PersistentWeightCache(
+                args.weight_cache_dir, args.weight_cache_size
+            )
+
+        arch_options = dict(
             vela_config_files=args.config,
             system_config=args.system_config,
             memory_mode=args.memory_mode,
@@ -479,21 +845,64 @@ def main(args=None):
             show_cpu_operations=args.show_cpu_operations,
             tensor_allocator=args.tensor_allocator,
             timing=args.timing,
+            profile=args.profile,
             output_dir=args.output_dir,
             cpu_tensor_alignment=args.cpu_tensor_alignment,
+            graph_checks=args.graph_checks,
         )
 
+        model_reader_options = model_reader.ModelReaderOptions()
+
+        if args.serve:
+            server = CompileServer(
+                arch_options,
+                args.enable_debug_db,
+                model_reader_options,
+                compiler_options,
+                args.optimise,
+                args.verbose_schedule,
+                args.show_subgraph_io_summary,
+                args.search_effort,
+            )
+            # The weight encoder pool is kept running between the jobs
+            WeightEncoderPool.start(args.weight_encode_jobs or os.cpu_count() or 1)
+            try:
+                failed = server.serve(sys.stdin, sys.stdout)
+            finally:
+                WeightEncoderPool.shutdown()
+            return 1 if failed else 0
+
+        arch = architecture_features.ArchitectureFeatures(**arch_options)
+
         scheduler_options = scheduler.SchedulerOptions(
             optimization_strategy=args.optimise,
             sram_target=arch.arena_cache_size,
             verbose_schedule=args.verbose_schedule,
+            search_effort=args.search_effort,
         )
 
-        model_reader_options = model_reader.ModelReaderOptions()
+        if args.batch is not None or len(networks) > 1:
+            # The networks are compiled in parallel instead of their weights, so no weight encoder pool is started
+            batch_options = (
+                args.enable_debug_db,
+                arch,
+                model_reader_options,
+                compiler_options,
+                scheduler_options,
+                args.show_subgraph_io_summary,
+                args.weight_cache_dir,
+                args.weight_cache_size,
+            )
+            failed = process_batch(networks, args.batch_jobs or os.cpu_count() or 1, batch_options)
+            return 1 if failed else 0
 
-        nng = process(
-            args.network, args.enable_debug_db, arch, model_reader_options, compiler_options, scheduler_options
-        )
+        WeightEncoderPool.start(args.weight_encode_jobs or os.cpu_count() or 1)
+        try:
+            nng = process(
+                networks[0], args.enable_debug_db, arch, model_reader_options, compiler_options, scheduler_options
+            )
+        finally:
+            WeightEncoderPool.shutdown()
 
         if args.show_subgraph_io_summary:
             print_subgraph_io_summary(nng)
@@ -502,3 +911,5 @@ def main(args=None):
     except VelaError as e:
         print(e.data)
         return 1
+    finally:
+        CompressedWeightCache.persistent_cache = persistent_weight_cache
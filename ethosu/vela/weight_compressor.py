@@ -15,24 +15,32 @@
 # limitations under the License.
 # Description:
 # Compresses and pads the weigths. It also calculates the scales and packs with the biases.
+import hashlib
+import os
+import struct
+import tempfile
+import threading
 from collections import namedtuple
 from collections import OrderedDict
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 from typing import Optional
 from typing import Tuple
 
 import numpy as np
 
+from ._version import __version__
 from .api import NpuBlockTraversal
 from .architecture_features import Accelerator
 from .architecture_features import ArchitectureFeatures
+from .compilation_context import CompilationContext
 from .data_type import DataType
 from .errors import UnsupportedFeatureError
 from .numeric_util import round_up
 from .operation import NpuBlockType
 from .operation import Op
-from .scaling import quantise_scale
-from .scaling import reduced_quantise_scale
+from .scaling import quantise_scales
+from .scaling import reduced_quantise_scales
 from .tensor import Tensor
 from .tensor import TensorFormat
 from .tensor import TensorPurpose
@@ -50,6 +58,27 @@ ScaleCompressionConfig = namedtuple("ScaleCompressionConfig", ["scale_value_id",
 
 WeightKey = namedtuple("WeightKey", ["core", "depth"])
 
+# Arguments to encode_weights() for one weight stream
+WeightEncodeJob = namedtuple(
+    "WeightEncodeJob",
+    [
+        "accelerator",
+        "weights_volume",
+        "dilation_xy",
+        "ifm_bitdepth",
+        "ofm_block_depth",
+        "is_depthwise",
+        "block_traversal",
+    ],
+)
+
+# Arguments to encode_weight_and_scale_tensor() for one operator
+WeightEncodeRequest = namedtuple(
+    "WeightEncodeRequest",
+    ["op", "weight_tens", "scale_tens", "kernel", "block_config", "depth_offsets", "rescale_for_faf"],
+    defaults=[False],
+)
+
 
 class WeightRange:
     def __init__(self):
@@ -82,28 +111,158 @@ class NpuWeightTensor(Tensor):
         return sum(self.double_buffer_sizes)
 
 
+class PersistentWeightCache:
+    """Content-addressed on-disk cache of encoded weight streams that is shared between compiler runs.
+
+    Entries are keyed on a hash of the weight values together with everything else that affects the encoding, so
+    a cache directory can safely be shared between networks, system configs and accelerator configs. The least
+    recently used entries are evicted when the total size of the cache exceeds max_size bytes. The cache can be used
+    by compilations in several threads."""
+
+    FILE_SUFFIX = ".mlw"
+    # Padded length of the unencoded weights, as returned by mlw_codec, followed by the SHA-256 digest of the padded
+    # length and the stream
+    HEADER = struct.Struct("<q32s")
+
+    def __init__(self, cache_dir: str, max_size: int):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in self._entries())
+        # Protects the size and the eviction
+        self._lock = threading.Lock()
+
+    def _entries(self):
+        return [
+            entry
+            for entry in os.scandir(self.cache_dir)
+            if entry.name.endswith(self.FILE_SUFFIX) and entry.is_file(follow_symlinks=False)
+        ]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.FILE_SUFFIX)
+
+    @staticmethod
+    def create_key(
+        accelerator: Accelerator,
+        weights_volume: np.ndarray,
+        dilation_xy: Tuple[int, int],
+        ifm_bitdepth: int,
+        ofm_block_depth: int,
+        is_depthwise: bool,
+        block_traversal: NpuBlockTraversal,
+    ) -> str:
+        # The Vela version is part of the key so that encoder changes never return stale streams
+        weights = np.ascontiguousarray(weights_volume, dtype=np.int16)
+        config = (
+            __version__,
+            accelerator.value,
+            weights.shape,
+            tuple(dilation_xy),
+            ifm_bitdepth,
+            ofm_block_depth,
+            is_depthwise,
+            block_traversal.value,
+        )
+        digest = hashlib.sha256(repr(config).encode("utf-8"))
+        digest.update(weights.tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _digest(encoded_stream: bytearray, padded_length: int) -> bytes:
+        digest = hashlib.sha256(struct.pack("<q", padded_length))
+        digest.update(encoded_stream)
+        return digest.digest()
+
+    def get(self, key: str) -> Optional[Tuple[bytearray, int]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Mark the entry as recently used
+            os.utime(path)
+        except OSError:
+            return None
+        if len(data) < self.HEADER.size:
+            return None
+        padded_length, digest = self.HEADER.unpack_from(data)
+        encoded_stream = bytearray(data[self.HEADER.size :])
+        if self._digest(encoded_stream, padded_length) != digest:
+            # Truncated or corrupted entry, treat it as a miss
+            return None
+        return encoded_stream, padded_length
+
+    def put(self, key: str, encoded_stream: bytearray, padded_length: int):
+        path = self._path(key)
+        # Write to a temporary file first so that concurrent compiles never observe a partial entry
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".tmp", delete=False) as f:
+                tmp_path = f.name
+                f.write(self.HEADER.pack(padded_length, self._digest(encoded_stream, padded_length)))
+                f.write(encoded_stream)
+            with self._lock:
+                try:
+                    replaced_size = os.stat(path).st_size
+                except OSError:
+                    replaced_size = 0
+                os.replace(tmp_path, path)
+                self.size += self.HEADER.size + len(encoded_stream) - replaced_size
+                if self.size > self.max_size:
+                    self.evict()
+        except OSError:
+            # The cache is only an optimisation, failing to update it must not fail the compilation
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits within max_size"""
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                # Removed by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+
+
 class CompressedWeightCache:
-    """Global tensor weight compression cache"""
+    """Tensor weight compression cache of the current compilation"""
 
-    cache: Dict[WeightCompressionConfig, Tensor] = {}
+    # Optional on-disk cache of the encoded weight streams, shared between compiler runs
+    persistent_cache: Optional[PersistentWeightCache] = None
 
     @staticmethod
     def get_tensor_with_same_compression(wcc):
-        return CompressedWeightCache.cache.get(wcc)
+        return CompilationContext.current().compressed_weights.get(wcc)
 
     @staticmethod
     def add(tens):
         # Adds the compressed weights from the tensor to the cache
         wcc = tens.weight_compression_config
-        CompressedWeightCache.cache[wcc] = tens
+        CompilationContext.current().compressed_weights[wcc] = tens
 
     @staticmethod
     def has_tensor_with_same_compression(wcc):
-        return wcc in CompressedWeightCache.cache
+        return wcc in CompilationContext.current().compressed_weights
 
     @staticmethod
     def get_unencoded_size_with_same_compression(wcc):
-        cache_obj = CompressedWeightCache.cache.get(wcc)
+        cache_obj = CompilationContext.current().compressed_weights.get(wcc)
         return cache_obj[1] if cache_obj else None
 
 
@@ -114,7 +273,7 @@ def create_weight_compression_config(weight_tens, npu_block_type, ofm_block_dept
     return WeightCompressionConfig(npu_block_type, block_depth, ofm_depth_step, dilation, weight_tens.value_id)
 
 
-def encode_weights(
+def _reorder_encode_args(
     accelerator: Accelerator,
     weights_volume: np.ndarray,
     dilation_xy: Tuple[int, int],
@@ -122,20 +281,9 @@ def encode_weights(
     ofm_block_depth: int,
     is_depthwise: bool,
     block_traversal: NpuBlockTraversal,
-):
-    """
-    Internal implementation of the public facing API to use weight encoding.
-
-    :param accelerator: architecture_features.Accelerator enum to pick the correct Ethos-U accelerator
-    :param weights_volume: numpy.ndarray in OHWI layout with a shape of four
-    :param dilation_xy: a two element tuple of dilation attributes in x,y dimension
-    :param ifm_bitdepth: the bitdepth of input feature map
-    :param ofm_block_depth: the depth of blocks for Ethos-U processing
-    :param is_depthwise: a boolean indicating these weights are used for a depthwise traversal
-    :param block_traversal: indicates how these weights are traversed on sub-kernel basis
+) -> tuple:
+    # Checks the arguments of encode_weights() and converts them to the arguments of mlw_codec.reorder_encode()
 
-    :return: a tuple with a bytearray of encoded weights and the size of the unencoded weights
-    """
     # Check arg types
     assert isinstance(accelerator, Accelerator)
     assert isinstance(weights_volume, np.ndarray)
@@ -162,7 +310,7 @@ def encode_weights(
     decomp_h = ArchitectureFeatures.SubKernelMax.height // dilation_xy[1]
     decomp_w = ArchitectureFeatures.SubKernelMax.width // dilation_xy[0]
 
-    return mlw_codec.reorder_encode(
+    return (
         ifm_ublock.depth,
         ofm_ublock.depth,
         weights_volume,
@@ -175,6 +323,125 @@ def encode_weights(
     )
 
 
+def encode_weights(
+    accelerator: Accelerator,
+    weights_volume: np.ndarray,
+    dilation_xy: Tuple[int, int],
+    ifm_bitdepth: int,
+    ofm_block_depth: int,
+    is_depthwise: bool,
+    block_traversal: NpuBlockTraversal,
+):
+    """
+    Internal implementation of the public facing API to use weight encoding.
+
+    :param accelerator: architecture_features.Accelerator enum to pick the correct Ethos-U accelerator
+    :param weights_volume: numpy.ndarray in OHWI layout with a shape of four
+    :param dilation_xy: a two element tuple of dilation attributes in x,y dimension
+    :param ifm_bitdepth: the bitdepth of input feature map
+    :param ofm_block_depth: the depth of blocks for Ethos-U processing
+    :param is_depthwise: a boolean indicating these weights are used for a depthwise traversal
+    :param block_traversal: indicates how these weights are traversed on sub-kernel basis
+
+    :return: a tuple with a bytearray of encoded weights and the size of the unencoded weights
+    """
+    return mlw_codec.reorder_encode(
+        *_reorder_encode_args(
+            accelerator, weights_volume, dilation_xy, ifm_bitdepth, ofm_block_depth, is_depthwise, block_traversal
+        )
+    )
+
+
+def encode_weights_batch(jobs: List[WeightEncodeJob]) -> List[Tuple[bytearray, int]]:
+    """
+    Encodes several weight volumes with a single call to the codec, which releases the GIL while encoding so that
+    batches submitted from different threads are encoded in parallel.
+
+    :param jobs: list of WeightEncodeJob, each holding the arguments of encode_weights()
+    :return: list with the result of encode_weights() for each of the jobs, in the same order as the jobs
+    """
+    return mlw_codec.reorder_encode_batch([_reorder_encode_args(*job) for job in jobs])
+
+
+class WeightEncoderPool:
+    """Encodes weight streams, in parallel if a pool of worker threads has been started"""
+
+    executor: Optional[ThreadPoolExecutor] = None
+    workers = 1
+
+    @classmethod
+    def start(cls, workers: int):
+        cls.shutdown()
+        if workers > 1:
+            cls.executor = ThreadPoolExecutor(max_workers=workers)
+            cls.workers = workers
+
+    @classmethod
+    def shutdown(cls):
+        if cls.executor is not None:
+            cls.executor.shutdown()
+            cls.executor = None
+            cls.workers = 1
+
+    @classmethod
+    def encode(cls, jobs: List[WeightEncodeJob]) -> List[Tuple[bytearray, int]]:
+        """Encodes the given jobs and returns the results in the same order as the jobs. The results are looked up
+        in, and added to, the persistent weight cache if it is enabled"""
+        persistent_cache = CompressedWeightCache.persistent_cache
+        results: List[Optional[Tuple[bytearray, int]]] = [None] * len(jobs)
+        keys: List[Optional[str]] = [None] * len(jobs)
+        to_encode = []
+        for idx, job in enumerate(jobs):
+            if persistent_cache is not None:
+                keys[idx] = persistent_cache.create_key(*job)
+                results[idx] = persistent_cache.get(keys[idx])
+            if results[idx] is None:
+                to_encode.append(idx)
+
+        encode_jobs = [jobs[idx] for idx in to_encode]
+        if cls.executor is not None and len(encode_jobs) > 1:
+            # Each worker thread encodes a chunk of the jobs with the GIL released
+            chunksize = max(1, len(encode_jobs) // (4 * cls.workers))
+            chunks = [encode_jobs[start : start + chunksize] for start in range(0, len(encode_jobs), chunksize)]
+            encoded = [result for chunk in cls.executor.map(encode_weights_batch, chunks) for result in chunk]
+        else:
+            encoded = encode_weights_batch(encode_jobs)
+
+        for idx, result in zip(to_encode, encoded):
+            results[idx] = result
+            if persistent_cache is not None:
+                persistent_cache.put(keys[idx], *result)
+        return results
+
+
+# Packed 80-bit bias and scale record of an output channel, [0(2-bits),shift(6-bits),scale(32-bits),bias(40-bits)]
+BIAS_RECORD_DTYPE = np.dtype([("bias", np.uint8, (5,)), ("scale", "<u4"), ("shift", np.uint8)])
+
+
+def encode_biases(biases: np.ndarray, scales: np.ndarray, shifts: np.ndarray) -> np.ndarray:
+    """
+    Packs arrays of bias and scale values as required by the Ethos-U, one record per element
+
+    :param biases: 64bit signed numbers that include 40bit signed biases
+    :param scales: 32bit scale values
+    :param shifts: 6bit shift values
+    :return: structured array of packed 80bit [0(2-bits),shift(6-bits),scale(32-bits),bias(40-bits)] records
+    """
+    biases = np.asarray(biases, dtype=np.int64)
+    scales = np.asarray(scales, dtype=np.int64)
+    shifts = np.asarray(shifts, dtype=np.int64)
+
+    assert np.all((-(1 << (40 - 1)) <= biases) & (biases < (1 << (40 - 1))))  # signed 40-bit range
+    assert np.all((0 <= scales) & (scales < (1 << 32)))  # unsigned 32-bit range
+    assert np.all((0 <= shifts) & (shifts < (1 << 6)))  # unsigned 6-bit range
+
+    records = np.empty(len(biases), dtype=BIAS_RECORD_DTYPE)
+    records["bias"] = biases.astype("<i8").view(np.uint8).reshape(-1, 8)[:, :5]
+    records["scale"] = scales
+    records["shift"] = shifts & 0x3F
+    return records
+
+
 def encode_bias(bias: np.int64, scale: int, shift: int):
     """
     Internal implementation of public facing API to pack bias and scale values as required by the Ethos-U
@@ -189,22 +456,7 @@ def encode_bias(bias: np.int64, scale: int, shift: int):
     assert isinstance(scale, int)
     assert isinstance(shift, int)
 
-    assert -(1 << (40 - 1)) <= bias < (1 << (40 - 1))  # signed 40-bit range
-    assert 0 <= scale < (1 << 32)  # unsigned 32-bit range
-    assert 0 <= shift < (1 << 6)  # unsigned 6-bit range
-
-    data = bytearray(10)
-    data[0] = (bias >> (0 * 8)) & 0xFF
-    data[1] = (bias >> (1 * 8)) & 0xFF
-    data[2] = (bias >> (2 * 8)) & 0xFF
-    data[3] = (bias >> (3 * 8)) & 0xFF
-    data[4] = (bias >> (4 * 8)) & 0xFF
-    data[5] = (scale >> (0 * 8)) & 0xFF
-    data[6] = (scale >> (1 * 8)) & 0xFF
-    data[7] = (scale >> (2 * 8)) & 0xFF
-    data[8] = (scale >> (3 * 8)) & 0xFF
-    data[9] = shift & 0x3F
-    return data
+    return bytearray(encode_biases([bias], [scale], [shift]).tobytes())
 
 
 def core_deinterleave(hwio, core, ncores):
@@ -272,57 +524,84 @@ def _prepare_scale_and_bias(arch, tens, rescale_for_faf, explicit_scaling):
 
     if explicit_scaling:
         assert len(explicit_scaling.shift) == len(explicit_scaling.multiplier)
-        quantised_scales = [(int(m), int(s)) for s, m in zip(explicit_scaling.shift, explicit_scaling.multiplier)]
+        multipliers = np.array([int(m) for m in explicit_scaling.multiplier], dtype=np.int64)
+        shifts = np.array([int(s) for s in explicit_scaling.shift], dtype=np.int64)
     else:
         # quantise all of the weight scales into (scale_factor, shift)
         if ifm_dtype == DataType.int16:
-            quantised_scales = [reduced_quantise_scale(scale) for scale in scales]
+            multipliers, shifts = reduced_quantise_scales(scales)
         else:
-            quantised_scales = [quantise_scale(scale) for scale in scales]
+            multipliers, shifts = quantise_scales(scales)
 
     # If only 1 quantised scale is used, repeat that value for the length of the biases
-    if len(quantised_scales) == 1:
-        quantised_scales = [quantised_scales[0]] * len(biases)
+    if len(multipliers) == 1:
+        multipliers = np.repeat(multipliers, len(biases))
+        shifts = np.repeat(shifts, len(biases))
 
-    return quantised_scales, biases
+    return multipliers, shifts, biases
 
 
-def encode_weight_and_scale_tensor(
-    arch, op, weight_tens, scale_tens, kernel, block_config, depth_offsets, rescale_for_faf=False
-) -> Tuple[Optional[NpuWeightTensor], Optional[NpuWeightTensor]]:
-    npu_block_type = op.type.npu_block_type
-
-    ifm_scale = scale_tens and scale_tens.consumer_list[0].get_input_quantization().scale_f32
-    ofm_scale = scale_tens and scale_tens.consumer_list[0].get_output_quantization().scale_f32
+class _WeightAndScaleEncoding:
+    """Encoding of one weight and scale tensor. It is split into preparing the weight encoder jobs and assembling
+    the encoded streams, so that the jobs for many tensors can be encoded together by the WeightEncoderPool"""
 
-    wcc = create_weight_compression_config(
-        weight_tens, npu_block_type, block_config.ofm_block.depth, hash(str(depth_offsets)), kernel.dilation
-    )
+    def __init__(self, arch, request: WeightEncodeRequest):
+        self.arch = arch
+        self.request = request
+        op, weight_tens, scale_tens = request.op, request.weight_tens, request.scale_tens
+        self.npu_block_type = op.type.npu_block_type
 
-    scc = ScaleCompressionConfig(scale_tens and scale_tens.value_id, ifm_scale, ofm_scale)
+        ifm_scale = scale_tens and scale_tens.consumer_list[0].get_input_quantization().scale_f32
+        ofm_scale = scale_tens and scale_tens.consumer_list[0].get_output_quantization().scale_f32
 
-    tens_cached = CompressedWeightCache.get_tensor_with_same_compression(wcc)
-    if tens_cached is not None:
-        if tens_cached.scale_compression_config == scc:
-            return tens_cached, None
-        npu_tensor = NpuWeightTensor(scale_tens.name)
-        do_weights = False
-        do_scales = True
-    else:
-        npu_tensor = NpuWeightTensor(weight_tens.name)
-        do_weights = True
-        do_scales = True
+        self.wcc = create_weight_compression_config(
+            weight_tens,
+            self.npu_block_type,
+            request.block_config.ofm_block.depth,
+            hash(str(request.depth_offsets)),
+            request.kernel.dilation,
+        )
 
-    npu_tensor.weight_compression_config = wcc
-    npu_tensor.scale_compression_config = scc
+        self.scc = ScaleCompressionConfig(scale_tens and scale_tens.value_id, ifm_scale, ofm_scale)
 
-    # Ensure depth offsets are terminated at end of OFM shape
-    assert len(depth_offsets) > 1, "Require closed depth ranges"
+        self.tens_cached = CompressedWeightCache.get_tensor_with_same_compression(self.wcc)
+        self.do_weights = self.tens_cached is None
+        self.weights = None
+        self.hw_traversal = NpuBlockTraversal.DEPTH_FIRST
 
-    ifm_bitdepth = op.inputs[0].dtype.size_in_bits()
+    def cached_result(self) -> Optional[Tuple[Optional[NpuWeightTensor], Optional[NpuWeightTensor]]]:
+        # Returns the result if no encoding is needed at all
+        if self.tens_cached is not None and self.tens_cached.scale_compression_config == self.scc:
+            return self.tens_cached, None
+        return None
+
+    def _core_ranges(self):
+        # Yields (depth index, depth offset, depth length, core, core block depth) for each encoded range
+        arch = self.arch
+        depth_offsets = self.request.depth_offsets
+        full_ofm_depth = self.request.weight_tens.values.shape[-1]
+        ofm_block_depth = self.request.block_config.ofm_block.depth
+        for idx, depth_offset in enumerate(depth_offsets[:-1]):
+            # Do not generate for offsets outside the OFM
+            assert depth_offset >= 0 and depth_offset < full_ofm_depth
+            depth_length = depth_offsets[idx + 1] - depth_offset
+            for core in range(0, min(arch.ncores, full_ofm_depth)):
+                core_block_depth = int((ofm_block_depth + arch.ncores - 1 - core) // arch.ncores)
+                if core_block_depth != 0:
+                    yield idx, depth_offset, depth_length, core, core_block_depth
+
+    def prepare(self) -> List[WeightEncodeJob]:
+        """Prepares the weights and returns the weight encoder jobs needed for this tensor"""
+        # Ensure depth offsets are terminated at end of OFM shape
+        assert len(self.request.depth_offsets) > 1, "Require closed depth ranges"
+
+        if not self.do_weights:
+            return []
+
+        arch = self.arch
+        op, weight_tens, kernel = self.request.op, self.request.weight_tens, self.request.kernel
+        ifm_bitdepth = op.inputs[0].dtype.size_in_bits()
 
-    # No cache hit, need to perform the encoding
-    if do_weights:
         assert weight_tens.quantization is not None
         assert weight_tens.quantization.scale_f32 is not None or op.explicit_scaling
         assert weight_tens.quantization.zero_point is not None
@@ -346,9 +625,9 @@ def encode_weight_and_scale_tensor(
         ifm_depth = weights.shape[-2]
 
         # Default HW traversal
-        npu_tensor.hw_traversal = NpuBlockTraversal.DEPTH_FIRST
+        self.hw_traversal = NpuBlockTraversal.DEPTH_FIRST
 
-        if npu_block_type == NpuBlockType.ConvolutionMxN:
+        if self.npu_block_type == NpuBlockType.ConvolutionMxN:
             # Determine which block traversal strategy has better DPU utilization
             kernel_size = weights.shape[0] * weights.shape[1]
             depth_utilization = weights.shape[2] / round_up(weights.shape[2], 32 if ifm_bitdepth == 8 else 16)
@@ -357,113 +636,179 @@ def encode_weight_and_scale_tensor(
             )
             if part_kernel_utilization >= depth_utilization or ifm_depth <= 8:
                 # Part-kernel first is always better for ifm depths <= 8
-                npu_tensor.hw_traversal = NpuBlockTraversal.PART_KERNEL_FIRST
+                self.hw_traversal = NpuBlockTraversal.PART_KERNEL_FIRST
 
         if op.type == Op.Conv2DBackpropInputSwitchedBias:
             # Transpose Convoluion, reverse weights in H and W axes
             weights = np.flip(weights, axis=(0, 1))
 
-    encoded_stream = bytearray()
-    double_buffer_sizes = [0, 0]
-    is_depthwise = npu_block_type == NpuBlockType.ConvolutionDepthWise
+        is_depthwise = self.npu_block_type == NpuBlockType.ConvolutionDepthWise
 
-    # Bias & scale
-    if do_scales:
-        quantised_scales, biases = _prepare_scale_and_bias(arch, scale_tens, rescale_for_faf, op.explicit_scaling)
-        scale_tens.element_size_bytes = 10
+        # Slice the weight stream up depth-ways into bricks and, for each core, deinterleave the weights from the
+        # larger volume so that separate compressed streams can be generated
+        jobs = []
+        for _, depth_offset, depth_length, core, core_block_depth in self._core_ranges():
+            brick_weights = weights[:, :, :, depth_offset : depth_offset + depth_length]
+            core_weights = core_deinterleave(brick_weights, core, arch.ncores)
+            jobs.append(
+                WeightEncodeJob(
+                    arch.accelerator_config,
+                    core_weights,
+                    kernel.dilation,
+                    ifm_bitdepth,
+                    core_block_depth,
+                    is_depthwise,
+                    self.hw_traversal,
+                )
+            )
+        return jobs
+
+    def assemble(
+        self, encoded_substreams: List[Tuple[bytearray, int]]
+    ) -> Tuple[Optional[NpuWeightTensor], Optional[NpuWeightTensor]]:
+        """Assembles the encoded weight streams, returned by the jobs from prepare(), and the scale streams into
+        the encoded tensor"""
+        arch = self.arch
+        op, weight_tens, scale_tens = self.request.op, self.request.weight_tens, self.request.scale_tens
+        do_weights = self.do_weights
+        do_scales = True
 
-    # Slice the weight stream up depth-ways into bricks and compress
-    full_ofm_depth = weight_tens.values.shape[-1]
-    ofm_block_depth = block_config.ofm_block.depth
+        if do_weights:
+            npu_tensor = NpuWeightTensor(weight_tens.name)
+        else:
+            npu_tensor = NpuWeightTensor(scale_tens.name)
+        npu_tensor.weight_compression_config = self.wcc
+        npu_tensor.scale_compression_config = self.scc
+        npu_tensor.hw_traversal = self.hw_traversal
+
+        encoded_stream = bytearray()
+        double_buffer_sizes = [0, 0]
+
+        # Bias & scale
+        if do_scales:
+            multipliers, shifts, biases = _prepare_scale_and_bias(
+                arch, scale_tens, self.request.rescale_for_faf, op.explicit_scaling
+            )
+            scale_tens.element_size_bytes = 10
+
+        weight_range_index = 0
+        buffer_start_offset = 0
+        encoded_substreams_iter = iter(encoded_substreams)
+        prev_idx = None
+        for idx, depth_offset, depth_length, core, _ in self._core_ranges():
+            if idx != prev_idx:
+                if prev_idx is not None:
+                    # Remember maximum encoded length for DoubleBuffering
+                    double_buffer_sizes[prev_idx % 2] = max(
+                        double_buffer_sizes[prev_idx % 2], len(encoded_stream) - buffer_start_offset
+                    )
+                buffer_start_offset = len(encoded_stream)
+                prev_idx = idx
+
+            key = WeightKey(core, depth_offset)
+            weight_range = WeightRange()
+            weight_range.offset = len(encoded_stream)
+            weight_range.index = weight_range_index
+            weight_range_index += 1
+
+            # Scales & biases
+            if do_scales:
+                core_channels = slice(depth_offset + core, depth_offset + core + depth_length, arch.ncores)
+                core_biases = biases[core_channels]
+                num_biases = len(core_biases)
+                scale_records = encode_biases(
+                    core_biases, multipliers[core_channels][:num_biases], shifts[core_channels][:num_biases]
+                )
+
+                weight_range.scale_bytes = scale_records.nbytes
+
+                encoded_stream.extend(scale_records.tobytes())
+
+                # Align to 16 for start of next substream
+                remainder = len(encoded_stream) % 16
+                if remainder > 0:
+                    encoded_stream.extend(bytearray(16 - remainder))
+
+            # Weights
+            if do_weights:
+                encoded_substream, _ = next(encoded_substreams_iter)
+                weight_range.weight_offset = len(encoded_stream) - weight_range.offset
+                weight_range.weight_bytes = len(encoded_substream)
+                # Append encoded section
+                encoded_stream.extend(encoded_substream)
+                assert len(encoded_stream) % 16 == 0
+
+            # Record encoded range in tensor
+            npu_tensor.encoded_ranges[key] = weight_range
+
+        if prev_idx is not None:
+            # Remember maximum encoded length for DoubleBuffering
+            double_buffer_sizes[prev_idx % 2] = max(
+                double_buffer_sizes[prev_idx % 2], len(encoded_stream) - buffer_start_offset
+            )
 
-    weight_range_index = 0
-    for idx, depth_offset in enumerate(depth_offsets[:-1]):
-        # Do not generate for offsets outside the OFM
-        assert depth_offset >= 0 and depth_offset < full_ofm_depth
-        depth_length = depth_offsets[idx + 1] - depth_offset
+        # Attach buffer to tensor
+        npu_tensor.buffer = encoded_stream
+        npu_tensor.double_buffer_sizes = double_buffer_sizes
+        npu_tensor.set_all_shapes([1, 1, 1, len(encoded_stream)])
+        npu_tensor.format = TensorFormat.WeightsCompressed
+
+        # Scale only tensor
+        if not do_weights:
+            npu_tensor.weight_compression_config = None
+            npu_tensor.purpose = TensorPurpose.FSBias
+            npu_tensor.mem_area = scale_tens.mem_area
+            npu_tensor.mem_type = scale_tens.mem_type
+            weights_tensor = self.tens_cached
+            scale_tensor = npu_tensor
+        else:
+            npu_tensor.purpose = TensorPurpose.Weights
+            npu_tensor.mem_area = weight_tens.mem_area
+            npu_tensor.mem_type = weight_tens.mem_type
+            weights_tensor = npu_tensor
+            scale_tensor = None
+            CompressedWeightCache.add(weights_tensor)
+
+        return weights_tensor, scale_tensor
+
+
+def encode_weight_and_scale_tensors(
+    arch, requests: List[WeightEncodeRequest]
+) -> List[Tuple[Optional[NpuWeightTensor], Optional[NpuWeightTensor]]]:
+    """Encodes the weight and scale tensors for several operators at once, so that all of their weight streams can
+    be encoded in parallel. Gives the same result as calling encode_weight_and_scale_tensor() for each request in
+    turn"""
+    results: List[Optional[Tuple[Optional[NpuWeightTensor], Optional[NpuWeightTensor]]]] = [None] * len(requests)
+    encodings = []
+    jobs: List[WeightEncodeJob] = []
+    pending_wccs = set()
+    for idx, request in enumerate(requests):
+        encoding = _WeightAndScaleEncoding(arch, request)
+        results[idx] = encoding.cached_result()
+        if results[idx] is not None or encoding.wcc in pending_wccs:
+            # Either nothing to encode or the same weights are already being encoded by an earlier request, in
+            # which case the request is handled once those weights have been added to the cache
+            continue
+        if encoding.do_weights:
+            pending_wccs.add(encoding.wcc)
+        encoding_jobs = encoding.prepare()
+        encodings.append((idx, encoding, len(jobs), len(jobs) + len(encoding_jobs)))
+        jobs.extend(encoding_jobs)
+
+    encoded_substreams = WeightEncoderPool.encode(jobs)
+    for idx, encoding, jobs_start, jobs_end in encodings:
+        results[idx] = encoding.assemble(encoded_substreams[jobs_start:jobs_end])
+
+    # Requests that shared weights with an earlier request in the same batch
+    for idx, request in enumerate(requests):
+        if results[idx] is None:
+            results[idx] = encode_weight_and_scale_tensor(arch, *request)
+
+    return results
 
-        # Get the weights necessary for this brick
-        if do_weights:
-            brick_weights = weights[:, :, :, depth_offset : depth_offset + depth_length]
 
-        buffer_start_offset = len(encoded_stream)
-
-        # For each core, deinterleave weights/scales from the larger volume
-        # and generate separate compressed streams.
-        for core in range(0, min(arch.ncores, full_ofm_depth)):
-
-            core_block_depth = int((ofm_block_depth + arch.ncores - 1 - core) // arch.ncores)
-
-            if core_block_depth != 0:
-                key = WeightKey(core, depth_offset)
-                weight_range = WeightRange()
-                weight_range.offset = len(encoded_stream)
-                weight_range.index = weight_range_index
-                weight_range_index += 1
-
-                # Scales & biases
-                if do_scales:
-                    scale_stream = []
-                    core_scales = quantised_scales[
-                        depth_offset + core : depth_offset + core + depth_length : arch.ncores
-                    ]
-                    core_biases = biases[depth_offset + core : depth_offset + core + depth_length : arch.ncores]
-                    for j, core_bias in enumerate(core_biases):
-                        scale_stream.extend(encode_bias(np.int64(core_bias), *core_scales[j]))
-
-                    weight_range.scale_bytes = len(scale_stream)
-
-                    encoded_stream.extend(scale_stream)
-
-                    # Align to 16 for start of next substream
-                    remainder = len(encoded_stream) % 16
-                    if remainder > 0:
-                        encoded_stream.extend(bytearray(16 - remainder))
-
-                # Weights
-                if do_weights:
-                    core_weights = core_deinterleave(brick_weights, core, arch.ncores)
-                    encoded_substream, _ = encode_weights(
-                        accelerator=arch.accelerator_config,
-                        weights_volume=core_weights,
-                        dilation_xy=kernel.dilation,
-                        ifm_bitdepth=ifm_bitdepth,
-                        ofm_block_depth=core_block_depth,
-                        is_depthwise=is_depthwise,
-                        block_traversal=npu_tensor.hw_traversal,
-                    )
-                    weight_range.weight_offset = len(encoded_stream) - weight_range.offset
-                    weight_range.weight_bytes = len(encoded_substream)
-                    # Append encoded section
-                    encoded_stream.extend(encoded_substream)
-                    assert len(encoded_stream) % 16 == 0
-
-                # Record encoded range in tensor
-                npu_tensor.encoded_ranges[key] = weight_range
-
-        # Remember maximum encoded length for DoubleBuffering
-        double_buffer_sizes[idx % 2] = max(double_buffer_sizes[idx % 2], len(encoded_stream) - buffer_start_offset)
-
-    # Attach buffer to tensor
-    npu_tensor.buffer = encoded_stream
-    npu_tensor.double_buffer_sizes = double_buffer_sizes
-    npu_tensor.set_all_shapes([1, 1, 1, len(encoded_stream)])
-    npu_tensor.format = TensorFormat.WeightsCompressed
-
-    # Scale only tensor
-    if not do_weights:
-        npu_tensor.weight_compression_config = None
-        npu_tensor.purpose = TensorPurpose.FSBias
-        npu_tensor.mem_area = scale_tens.mem_area
-        npu_tensor.mem_type = scale_tens.mem_type
-        weights_tensor = tens_cached
-        scale_tensor = npu_tensor
-    else:
-        npu_tensor.purpose = TensorPurpose.Weights
-        npu_tensor.mem_area = weight_tens.mem_area
-        npu_tensor.mem_type = weight_tens.mem_type
-        weights_tensor = npu_tensor
-        scale_tensor = None
-        CompressedWeightCache.add(weights_tensor)
-
-    return weights_tensor, scale_tensor
+def encode_weight_and_scale_tensor(
+    arch, op, weight_tens, scale_tens, kernel, block_config, depth_offsets, rescale_for_faf=False
+) -> Tuple[Optional[NpuWeightTensor], Optional[NpuWeightTensor]]:
+    request = WeightEncodeRequest(op, weight_tens, scale_tens, kernel, block_config, depth_offsets, rescale_for_faf)
+    return encode_weight_and_scale_tensors(arch, [request])[0]